@@ -0,0 +1,70 @@
+"""
+Measure the memory per layout block and the throughput of the operations
+on layout elements.
+
+    python benchmarks/elements_benchmark.py --blocks 10000
+"""
+
+import argparse
+import timeit
+import tracemalloc
+
+from inkwell.components import Interval, LayoutBlock, Rectangle
+
+
+def _make_blocks(num_blocks: int) -> list[LayoutBlock]:
+    return [
+        LayoutBlock(
+            Rectangle(i, i + 1.5, i + 100, i + 20.5),
+            type="Text",
+            score=0.9,
+        )
+        for i in range(num_blocks)
+    ]
+
+
+def _bytes_per_block(num_blocks: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    blocks = _make_blocks(num_blocks)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(
+        stat.size_diff for stat in after.compare_to(before, "filename")
+    )
+    del blocks
+    return allocated / num_blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"memory: {_bytes_per_block(args.blocks):.0f} bytes/block")
+
+    blocks = _make_blocks(args.blocks)
+    other = LayoutBlock(Rectangle(0, 0, 5000, 5000))
+    interval = Interval(0, 5000, axis="x")
+    dicts = [block.to_dict() for block in blocks]
+    copies = [LayoutBlock.from_dict(data) for data in dicts]
+    operations = {
+        "create": lambda: _make_blocks(args.blocks),
+        "pad": lambda: [block.pad(1, 2, 3, 4) for block in blocks],
+        "shift": lambda: [block.shift((3, 4)) for block in blocks],
+        "scale": lambda: [block.scale(2) for block in blocks],
+        "is_in": lambda: [block.is_in(other) for block in blocks],
+        "is_in_interval": lambda: [block.is_in(interval) for block in blocks],
+        "set": lambda: [block.set(type="Title") for block in blocks],
+        "eq": lambda: [a == b for a, b in zip(blocks, copies)],
+        "to_dict": lambda: [block.to_dict() for block in blocks],
+        "from_dict": lambda: [LayoutBlock.from_dict(data) for data in dicts],
+    }
+    for name, operation in operations.items():
+        wall_time = min(timeit.repeat(operation, number=1, repeat=args.repeat))
+        print(f"{name}: {args.blocks / wall_time:,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare the throughput of layout detectors on the same pages.
+
+    python benchmarks/layout_detector_benchmark.py \
+        --detectors faster_rcnn faster_rcnn_onnx --pages 16
+
+    python benchmarks/layout_detector_benchmark.py \
+        --detectors layoutlmv3 layoutlmv3:trace layoutlmv3:compile
+
+A detector may be suffixed with a compile mode of its backbone. Reports
+the load time, warm-up time and per-page latency of every detector, and
+how many detections of each detector match those of the first one.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from inkwell.io import read_image
+from inkwell.layout_detector import LayoutDetectorFactory, LayoutDetectorType
+
+DEFAULT_IMAGE = "test/data/sample.png"
+
+
+def _matched_blocks(reference, layout, tolerance: float) -> int:
+    matched = 0
+    for block in reference.get_blocks():
+        if any(
+            other.type == block.type
+            and np.allclose(
+                other.coordinates, block.coordinates, atol=tolerance
+            )
+            for other in layout.get_blocks()
+        ):
+            matched += 1
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--detectors",
+        nargs="+",
+        default=[
+            LayoutDetectorType.FASTER_RCNN.value,
+            LayoutDetectorType.FASTER_RCNN_ONNX.value,
+        ],
+    )
+    parser.add_argument("--image", default=DEFAULT_IMAGE)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--tolerance", type=float, default=4.0)
+    args = parser.parse_args()
+
+    pages = [read_image(args.image)] * args.pages
+    reference = None
+    for detector_spec in args.detectors:
+        detector_name, _, compile_mode = detector_spec.partition(":")
+        kwargs = {"compile_mode": compile_mode} if compile_mode else {}
+        start_time = time.perf_counter()
+        detector = LayoutDetectorFactory.get_layout_detector(
+            LayoutDetectorType(detector_name), **kwargs
+        )
+        load_time = time.perf_counter() - start_time
+
+        # Warm up with a full batch, so that lazy initialization, tracing
+        # and compilation for the batch shape are not timed
+        start_time = time.perf_counter()
+        detector.process(pages[: args.batch_size])
+        warmup_time = time.perf_counter() - start_time
+
+        layouts = []
+        start_time = time.perf_counter()
+        for i in range(0, len(pages), args.batch_size):
+            layouts.extend(detector.process(pages[i : i + args.batch_size]))
+        wall_time = time.perf_counter() - start_time
+
+        print(
+            f"{detector_spec}: loaded in {load_time:.2f}s, "
+            f"warmed up in {warmup_time:.2f}s, "
+            f"{1000 * wall_time / len(pages):.1f} ms/page, "
+            f"{len(layouts[0])} blocks"
+        )
+        if reference is None:
+            reference = layouts[0]
+        else:
+            matched = _matched_blocks(reference, layouts[0], args.tolerance)
+            print(f"  {matched}/{len(reference)} blocks match")
+
+
+if __name__ == "__main__":
+    main()
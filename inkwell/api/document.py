@@ -11,8 +11,18 @@ class Document(BaseModel):
     """
 
     pages: List[Page]
+    # Information about how the document was processed, e.g. stage timings
+    metadata: Dict[str, Any] = {}
 
     def to_dict(self) -> Dict[str, Any]:
         return {
             "pages": [page.to_dict() for page in self.pages],
+            "metadata": self.metadata,
         }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Document":
+        return cls(
+            pages=[Page.from_dict(page) for page in data["pages"]],
+            metadata=data.get("metadata") or {},
+        )
@@ -33,6 +33,26 @@ class PageFragment(BaseModel):
             "page_number": self.page_number,
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PageFragment":
+        fragment_type = PageFragmentType(data["fragment_type"])
+        content_class = {
+            PageFragmentType.TEXT: TextBox,
+            PageFragmentType.TABLE: Table,
+            PageFragmentType.FIGURE: Figure,
+        }[fragment_type]
+        content = {
+            key: value
+            for key, value in data["content"].items()
+            if key != "fragment_type"
+        }
+        return cls(
+            fragment_type=fragment_type,
+            content=content_class(**content),
+            reading_order_index=data.get("reading_order_index"),
+            page_number=data.get("page_number"),
+        )
+
 
 class Page(BaseModel):
     """
@@ -82,3 +102,15 @@ class Page(BaseModel):
             "layout": self.layout,
             "page_image": self.page_image,
         }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Page":
+        return cls(
+            page_number=data["page_number"],
+            page_fragments=[
+                PageFragment.from_dict(fragment)
+                for fragment in data.get("page_fragments") or []
+            ],
+            layout=data.get("layout") or {},
+            page_image=data.get("page_image"),
+        )
@@ -0,0 +1,16 @@
+from inkwell.cache.cached_backends import (
+    CachedFigureExtractor,
+    CachedOCR,
+    CachedTableExtractor,
+    cache_model_id,
+)
+from inkwell.cache.fragment_cache import FragmentCache, make_cache_key
+
+__all__ = [
+    "FragmentCache",
+    "CachedOCR",
+    "CachedTableExtractor",
+    "CachedFigureExtractor",
+    "make_cache_key",
+    "cache_model_id",
+]
@@ -0,0 +1,159 @@
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from inkwell.cache.fragment_cache import FragmentCache, make_cache_key
+from inkwell.components import Layout
+from inkwell.figure_extractor.base import BaseFigureExtractor
+from inkwell.ocr.base import BaseOCR
+from inkwell.table_extractor.base import BaseTableExtractor
+
+# Words of whole images are cached apart from the texts of the same images
+WORDS_CACHE_PROMPT = "\0words"
+
+
+def cache_model_id(backend: Any) -> str:
+    """
+    The id results of a backend are cached under: its model id, with the
+    configuration that changes its results.
+    """
+    config_id = backend.config_id
+    return (
+        f"{backend.model_id}[{config_id}]" if config_id else backend.model_id
+    )
+
+
+def process_with_cache(
+    cache: FragmentCache,
+    image_batch: list[np.ndarray],
+    model_id: str,
+    process: Callable[[list[np.ndarray]], list[Any]],
+    prompt: Optional[str] = None,
+) -> list[Any]:
+    """
+    Return cached results for the images of a batch and run `process` only
+    on the images that are not in the cache.
+    """
+    keys = [make_cache_key(image, model_id, prompt) for image in image_batch]
+    cached = cache.get_many(keys)
+
+    # Identical crops within a batch are only processed once
+    miss_images = {}
+    for key, image in zip(keys, image_batch):
+        if key not in cached and key not in miss_images:
+            miss_images[key] = image
+
+    if miss_images:
+        results = process(list(miss_images.values()))
+        computed = dict(zip(miss_images, results))
+        cache.put_many(computed)
+        cached.update(computed)
+
+    return [cached[key] for key in keys]
+
+
+class CachedOCR(BaseOCR):
+    """
+    OCR backend that serves repeated crops from a fragment cache.
+    """
+
+    def __init__(self, ocr_detector: BaseOCR, cache: FragmentCache):
+        self._ocr_detector = ocr_detector
+        self._cache = cache
+
+    @property
+    def model_id(self) -> str:
+        return self._ocr_detector.model_id
+
+    @property
+    def config_id(self) -> str:
+        return self._ocr_detector.config_id
+
+    def process(
+        self,
+        image_batch: list[np.ndarray],
+        user_prompt: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+    ) -> list[str]:
+        return process_with_cache(
+            self._cache,
+            image_batch,
+            cache_model_id(self),
+            lambda images: self._ocr_detector.process(
+                images, user_prompt, system_prompt
+            ),
+            prompt=f"{system_prompt or ''}\0{user_prompt or ''}",
+        )
+
+    @property
+    def supports_words(self) -> bool:
+        return self._ocr_detector.supports_words
+
+    def process_words(self, image_batch: list[np.ndarray]) -> list[Layout]:
+        results = process_with_cache(
+            self._cache,
+            image_batch,
+            cache_model_id(self),
+            lambda images: [
+                words.to_dict()
+                for words in self._ocr_detector.process_words(images)
+            ],
+            prompt=WORDS_CACHE_PROMPT,
+        )
+        return [Layout.from_dict(result) for result in results]
+
+
+class CachedTableExtractor(BaseTableExtractor):
+    """
+    Table extractor that serves repeated crops from a fragment cache.
+    """
+
+    def __init__(
+        self, table_extractor: BaseTableExtractor, cache: FragmentCache
+    ):
+        self._table_extractor = table_extractor
+        self._cache = cache
+
+    @property
+    def model_id(self) -> str:
+        return self._table_extractor.model_id
+
+    @property
+    def config_id(self) -> str:
+        return self._table_extractor.config_id
+
+    def process(self, image_batch: list[np.ndarray]) -> list[dict]:
+        return process_with_cache(
+            self._cache,
+            image_batch,
+            cache_model_id(self),
+            self._table_extractor.process,
+        )
+
+
+class CachedFigureExtractor(BaseFigureExtractor):
+    """
+    Figure extractor that serves repeated crops from a fragment cache.
+    """
+
+    def __init__(
+        self, figure_extractor: BaseFigureExtractor, cache: FragmentCache
+    ):
+        self._figure_extractor = figure_extractor
+        self._cache = cache
+
+    @property
+    def model_id(self) -> str:
+        return self._figure_extractor.model_id
+
+    @property
+    def config_id(self) -> str:
+        return self._figure_extractor.config_id
+
+    def process(self, image_batch: list[np.ndarray]) -> list[dict]:
+        return process_with_cache(
+            self._cache,
+            image_batch,
+            cache_model_id(self),
+            self._figure_extractor.process,
+        )
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+
+from inkwell.utils.download import get_cache_directory
+
+_logger = logging.getLogger(__name__)
+
+FRAGMENT_CACHE_FILE = "fragment_cache.sqlite"
+DEFAULT_FRAGMENT_CACHE_MAX_BYTES = 1024**3
+
+# SQLite limits the number of host parameters of a single statement
+_MAX_QUERY_PARAMETERS = 500
+
+
+def make_cache_key(
+    image: np.ndarray, model_id: str, prompt: Optional[str] = None
+) -> str:
+    """
+    Content-addressed key of a fragment result: a hash of the crop pixels,
+    the model that produced the result and the prompt it was given.
+    """
+    image = np.ascontiguousarray(image)
+    digest = hashlib.sha256()
+    digest.update(model_id.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((prompt or "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(f"{image.shape}{image.dtype.str}".encode("utf-8"))
+    digest.update(image.data)
+    return digest.hexdigest()
+
+
+class FragmentCache:
+    """
+    Persistent cache of fragment results stored in a local SQLite
+    database. Results are evicted in least recently used order once the
+    total size of the stored results exceeds `max_size_bytes`.
+
+    Args:
+        path (str or Path, optional): The database file. Defaults to a file
+            in the TensorLake cache directory.
+        max_size_bytes (int, optional): The maximum total size of the stored
+            results.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        max_size_bytes: int = DEFAULT_FRAGMENT_CACHE_MAX_BYTES,
+    ):
+        self._path = Path(path or get_cache_directory() / FRAGMENT_CACHE_FILE)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._last_access = 0.0
+        self.hits = 0
+        self.misses = 0
+
+        self._connection = sqlite3.connect(
+            str(self._path), check_same_thread=False
+        )
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fragments (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS fragments_last_access "
+            "ON fragments (last_access)"
+        )
+        self._connection.commit()
+        self._size_bytes = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM fragments"
+        ).fetchone()[0]
+
+        _logger.info("Loaded fragment cache from %s", self._path)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size_bytes": self._size_bytes,
+        }
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """
+        Look up results by key. Missing keys are left out of the result.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for i in range(0, len(unique_keys), _MAX_QUERY_PARAMETERS):
+                chunk = unique_keys[i : i + _MAX_QUERY_PARAMETERS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM fragments "
+                    f"WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                found.update({key: json.loads(value) for key, value in rows})
+
+            now = self._now()
+            self._connection.executemany(
+                "UPDATE fragments SET last_access = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._connection.commit()
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items: dict[str, Any]):
+        """
+        Store JSON serializable results by key.
+        """
+        if not items:
+            return
+
+        rows = [
+            (key, json.dumps(result).encode("utf-8"))
+            for key, result in items.items()
+        ]
+        with self._lock:
+            now = self._now()
+            rows = [(key, value, len(value), now) for key, value in rows]
+            replaced = self._stored_size(list(items))
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO fragments "
+                "(key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._size_bytes += sum(row[2] for row in rows) - replaced
+            self._evict()
+            self._connection.commit()
+
+    def _now(self) -> float:
+        # Strictly increasing so that accesses within the clock resolution
+        # keep their order
+        self._last_access = max(time.time(), self._last_access + 1e-6)
+        return self._last_access
+
+    def _stored_size(self, keys: list[str]) -> int:
+        size = 0
+        for i in range(0, len(keys), _MAX_QUERY_PARAMETERS):
+            chunk = keys[i : i + _MAX_QUERY_PARAMETERS]
+            placeholders = ",".join("?" * len(chunk))
+            size += self._connection.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM fragments "
+                f"WHERE key IN ({placeholders})",
+                chunk,
+            ).fetchone()[0]
+        return size
+
+    def _evict(self):
+        while self._size_bytes > self._max_size_bytes:
+            rows = self._connection.execute(
+                "SELECT key, size FROM fragments "
+                "ORDER BY last_access LIMIT ?",
+                (_MAX_QUERY_PARAMETERS,),
+            ).fetchall()
+            if not rows:
+                self._size_bytes = 0
+                return
+
+            evicted = []
+            for key, size in rows:
+                evicted.append((key,))
+                self._size_bytes -= size
+                if self._size_bytes <= self._max_size_bytes:
+                    break
+            self._connection.executemany(
+                "DELETE FROM fragments WHERE key = ?", evicted
+            )
+            _logger.debug("Evicted %d fragment results", len(evicted))
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM fragments")
+            self._connection.commit()
+            self._size_bytes = 0
+
+    def close(self):
+        self._connection.close()
@@ -1,3 +1,4 @@
+from inkwell.components.array_layout import ArrayLayout
 from inkwell.components.base import BaseCoordElement, BaseLayoutElement
 from inkwell.components.elements import (
     ALL_BASECOORD_ELEMENTS,
@@ -9,6 +10,7 @@ from inkwell.components.elements import (
     Rectangle,
 )
 from inkwell.components.layout import Layout
+from inkwell.components.spatial_index import SpatialIndex
 
 __all__ = [
     "BaseCoordElement",
@@ -21,4 +23,6 @@ __all__ = [
     "Rectangle",
     "LayoutBlock",
     "Layout",
+    "ArrayLayout",
+    "SpatialIndex",
 ]
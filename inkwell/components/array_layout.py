@@ -0,0 +1,373 @@
+from collections.abc import Iterable
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from inkwell.components.base import BaseCoordElement
+from inkwell.components.elements import (
+    Interval,
+    LayoutBlock,
+    Quadrilateral,
+    Rectangle,
+)
+from inkwell.components.layout import Layout
+
+
+def _to_numpy(values) -> np.ndarray:
+    # CPU tensors share their memory with the returned array
+    if hasattr(values, "detach"):
+        values = values.detach().cpu().numpy()
+    return np.asarray(values)
+
+
+def _object_array(values: List[Any]) -> np.ndarray:
+    # Filling an empty array keeps sequence values, e.g. tuples, as objects
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _axis_pair(value) -> tuple:
+    if not isinstance(value, Iterable):
+        return value, value
+    assert (
+        len(value) == 2
+    ), "The value should have 2 elements, one for x dimension and one for y dimension"
+    return tuple(value)
+
+
+def _points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    # Vectorized `vertice_in_polygon`: a point is in a convex polygon with
+    # clockwise points when it is on the same side of every edge
+    shifted = polygon[None, :, :] - points[:, None, :]
+    following = np.roll(shifted, -1, axis=1)
+    det = (
+        shifted[..., 0] * following[..., 1]
+        - shifted[..., 1] * following[..., 0]
+    )
+    return (det >= 0).all(axis=1)
+
+
+class ArrayLayout:
+    """
+    A columnar alternative to :obj:`Layout` for rectangular blocks. The
+    coordinates, scores, types, texts and reading order indices of all
+    blocks are stored as NumPy arrays, and the geometric operations run on
+    all blocks at once. Blocks are stored as their bounding rectangles.
+
+    Args:
+        coordinates (:obj:`np.ndarray`):
+            An Nx4 array of the `x_1, y_1, x_2, y_2` of each block.
+        scores (:obj:`np.ndarray`, optional):
+            The scores of the blocks, NaN for blocks without score.
+        types (:obj:`np.ndarray`, optional):
+            An object array of the types of the blocks.
+        texts (:obj:`np.ndarray`, optional):
+            An object array of the texts of the blocks.
+        reading_order_indices (:obj:`np.ndarray`, optional):
+            The reading order indices of the blocks, -1 for blocks without
+            one.
+        page_data (Dict, optional):
+            The page related information, as in :obj:`Layout`.
+    """
+
+    def __init__(
+        self,
+        coordinates,
+        scores=None,
+        types=None,
+        texts=None,
+        reading_order_indices=None,
+        *,
+        page_data: Optional[Dict] = None,
+    ):
+        coordinates = _to_numpy(coordinates)
+        if not np.issubdtype(coordinates.dtype, np.floating):
+            coordinates = coordinates.astype(float)
+        self.coordinates = coordinates.reshape(-1, 4)
+
+        num_blocks = len(self.coordinates)
+        self.scores = (
+            np.full(num_blocks, np.nan)
+            if scores is None
+            else _to_numpy(scores).reshape(-1)
+        )
+        self.types = (
+            np.full(num_blocks, None, dtype=object)
+            if types is None
+            else _object_array(list(types))
+        )
+        self.texts = (
+            np.full(num_blocks, None, dtype=object)
+            if texts is None
+            else _object_array(list(texts))
+        )
+        self.reading_order_indices = (
+            np.full(num_blocks, -1, dtype=np.int64)
+            if reading_order_indices is None
+            else _to_numpy(reading_order_indices).astype(np.int64)
+        )
+        self.page_data = page_data or {}
+
+        for name in ["scores", "types", "texts", "reading_order_indices"]:
+            if len(getattr(self, name)) != num_blocks:
+                raise ValueError(
+                    f"Expected {num_blocks} {name}, got "
+                    f"{len(getattr(self, name))}."
+                )
+
+    @classmethod
+    def from_tensors(
+        cls,
+        boxes,
+        scores=None,
+        classes=None,
+        label_map: Optional[Dict] = None,
+        page_data: Optional[Dict] = None,
+    ) -> "ArrayLayout":
+        """
+        Create a layout from the boxes, scores and class ids predicted by a
+        detection model, as tensors or arrays. Class ids are mapped to types
+        with `label_map`, keeping the ids missing from it.
+        """
+        types = None
+        if classes is not None:
+            classes = _to_numpy(classes).reshape(-1)
+            label_map = label_map or {}
+            unique_classes, inverse = np.unique(classes, return_inverse=True)
+            unique_types = _object_array(
+                [
+                    label_map.get(label, label)
+                    for label in unique_classes.tolist()
+                ]
+            )
+            types = unique_types[inverse.reshape(-1)]
+        return cls(boxes, scores, types, page_data=page_data)
+
+    @classmethod
+    def from_layout(cls, layout: Union[Layout, List]) -> "ArrayLayout":
+        """
+        Create a columnar layout from the blocks of a :obj:`Layout`.
+        """
+        blocks = list(layout)
+        coordinates = np.array(
+            [block.coordinates for block in blocks], dtype=float
+        ).reshape(-1, 4)
+
+        scores, types, texts, reading_order_indices = [], [], [], []
+        for block in blocks:
+            score = getattr(block, "score", None)
+            scores.append(np.nan if score is None else score)
+            types.append(getattr(block, "type", None))
+            texts.append(getattr(block, "text", None))
+            index = getattr(block, "reading_order_index", None)
+            reading_order_indices.append(-1 if index is None else index)
+
+        return cls(
+            coordinates,
+            np.array(scores, dtype=float),
+            types,
+            texts,
+            np.array(reading_order_indices, dtype=np.int64),
+            page_data=getattr(layout, "page_data", None),
+        )
+
+    def _block(self, index: int, coordinates, score, index_in_order):
+        return LayoutBlock(
+            Rectangle(*coordinates),
+            text=self.texts[index],
+            type=self.types[index],
+            score=None if np.isnan(score) else score,
+            reading_order_index=(
+                None if index_in_order < 0 else index_in_order
+            ),
+        )
+
+    def to_layout(self) -> Layout:
+        """
+        Convert to a :obj:`Layout` of :obj:`LayoutBlock` of rectangles.
+        """
+        return Layout(
+            [
+                self._block(index, coordinates, score, index_in_order)
+                for index, (coordinates, score, index_in_order) in enumerate(
+                    zip(
+                        self.coordinates.tolist(),
+                        self.scores.tolist(),
+                        self.reading_order_indices.tolist(),
+                    )
+                )
+            ],
+            page_data=self.page_data,
+        )
+
+    def __len__(self) -> int:
+        return len(self.coordinates)
+
+    def __iter__(self) -> Iterator[LayoutBlock]:
+        return iter(self.to_layout())
+
+    def __getitem__(self, key) -> Union[LayoutBlock, "ArrayLayout"]:
+        """
+        Get a block by its index, or a layout of the blocks selected by a
+        slice, an index array or a boolean mask.
+        """
+        if isinstance(key, (int, np.integer)):
+            return self._block(
+                key,
+                self.coordinates[key].tolist(),
+                self.scores[key].item(),
+                self.reading_order_indices[key].item(),
+            )
+        return self._with(
+            self.coordinates[key],
+            scores=self.scores[key],
+            types=self.types[key],
+            texts=self.texts[key],
+            reading_order_indices=self.reading_order_indices[key],
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ArrayLayout):
+            return False
+        return (
+            np.array_equal(self.coordinates, other.coordinates)
+            and np.array_equal(self.scores, other.scores, equal_nan=True)
+            and np.array_equal(self.types, other.types)
+            and np.array_equal(self.texts, other.texts)
+            and np.array_equal(
+                self.reading_order_indices, other.reading_order_indices
+            )
+            and self.page_data == other.page_data
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({len(self)} blocks, page_data={self.page_data})"
+
+    def _with(self, coordinates, **columns) -> "ArrayLayout":
+        # A layout of new coordinates sharing the other columns
+        return self.__class__(
+            coordinates,
+            columns.get("scores", self.scores),
+            columns.get("types", self.types),
+            columns.get("texts", self.texts),
+            columns.get("reading_order_indices", self.reading_order_indices),
+            page_data=self.page_data,
+        )
+
+    @property
+    def centers(self) -> np.ndarray:
+        """
+        An Nx2 array of the centers of the blocks.
+        """
+        return (self.coordinates[:, :2] + self.coordinates[:, 2:]) / 2.0
+
+    @property
+    def areas(self) -> np.ndarray:
+        widths = self.coordinates[:, 2] - self.coordinates[:, 0]
+        heights = self.coordinates[:, 3] - self.coordinates[:, 1]
+        return widths * heights
+
+    def pad(
+        self, left=0, right=0, top=0, bottom=0, safe_mode=True
+    ) -> "ArrayLayout":
+        """
+        Pad all blocks as :meth:`Rectangle.pad` does.
+        """
+        coordinates = self.coordinates + np.array(
+            [-left, -top, right, bottom], dtype=self.coordinates.dtype
+        )
+        if safe_mode:
+            coordinates[:, :2] = np.maximum(coordinates[:, :2], 0)
+        return self._with(coordinates)
+
+    def shift(self, shift_distance) -> "ArrayLayout":
+        """
+        Shift all blocks as :meth:`Rectangle.shift` does.
+        """
+        shift_x, shift_y = _axis_pair(shift_distance)
+        return self._with(
+            self.coordinates + np.array([shift_x, shift_y, shift_x, shift_y])
+        )
+
+    def scale(self, scale_factor) -> "ArrayLayout":
+        """
+        Scale all blocks as :meth:`Rectangle.scale` does.
+        """
+        scale_x, scale_y = _axis_pair(scale_factor)
+        return self._with(
+            self.coordinates * np.array([scale_x, scale_y, scale_x, scale_y])
+        )
+
+    def is_in(self, other, soft_margin={}, center=False) -> np.ndarray:
+        """
+        Whether each block is in `other`, as :meth:`Rectangle.is_in`.
+
+        Returns:
+            :obj:`np.ndarray`: A boolean mask of the blocks in `other`.
+        """
+        if isinstance(other, LayoutBlock):
+            other = other.block
+        if not isinstance(other, BaseCoordElement):
+            raise Exception(f"Invalid input type {other.__class__} for other")
+        other = other.pad(**soft_margin)
+
+        x_1, y_1, x_2, y_2 = self.coordinates.T
+        if isinstance(other, Quadrilateral):
+            if center:
+                return _points_in_polygon(self.centers, other.points)
+            corners = np.stack(
+                [
+                    np.stack([x_1, y_1], axis=1),
+                    np.stack([x_2, y_1], axis=1),
+                    np.stack([x_2, y_2], axis=1),
+                    np.stack([x_1, y_2], axis=1),
+                ],
+                axis=1,
+            )
+            return (
+                _points_in_polygon(corners.reshape(-1, 2), other.points)
+                .reshape(-1, 4)
+                .all(axis=1)
+            )
+
+        if isinstance(other, Interval):
+            axes = [0] if other.axis == "x" else [1]
+            bounds = [(other.start, other.end)]
+        else:
+            axes = [0, 1]
+            bounds = [
+                (max(0, other.x_1), other.x_2),
+                (max(0, other.y_1), other.y_2),
+            ]
+
+        mask = np.ones(len(self), dtype=bool)
+        for axis, (start, end) in zip(axes, bounds):
+            block_start = self.coordinates[:, axis]
+            block_end = self.coordinates[:, axis + 2]
+            if center:
+                block_center = (block_start + block_end) / 2.0
+                mask &= (start <= block_center) & (block_center <= end)
+            else:
+                mask &= (
+                    (start <= block_start)
+                    & (block_start <= block_end)
+                    & (block_end <= end)
+                )
+        return mask
+
+    def filter_by(self, other, soft_margin={}, center=False) -> "ArrayLayout":
+        """
+        Return the blocks that are in `other`.
+        """
+        return self[self.is_in(other, soft_margin, center)]
+
+    def crop_image(self, image: np.ndarray) -> List[np.ndarray]:
+        """
+        Crop the blocks out of an image. The crops are views of the image.
+        """
+        boxes = self.coordinates.astype(int).tolist()
+        return [image[y_1:y_2, x_1:x_2] for x_1, y_1, x_2, y_2 in boxes]
+
+    def get_blocks(self) -> List[LayoutBlock]:
+        return self.to_layout().get_blocks()
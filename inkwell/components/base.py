@@ -17,19 +17,91 @@
 
 from abc import ABC, abstractmethod
 from copy import copy
-from typing import Any, Dict, List
+from operator import attrgetter
+from typing import Any, Dict, List, Tuple
+
+
+def _slot_names(cls) -> Tuple[str, ...]:
+    """The names of the slots of a class and its bases, bases first"""
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(
+            name for name in slots if name not in ("__dict__", "__weakref__")
+        )
+    return tuple(names)
+
+
+def _has_instance_dict(cls) -> bool:
+    """Whether instances of a class have a __dict__ besides their slots"""
+    return any(
+        "__slots__" not in klass.__dict__
+        or "__dict__" in klass.__dict__["__slots__"]
+        for klass in cls.__mro__
+        if klass is not object
+    )
 
 
 class BaseLayoutElement:
+    # Elements store their attributes in slots, so that pages with many
+    # blocks stay small and copies are cheap. The slot names and a getter
+    # of their values are computed once per class.
+    __slots__ = ()
+
+    _slot_names: Tuple[str, ...] = ()
+    _slot_values_getter = staticmethod(lambda obj: ())
+    _has_instance_dict = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._slot_names = _slot_names(cls)
+        cls._has_instance_dict = _has_instance_dict(cls)
+        if len(cls._slot_names) > 1:
+            cls._slot_values_getter = staticmethod(
+                attrgetter(*cls._slot_names)
+            )
+        elif cls._slot_names:
+            cls._slot_values_getter = staticmethod(
+                lambda obj, name=cls._slot_names[0]: (getattr(obj, name),)
+            )
+
+    def _slot_values(self) -> Tuple[Any, ...]:
+        try:
+            return self._slot_values_getter(self)
+        except AttributeError:
+            # Some slots were never assigned
+            return tuple(
+                getattr(self, name, None) for name in self._slot_names
+            )
+
+    def _attributes(self) -> Dict[str, Any]:
+        attributes = dict(zip(self._slot_names, self._slot_values()))
+        if self._has_instance_dict:
+            attributes.update(vars(self))
+        return attributes
+
+    def __copy__(self):
+        cls = self.__class__
+        obj = cls.__new__(cls)
+        for name, value in zip(self._slot_names, self._slot_values()):
+            setattr(obj, name, value)
+        if self._has_instance_dict:
+            obj.__dict__.update(vars(self))
+        return obj
+
     def set(self, inplace=False, **kwargs):
 
         obj = self if inplace else copy(self)
-        var_dict = vars(obj)
+        attributes = obj._slot_names
+        if obj._has_instance_dict:
+            attributes = set(attributes) | set(vars(obj))
         for key, val in kwargs.items():
-            if key in var_dict:
-                var_dict[key] = val
-            elif f"_{key}" in var_dict:
-                var_dict[f"_{key}"] = val
+            if key in attributes:
+                setattr(obj, key, val)
+            elif f"_{key}" in attributes:
+                setattr(obj, f"_{key}", val)
             else:
                 raise ValueError(f"Unknown attribute name: {key}")
 
@@ -38,7 +110,7 @@ class BaseLayoutElement:
     def __repr__(self):
 
         info_str = ", ".join(
-            [f"{key}={val}" for key, val in vars(self).items()]
+            [f"{key}={val}" for key, val in self._attributes().items()]
         )
         return f"{self.__class__.__name__}({info_str})"
 
@@ -46,11 +118,19 @@ class BaseLayoutElement:
 
         if other.__class__ is not self.__class__:
             return False
+        if not self._has_instance_dict:
+            getter = self._slot_values_getter
+            try:
+                return getter(self) == getter(other)
+            except AttributeError:
+                pass
 
-        return vars(self) == vars(other)
+        return self._attributes() == other._attributes()
 
 
 class BaseCoordElement(ABC, BaseLayoutElement):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def _name(self) -> str:
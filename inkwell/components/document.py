@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Any, Optional
 
 import numpy as np
 
@@ -14,6 +15,13 @@ class PageImage:
     page_image: np.ndarray
     page_number: int
     page_layout: Layout
+    # Source PDF page, kept to re-render regions at other resolutions
+    pdf_page: Optional[Any] = None
+    # Resolution of page_image in DPI, None for images that are not PDFs
+    resolution: Optional[int] = None
+    # Source PDF document, set on the last page read from it when its pages
+    # are attached, to be closed once that page is done
+    pdf_document: Optional[Any] = None
 
 
 @dataclass
@@ -23,6 +31,11 @@ class PageBlocks:
     table_blocks: list[LayoutBlock]
     text_blocks: list[LayoutBlock]
     page_number: int
+    pdf_page: Optional[Any] = None
+    # Pixels of page_image per unit of the block coordinates
+    image_scale: float = 1.0
+    # PDF points per unit of the block coordinates
+    pdf_scale: Optional[float] = None
 
 
 @dataclass
@@ -117,6 +117,7 @@ class Interval(BaseCoordElement):
 
     _name = "interval"
     _features = ["start", "end", "axis", "canvas_height", "canvas_width"]
+    __slots__ = ("start", "end", "axis", "canvas_height", "canvas_width")
 
     def __init__(
         self, start, end, axis, canvas_height=None, canvas_width=None
@@ -530,6 +531,7 @@ class Rectangle(BaseCoordElement):
 
     _name = "rectangle"
     _features = ["x_1", "y_1", "x_2", "y_2"]
+    __slots__ = ("x_1", "y_1", "x_2", "y_2")
 
     class Config:
         arbitrary_types_allowed = True
@@ -680,11 +682,16 @@ class Rectangle(BaseCoordElement):
                 return other.start <= c <= other.end
 
         elif isinstance(other, Rectangle):
-            x_interval = other.to_interval(axis="x")
-            y_interval = other.to_interval(axis="y")
-            return self.is_in(x_interval, center=center) and self.is_in(
-                y_interval, center=center
-            )
+            # Same as testing against the x and y intervals of other, whose
+            # padding clips the starts at 0, without creating them
+            x_start, y_start = max(0, other.x_1), max(0, other.y_1)
+            if not center:
+                return (
+                    x_start <= self.x_1 <= self.x_2 <= other.x_2
+                    and y_start <= self.y_1 <= self.y_2 <= other.y_2
+                )
+            c_x, c_y = self.center
+            return x_start <= c_x <= other.x_2 and y_start <= c_y <= other.y_2
 
         elif isinstance(other, Quadrilateral):
 
@@ -914,6 +921,7 @@ class Quadrilateral(BaseCoordElement):
 
     _name = "quadrilateral"
     _features = ["points", "height", "width"]
+    __slots__ = ("_points", "_width", "_height")
 
     def __init__(
         self,
@@ -1309,6 +1317,16 @@ class LayoutBlock(BaseLayoutElement):
 
     _name = "layoutblock"
     _features = ["text", "id", "type", "parent", "next", "score"]
+    __slots__ = (
+        "block",
+        "text",
+        "id",
+        "type",
+        "parent",
+        "next",
+        "score",
+        "reading_order_index",
+    )
 
     def __init__(
         self,
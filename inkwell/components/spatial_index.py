@@ -0,0 +1,321 @@
+import math
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from inkwell.components.array_layout import ArrayLayout
+from inkwell.components.base import BaseCoordElement
+from inkwell.components.elements import LayoutBlock
+
+# Pairs of query indices and the indices of the matching indexed boxes
+IndexPairs = Tuple[np.ndarray, np.ndarray]
+
+DEFAULT_NODE_CAPACITY = 16
+
+
+def as_boxes(boxes) -> np.ndarray:
+    """
+    The Nx4 `x_1, y_1, x_2, y_2` array of an array, an
+    :obj:`ArrayLayout`, a :obj:`Layout`, a list of elements or one element.
+    """
+    if isinstance(boxes, ArrayLayout):
+        return boxes.coordinates
+    if isinstance(boxes, (BaseCoordElement, LayoutBlock)):
+        boxes = [boxes]
+    if isinstance(boxes, np.ndarray):
+        return boxes.astype(float, copy=False).reshape(-1, 4)
+    return np.array(
+        [
+            box.coordinates if hasattr(box, "coordinates") else box
+            for box in boxes
+        ],
+        dtype=float,
+    ).reshape(-1, 4)
+
+
+# The helpers below take boxes as 4xN arrays of columns, whose rows are
+# contiguous when gathered with `columns[:, indices]`
+
+
+def _intersects(boxes: np.ndarray, others: np.ndarray) -> np.ndarray:
+    return (
+        (boxes[0] <= others[2])
+        & (others[0] <= boxes[2])
+        & (boxes[1] <= others[3])
+        & (others[1] <= boxes[3])
+    )
+
+
+def _contains(outer: np.ndarray, inner: np.ndarray) -> np.ndarray:
+    return (
+        (outer[0] <= inner[0])
+        & (inner[2] <= outer[2])
+        & (outer[1] <= inner[1])
+        & (inner[3] <= outer[3])
+    )
+
+
+def _box_distance(boxes: np.ndarray, others: np.ndarray) -> np.ndarray:
+    # The distance between the closest points of boxes, 0 when they intersect
+    gap_x = np.maximum(
+        0, np.maximum(boxes[0] - others[2], others[0] - boxes[2])
+    )
+    gap_y = np.maximum(
+        0, np.maximum(boxes[1] - others[3], others[1] - boxes[3])
+    )
+    return np.hypot(gap_x, gap_y)
+
+
+def _max_box_distance(boxes: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    # An upper bound of the distance between a box and any box inside a node
+    gap_x = np.maximum(0, np.maximum(boxes[0] - nodes[0], nodes[2] - boxes[2]))
+    gap_y = np.maximum(0, np.maximum(boxes[1] - nodes[1], nodes[3] - boxes[3]))
+    return np.hypot(gap_x, gap_y)
+
+
+def _columns(boxes: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(boxes.T)
+
+
+def _str_order(boxes: np.ndarray, node_capacity: int) -> np.ndarray:
+    # Sort-Tile-Recursive: sort by x into vertical slices of whole nodes,
+    # then by y within each slice
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    num_nodes = math.ceil(len(boxes) / node_capacity)
+    slice_size = math.ceil(math.sqrt(num_nodes)) * node_capacity
+    slices = np.empty(len(boxes), dtype=np.int64)
+    slices[np.argsort(centers[:, 0], kind="stable")] = (
+        np.arange(len(boxes)) // slice_size
+    )
+    return np.lexsort((centers[:, 1], slices))
+
+
+def _group_starts(keys: np.ndarray) -> np.ndarray:
+    # The start of each run of equal values of sorted keys
+    return np.flatnonzero(np.diff(keys, prepend=-1) != 0)
+
+
+def _expand(
+    queries: np.ndarray, starts: np.ndarray, counts: np.ndarray
+) -> IndexPairs:
+    # Replace every (query, node) pair by the pairs of its children
+    offsets = np.arange(counts.sum()) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    return np.repeat(queries, counts), np.repeat(starts, counts) + offsets
+
+
+class SpatialIndex:
+    """
+    A static R-tree over boxes, packed with Sort-Tile-Recursive. Queries
+    take a batch of query boxes and descend the tree one level at a time
+    for all of them, so that a page of blocks is matched against another
+    in a few NumPy operations instead of a Python loop over pairs.
+
+    Queries return pairs of indices, of the query box and of the matching
+    indexed box, sorted by query and then by indexed box.
+
+    Args:
+        boxes: The boxes to index, as accepted by :func:`as_boxes`.
+        node_capacity (int, optional): The maximal number of children of
+            a node of the tree.
+    """
+
+    def __init__(self, boxes, node_capacity: int = DEFAULT_NODE_CAPACITY):
+        if node_capacity < 2:
+            raise ValueError("node_capacity should be at least 2")
+        self.boxes = as_boxes(boxes)
+        self._node_capacity = node_capacity
+        # Levels from the root down, as the box columns, first child, number
+        # of children and number of indexed boxes of their nodes. The
+        # children of the deepest level are the boxes in self._order.
+        self._levels: List[Tuple[np.ndarray, ...]] = []
+        self._order = np.zeros(0, dtype=np.int64)
+        self._columns = _columns(self.boxes)
+        if len(self.boxes):
+            self._build()
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _build(self):
+        self._order = _str_order(self.boxes, self._node_capacity)
+        child_boxes = self.boxes[self._order]
+        child_sizes = np.ones(len(child_boxes), dtype=np.int64)
+        self._columns = _columns(child_boxes)
+
+        levels = []
+        while True:
+            starts = np.arange(0, len(child_boxes), self._node_capacity)
+            counts = np.minimum(self._node_capacity, len(child_boxes) - starts)
+            node_boxes = np.column_stack(
+                [
+                    np.minimum.reduceat(child_boxes[:, 0], starts),
+                    np.minimum.reduceat(child_boxes[:, 1], starts),
+                    np.maximum.reduceat(child_boxes[:, 2], starts),
+                    np.maximum.reduceat(child_boxes[:, 3], starts),
+                ]
+            )
+            node_sizes = np.add.reduceat(child_sizes, starts)
+            if len(node_boxes) <= self._node_capacity:
+                levels.append(
+                    (_columns(node_boxes), starts, counts, node_sizes)
+                )
+                break
+
+            # Nodes are reordered so that the children of the nodes of the
+            # next level are contiguous and close to each other
+            order = _str_order(node_boxes, self._node_capacity)
+            child_boxes, child_sizes = node_boxes[order], node_sizes[order]
+            levels.append(
+                (
+                    _columns(child_boxes),
+                    starts[order],
+                    counts[order],
+                    child_sizes,
+                )
+            )
+
+        self._levels = levels[::-1]
+
+    def _candidates(
+        self,
+        num_queries: int,
+        node_filter: Callable[
+            [np.ndarray, np.ndarray, np.ndarray], np.ndarray
+        ],
+    ) -> IndexPairs:
+        # Descend the tree, keeping the (query, node) pairs that pass
+        # node_filter(query indices, node box columns, node sizes). Returns
+        # the query indices and positions in self._order of the candidates.
+        if not len(self.boxes) or not num_queries:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        num_roots = len(self._levels[0][1])
+        query_indices = np.repeat(np.arange(num_queries), num_roots)
+        nodes = np.tile(np.arange(num_roots), num_queries)
+        for node_columns, starts, counts, node_sizes in self._levels:
+            keep = node_filter(
+                query_indices, node_columns[:, nodes], node_sizes[nodes]
+            )
+            query_indices, nodes = query_indices[keep], nodes[keep]
+            query_indices, nodes = _expand(
+                query_indices, starts[nodes], counts[nodes]
+            )
+        return query_indices, nodes
+
+    def _query(self, query_boxes, node_relation, item_relation) -> IndexPairs:
+        queries = _columns(as_boxes(query_boxes))
+        query_indices, positions = self._candidates(
+            queries.shape[1],
+            lambda indices, nodes, _: node_relation(
+                queries[:, indices], nodes
+            ),
+        )
+        keep = item_relation(
+            queries[:, query_indices], self._columns[:, positions]
+        )
+        query_indices = query_indices[keep]
+        items = self._order[positions[keep]]
+        order = np.argsort(query_indices * len(self.boxes) + items)
+        return query_indices[order], items[order]
+
+    def intersecting(self, query_boxes) -> IndexPairs:
+        """
+        The indexed boxes that intersect each query box, edges included.
+        """
+        return self._query(query_boxes, _intersects, _intersects)
+
+    def contained_in(self, query_boxes, center: bool = False) -> IndexPairs:
+        """
+        The indexed boxes inside each query box, or whose center is inside
+        it with `center=True`.
+        """
+        if not center:
+            return self._query(query_boxes, _intersects, _contains)
+
+        def center_in(queries, boxes):
+            centers = (boxes[:2] + boxes[2:]) / 2
+            return _contains(queries, np.vstack([centers, centers]))
+
+        return self._query(query_boxes, _intersects, center_in)
+
+    def containing(self, query_boxes) -> IndexPairs:
+        """
+        The indexed boxes that contain each query box. Points are queried as
+        boxes of zero size.
+        """
+
+        def contains_query(queries, boxes):
+            return _contains(boxes, queries)
+
+        return self._query(query_boxes, contains_query, contains_query)
+
+    def nearest(
+        self, query_boxes, k: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k indexed boxes nearest to each query box, by the distance
+        between their closest points.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The QxK indices of the nearest
+            boxes, closest first, and their distances. Queries with fewer
+            than k boxes are padded with -1 and inf.
+        """
+        queries = _columns(as_boxes(query_boxes))
+        num_queries = queries.shape[1]
+        indices = np.full((num_queries, k), -1, dtype=np.int64)
+        distances = np.full((num_queries, k), np.inf)
+        if k < 1:
+            return indices, distances
+
+        def node_filter(query_indices, nodes, node_sizes):
+            # A query's k nearest boxes are no farther than the smallest
+            # bound within which its nodes hold k boxes, so nodes nearer
+            # than that bound are kept
+            min_distances = _box_distance(queries[:, query_indices], nodes)
+            max_distances = _max_box_distance(queries[:, query_indices], nodes)
+            order = np.lexsort((max_distances, query_indices))
+            sorted_queries = query_indices[order]
+            sorted_sizes = node_sizes[order]
+            sizes = np.cumsum(sorted_sizes)
+            group_starts = _group_starts(sorted_queries)
+            sizes -= np.repeat(
+                sizes[group_starts] - sorted_sizes[group_starts],
+                np.diff(np.r_[group_starts, len(order)]),
+            )
+            reached = np.flatnonzero(sizes >= k)
+            bounds = np.full(num_queries, np.inf)
+            first_queries, first = np.unique(
+                sorted_queries[reached], return_index=True
+            )
+            bounds[first_queries] = max_distances[order][reached[first]]
+            return min_distances <= bounds[query_indices]
+
+        query_indices, positions = self._candidates(num_queries, node_filter)
+        items = self._order[positions]
+        item_distances = _box_distance(
+            queries[:, query_indices], self._columns[:, positions]
+        )
+        order = np.lexsort((items, item_distances, query_indices))
+        query_indices = query_indices[order]
+        group_starts = _group_starts(query_indices)
+        ranks = np.arange(len(order)) - np.repeat(
+            group_starts, np.diff(np.r_[group_starts, len(order)])
+        )
+        keep = ranks < k
+        indices[query_indices[keep], ranks[keep]] = items[order][keep]
+        distances[query_indices[keep], ranks[keep]] = item_distances[order][
+            keep
+        ]
+        return indices, distances
+
+    @staticmethod
+    def group(pairs: IndexPairs, num_queries: int) -> List[np.ndarray]:
+        """
+        Split index pairs into the indexed boxes matching each query.
+        """
+        query_indices, items = pairs
+        bounds = np.searchsorted(query_indices, np.arange(1, num_queries))
+        return np.split(items, bounds)
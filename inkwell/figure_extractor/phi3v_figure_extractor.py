@@ -21,6 +21,10 @@ class Phi3VFigureExtractor(BaseFigureExtractor):
     def model_id(self) -> str:
         return FigureExtractorType.PHI3_VISION.value
 
+    @property
+    def config_id(self) -> str:
+        return self._ocr_client.config_id
+
     def process(self, image_batch: list[np.ndarray]) -> list[dict]:
         _logger.info("Running Phi3 Vision Figure Extractor")
         result = self._ocr_client.process(
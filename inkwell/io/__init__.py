@@ -1,9 +1,11 @@
 from inkwell.io.input import (
     convert_page_to_image,
+    iter_pdf_pages,
     read_image,
     read_pdf_as_images,
     read_pdf_document,
     read_pdf_pages,
+    render_page_region,
 )
 
 __all__ = [
@@ -11,5 +13,7 @@ __all__ = [
     "read_pdf_document",
     "read_pdf_as_images",
     "read_pdf_pages",
+    "iter_pdf_pages",
     "convert_page_to_image",
+    "render_page_region",
 ]
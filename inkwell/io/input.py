@@ -1,9 +1,12 @@
 import logging
+import multiprocessing
 import urllib.error
 import urllib.parse
 import urllib.request
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from typing import List
+from typing import Collection, Iterator, List, Optional, Union
 
 import cv2
 import numpy as np
@@ -19,6 +22,13 @@ HEADERS = {
             Chrome/58.0.3029.110 Safari/537.3"
 }
 
+DEFAULT_PAGE_RESOLUTION = 512
+DEFAULT_RASTERIZATION_CHUNK_SIZE = 4
+PDF_POINTS_PER_INCH = 72
+
+# Document handle opened once per rasterization worker process
+_worker_document: Optional[pdfplumber.pdf.PDF] = None
+
 
 def _is_url(path: str) -> bool:
     parsed_url = urllib.parse.urlparse(path)
@@ -58,6 +68,23 @@ def read_image(image_path: str) -> np.ndarray:
     return image
 
 
+def _load_pdf_source(pdf_path: str) -> Union[str, bytes]:
+    if not _is_url(pdf_path):
+        return pdf_path
+    try:
+        req = urllib.request.Request(pdf_path, headers=HEADERS)
+        with urllib.request.urlopen(req) as response:
+            return response.read()
+    except urllib.error.URLError as e:
+        raise ValueError(f"Error downloading PDF from URL: {e}") from e
+
+
+def _open_pdf_source(source: Union[str, bytes]) -> pdfplumber.pdf.PDF:
+    if isinstance(source, bytes):
+        return pdfplumber.open(BytesIO(source))
+    return pdfplumber.open(source)
+
+
 def read_pdf_document(pdf_path: str) -> pdfplumber.pdf.PDF:
     """
     Read a PDF document from a file or a URL.
@@ -69,24 +96,48 @@ def read_pdf_document(pdf_path: str) -> pdfplumber.pdf.PDF:
         pdfplumber.pdf.PDF: The PDF document.
     """
     _logger.debug("Reading PDF from %s", pdf_path)
-    if _is_url(pdf_path):
-        try:
-            req = urllib.request.Request(pdf_path, headers=HEADERS)
-            with urllib.request.urlopen(req) as response:
-                pdf_content = BytesIO(response.read())
-                document = pdfplumber.open(pdf_content)
-        except urllib.error.URLError as e:
-            raise ValueError(f"Error downloading PDF from URL: {e}") from e
-    else:
-        document = pdfplumber.open(pdf_path)
-    return document
+    return _open_pdf_source(_load_pdf_source(pdf_path))
 
 
-def convert_page_to_image(page: pdfplumber.pdf.Page) -> np.ndarray:
-    image = page.to_image(resolution=512).original
+def convert_page_to_image(
+    page: pdfplumber.pdf.Page, resolution: int = DEFAULT_PAGE_RESOLUTION
+) -> np.ndarray:
+    image = page.to_image(resolution=resolution).original
     return np.array(image)
 
 
+def render_page_region(
+    page: pdfplumber.pdf.Page,
+    bbox: tuple[float, float, float, float],
+    resolution: int = DEFAULT_PAGE_RESOLUTION,
+) -> np.ndarray:
+    """
+    Render a region of a PDF page.
+
+    Args:
+        page (pdfplumber.pdf.Page): The PDF page.
+        bbox (tuple): The region as (x_1, y_1, x_2, y_2) in PDF points,
+            relative to the top left corner of the page.
+        resolution (int, optional): The resolution to render at, in DPI.
+
+    Returns:
+        np.ndarray: The rendered region.
+    """
+    page_x, page_y, page_x_2, page_y_2 = page.bbox
+    x_1, y_1, x_2, y_2 = bbox
+    region = (
+        min(max(page_x + x_1, page_x), page_x_2),
+        min(max(page_y + y_1, page_y), page_y_2),
+        min(max(page_x + x_2, page_x), page_x_2),
+        min(max(page_y + y_2, page_y), page_y_2),
+    )
+    if region[2] <= region[0] or region[3] <= region[1]:
+        return np.zeros((0, 0, 3), dtype=np.uint8)
+
+    image = page.crop(region).to_image(resolution=resolution).original
+    return np.array(image.convert("RGB"))
+
+
 def read_pdf_as_images(pdf_path: str) -> list[np.ndarray]:
     """
     Read a PDF document as a list of images.
@@ -110,32 +161,210 @@ def _is_native_pdf(path: str) -> bool:
     return path.endswith(".pdf")
 
 
-def _preprocess_native_pdf(document, pages_to_parse: List[int] = None):
-    pages = document.pages
-
-    if pages_to_parse is not None:
-        pages = [page for i, page in enumerate(pages) if i in pages_to_parse]
-
-    pages = [(convert_page_to_image(page), page.page_number) for page in pages]
-
-    return pages
+def _iter_native_pdf(
+    document: pdfplumber.pdf.PDF,
+    pages_to_parse: List[int] = None,
+    resolution: int = DEFAULT_PAGE_RESOLUTION,
+) -> Iterator[tuple[np.ndarray, pdfplumber.pdf.Page]]:
+    pages_to_parse = (
+        set(pages_to_parse) if pages_to_parse is not None else None
+    )
+
+    for i, page in enumerate(document.pages):
+        if pages_to_parse is not None and i not in pages_to_parse:
+            continue
+        image = convert_page_to_image(page, resolution)
+        # Drop the parsed page objects so that only the raster is retained
+        page.close()
+        yield image, page
+
+
+def _init_rasterization_worker(source: Union[str, bytes]):
+    global _worker_document  # pylint: disable=global-statement
+    _worker_document = _open_pdf_source(source)
+
+
+def _rasterize_page_chunk(
+    page_indices: list[int], resolution: int = DEFAULT_PAGE_RESOLUTION
+) -> list[tuple[np.ndarray, int]]:
+    results = []
+    for i in page_indices:
+        page = _worker_document.pages[i]
+        results.append((convert_page_to_image(page, resolution), i))
+        page.close()
+    return results
+
+
+def _iter_native_pdf_parallel(
+    document: pdfplumber.pdf.PDF,
+    source: Union[str, bytes],
+    pages_to_parse: List[int] = None,
+    resolution: int = DEFAULT_PAGE_RESOLUTION,
+    num_workers: int = 2,
+    chunk_size: int = DEFAULT_RASTERIZATION_CHUNK_SIZE,
+) -> Iterator[tuple[np.ndarray, pdfplumber.pdf.Page]]:
+    num_pages = len(document.pages)
+    if pages_to_parse is None:
+        page_indices = list(range(num_pages))
+    else:
+        page_indices = sorted(set(pages_to_parse) & set(range(num_pages)))
+
+    chunks = iter(
+        [
+            page_indices[i : i + chunk_size]
+            for i in range(0, len(page_indices), chunk_size)
+        ]
+    )
+
+    # Spawned workers avoid inheriting torch/CUDA state from the parent
+    executor = ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_rasterization_worker,
+        initargs=(source,),
+    )
+    try:
+        # Keep a bounded number of chunks in flight so that rendered pages
+        # do not pile up when the consumer is slower than the workers
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(
+                executor.submit(_rasterize_page_chunk, chunk, resolution)
+            )
+            if len(in_flight) >= 2 * num_workers:
+                break
+
+        while in_flight:
+            results = in_flight.popleft().result()
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                in_flight.append(
+                    executor.submit(
+                        _rasterize_page_chunk, next_chunk, resolution
+                    )
+                )
+            for image, page_index in results:
+                yield image, document.pages[page_index]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf_pages(
+    document_path: str,
+    pages_to_parse: List[int] = None,
+    num_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_RASTERIZATION_CHUNK_SIZE,
+    resolution: int = DEFAULT_PAGE_RESOLUTION,
+    attach_pdf_pages: bool = False,
+    skip_page_numbers: Optional[Collection[int]] = None,
+) -> Iterator[PageImage]:
+    """
+    Lazily read the pages of a document as page images.
 
+    Pages are rendered as the iterator is consumed, so only the pages held
+    by the caller are kept in memory. With `num_workers` greater than one,
+    PDF pages are rendered by a pool of worker processes, each with its own
+    document handle, and are still yielded in page order.
 
-def read_pdf_pages(document_path: str, pages_to_parse: List[int] = None):
-    if _is_native_pdf(document_path):
-        document = read_pdf_document(document_path)
-        pages = _preprocess_native_pdf(document, pages_to_parse)
+    Args:
+        document_path (str): The path to the PDF/image file or URL.
+        pages_to_parse (List[int], optional): Zero-based indices of the
+            pages to read. Defaults to all pages.
+        num_workers (int, optional): Number of rasterization processes.
+            Defaults to rendering in the calling process.
+        chunk_size (int, optional): Number of pages rendered per worker
+            task.
+        resolution (int, optional): The resolution PDF pages are rendered
+            at, in DPI.
+        attach_pdf_pages (bool, optional): Whether to attach the pdfplumber
+            page to each page image, so that regions of it can be
+            re-rendered later. The document is then left open and attached
+            as `pdf_document` to the last page read, for the caller to close
+            once it is done with the pages.
+        skip_page_numbers (Collection[int], optional): Page numbers of pages
+            not to read, e.g. pages that were already processed.
+
+    Yields:
+        PageImage: The page image with its page number and no layout.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size should be a positive integer")
+
+    skip_page_numbers = set(skip_page_numbers or ())
+    if not _is_native_pdf(document_path):
+        if 1 in skip_page_numbers:
+            return
+        yield PageImage(
+            page_image=read_image(document_path),
+            page_number=1,
+            page_layout=None,
+        )
+        return
+
+    source = _load_pdf_source(document_path)
+    document = _open_pdf_source(source)
+    if skip_page_numbers:
+        if pages_to_parse is None:
+            pages_to_parse = range(len(document.pages))
+        pages_to_parse = [
+            i for i in pages_to_parse if i + 1 not in skip_page_numbers
+        ]
+    page_indices = sorted(
+        set(range(len(document.pages)))
+        if pages_to_parse is None
+        else set(pages_to_parse) & set(range(len(document.pages)))
+    )
+    last_page_number = page_indices[-1] + 1 if page_indices else None
+    if num_workers is not None and num_workers > 1:
+        _logger.debug(
+            "Rasterizing %s with %d workers", document_path, num_workers
+        )
+        pages = _iter_native_pdf_parallel(
+            document,
+            source,
+            pages_to_parse,
+            resolution=resolution,
+            num_workers=num_workers,
+            chunk_size=chunk_size,
+        )
     else:
-        pages = [(read_image(document_path), 1)]
-
-    page_images = []
-    for page in pages:
-        page_image, page_number = page
-        page_images.append(
-            PageImage(
+        pages = _iter_native_pdf(document, pages_to_parse, resolution)
+
+    handed_over = False
+    try:
+        for page_image, page in pages:
+            # Attached pages may still be used after the iterator is
+            # exhausted, e.g. by a partially filled last window, so the
+            # document goes with the last page
+            handed_over = (
+                attach_pdf_pages and page.page_number == last_page_number
+            )
+            yield PageImage(
                 page_image=page_image,
-                page_number=page_number,
+                page_number=page.page_number,
                 page_layout=None,
+                pdf_page=page if attach_pdf_pages else None,
+                resolution=resolution,
+                pdf_document=document if handed_over else None,
             )
+    finally:
+        if not handed_over:
+            document.close()
+
+
+def read_pdf_pages(
+    document_path: str,
+    pages_to_parse: List[int] = None,
+    num_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_RASTERIZATION_CHUNK_SIZE,
+    resolution: int = DEFAULT_PAGE_RESOLUTION,
+) -> list[PageImage]:
+    return list(
+        iter_pdf_pages(
+            document_path,
+            pages_to_parse,
+            num_workers=num_workers,
+            chunk_size=chunk_size,
+            resolution=resolution,
         )
-    return page_images
+    )
@@ -0,0 +1,66 @@
+import math
+from collections import defaultdict
+from typing import Optional
+
+# Detectron2 backbones with FPN pad batched images to a multiple of this
+DEFAULT_SIZE_DIVISIBILITY = 32
+
+
+def resized_shape(
+    height: int, width: int, min_size: int, max_size: int
+) -> tuple[int, int]:
+    """
+    Shape of an image after resizing its shortest edge to `min_size` while
+    keeping its longest edge within `max_size`, as done by Detectron2's
+    ResizeShortestEdge at inference.
+    """
+    scale = min_size / min(height, width)
+    if max(height, width) * scale > max_size:
+        scale = max_size / max(height, width)
+    return int(height * scale + 0.5), int(width * scale + 0.5)
+
+
+def padded_shape(
+    shape: tuple[int, int], size_divisibility: int = DEFAULT_SIZE_DIVISIBILITY
+) -> tuple[int, int]:
+    return tuple(
+        math.ceil(size / size_divisibility) * size_divisibility
+        for size in shape
+    )
+
+
+def make_size_batches(
+    shapes: list[tuple[int, int]],
+    pixel_budget: int,
+    max_batch_size: Optional[int] = None,
+    size_divisibility: int = DEFAULT_SIZE_DIVISIBILITY,
+) -> list[list[int]]:
+    """
+    Group images into batches of images with the same padded shape, so that
+    no batch wastes pixels on padding. Each batch holds as many images as
+    fit in `pixel_budget`, and at least one.
+
+    Args:
+        shapes (list[tuple[int, int]]): The model input shape of each
+            image, i.e. after resizing.
+        pixel_budget (int): The maximum number of pixels of a batch.
+        max_batch_size (int, optional): The maximum number of images of a
+            batch.
+        size_divisibility (int, optional): The multiple the model pads
+            image sizes to.
+
+    Returns:
+        list[list[int]]: The indices of the images of each batch.
+    """
+    buckets = defaultdict(list)
+    for index, shape in enumerate(shapes):
+        buckets[padded_shape(shape, size_divisibility)].append(index)
+
+    batches = []
+    for (height, width), indices in buckets.items():
+        batch_size = max(1, pixel_budget // (height * width))
+        if max_batch_size is not None:
+            batch_size = min(batch_size, max_batch_size)
+        for i in range(0, len(indices), batch_size):
+            batches.append(indices[i : i + batch_size])
+    return batches
@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import os
+import warnings
+from collections import OrderedDict
+from enum import Enum
+from pathlib import Path
+from typing import Any, Union
+
+import torch
+from torch import nn
+
+from inkwell.utils.download import get_cache_directory
+from inkwell.utils.files import atomic_write_path
+
+_logger = logging.getLogger(__name__)
+
+COMPILED_MODELS_DIR = "compiled_models"
+# Inductor reads its cache directory from this variable only
+INDUCTOR_CACHE_DIR_VARIABLE = "TORCHINDUCTOR_CACHE_DIR"
+# Number of input shapes whose traced backbone is kept in memory
+TRACED_SHAPES_CACHE_SIZE = 8
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class CompileMode(Enum):
+    # TorchScript trace of the backbone, one per input shape
+    TRACE = "trace"
+    # torch.compile of the backbone, with a persistent Inductor cache
+    COMPILE = "compile"
+
+
+def hash_files(*paths: Union[str, Path]) -> str:
+    """
+    Hash the contents of files, e.g. the weights and config of a model.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as model_file:
+            for chunk in iter(lambda: model_file.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compiled_models_directory(model_name: str, model_hash: str) -> Path:
+    """
+    The directory of the compiled artifacts of a model. Artifacts are
+    keyed by the hash of the model files and the torch version, so a
+    changed model or torch never loads stale artifacts.
+    """
+    return (
+        get_cache_directory()
+        / COMPILED_MODELS_DIR
+        / model_name
+        / f"{model_hash[:16]}-torch{torch.__version__}"
+    )
+
+
+class _ImageBackbone(nn.Module):
+    """
+    Calls a backbone that takes its images in a dict, as the LayoutLMv3
+    backbone does, with a plain tensor that can be traced.
+    """
+
+    def __init__(self, backbone: nn.Module):
+        super().__init__()
+        self.backbone = backbone
+
+    def forward(self, images: torch.Tensor) -> dict[str, torch.Tensor]:
+        return self.backbone({"images": images})
+
+
+class TracedBackbone(nn.Module):
+    """
+    A Detectron2 backbone run as TorchScript traces, one per input shape.
+    Traces are saved in `cache_dir`, so that warm processes load them
+    instead of tracing again. Inputs that cannot be traced, such as the
+    text inputs of LayoutLMv3, run the eager backbone.
+
+    Args:
+        backbone (nn.Module): The eager backbone, in eval mode.
+        cache_dir (str or Path): The directory of the saved traces.
+    """
+
+    def __init__(self, backbone: nn.Module, cache_dir: Union[str, Path]):
+        super().__init__()
+        self.backbone = backbone
+        self._cache_dir = Path(cache_dir)
+        self._traced: OrderedDict[tuple, torch.jit.ScriptModule] = (
+            OrderedDict()
+        )
+        self.train(backbone.training)
+
+    @property
+    def size_divisibility(self) -> int:
+        return self.backbone.size_divisibility
+
+    @property
+    def padding_constraints(self) -> dict[str, Any]:
+        return self.backbone.padding_constraints
+
+    def output_shape(self):
+        return self.backbone.output_shape()
+
+    def _trace_path(self, images: torch.Tensor, dict_input: bool) -> Path:
+        shape = "x".join(str(size) for size in images.shape)
+        input_type = "dict" if dict_input else "tensor"
+        return self._cache_dir / (
+            f"backbone-{input_type}-{shape}-{images.device.type}-"
+            f"{str(images.dtype).replace('torch.', '')}.pt"
+        )
+
+    def _load_or_trace(
+        self, images: torch.Tensor, dict_input: bool
+    ) -> torch.jit.ScriptModule:
+        trace_path = self._trace_path(images, dict_input)
+        if trace_path.exists():
+            _logger.info("Loading traced backbone from %s", trace_path)
+            return torch.jit.load(str(trace_path), map_location=images.device)
+
+        _logger.info("Tracing backbone for inputs of shape %s", images.shape)
+        module = _ImageBackbone(self.backbone) if dict_input else self.backbone
+        with torch.no_grad(), warnings.catch_warnings():
+            warnings.simplefilter("ignore", torch.jit.TracerWarning)
+            traced = torch.jit.trace(
+                module, (images,), strict=False, check_trace=False
+            )
+
+        trace_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write_path(trace_path) as tmp_path:
+            torch.jit.save(traced, str(tmp_path))
+        return traced
+
+    def forward(self, x):
+        dict_input = isinstance(x, dict)
+        if dict_input and set(x) != {"images"}:
+            return self.backbone(x)
+        if self.training or torch.is_grad_enabled():
+            return self.backbone(x)
+
+        images = x["images"] if dict_input else x
+        key = (dict_input, tuple(images.shape), images.device, images.dtype)
+        traced = self._traced.get(key)
+        if traced is None:
+            traced = self._traced[key] = self._load_or_trace(
+                images, dict_input
+            )
+            if len(self._traced) > TRACED_SHAPES_CACHE_SIZE:
+                self._traced.popitem(last=False)
+        else:
+            self._traced.move_to_end(key)
+        return traced(images)
+
+
+def compile_backbone(
+    backbone: nn.Module,
+    compile_mode: Union[str, CompileMode],
+    cache_dir: Union[str, Path],
+) -> nn.Module:
+    """
+    Wrap a Detectron2 backbone to run traced or compiled.
+
+    Inductor has no setting for its cache directory other than the
+    `TORCHINDUCTOR_CACHE_DIR` environment variable, which it shares across
+    the process. Compiling sets it to the `inductor` directory of
+    `cache_dir` unless it is already set, e.g. by the user or by an earlier
+    compiled model, in which case that cache is used.
+
+    Args:
+        backbone (nn.Module): The eager backbone, in eval mode.
+        compile_mode (str or CompileMode): How to run the backbone.
+        cache_dir (str or Path): The directory of the compiled artifacts.
+    """
+    compile_mode = CompileMode(compile_mode)
+    if compile_mode == CompileMode.TRACE:
+        return TracedBackbone(backbone, cache_dir)
+
+    # Inductor caches compiled graphs by graph and input shapes, so a warm
+    # process reuses them instead of compiling again
+    inductor_cache_dir = str(Path(cache_dir) / "inductor")
+    current_cache_dir = os.environ.get(INDUCTOR_CACHE_DIR_VARIABLE)
+    if current_cache_dir is None:
+        _logger.info(
+            "Setting %s to %s for this process",
+            INDUCTOR_CACHE_DIR_VARIABLE,
+            inductor_cache_dir,
+        )
+        os.environ[INDUCTOR_CACHE_DIR_VARIABLE] = inductor_cache_dir
+    elif current_cache_dir != inductor_cache_dir:
+        _logger.info(
+            "Using the Inductor cache at %s from %s",
+            current_cache_dir,
+            INDUCTOR_CACHE_DIR_VARIABLE,
+        )
+    return torch.compile(backbone, dynamic=False)
@@ -2,17 +2,25 @@
 
 import logging
 import os
+from collections import defaultdict
 from itertools import batched
 from pathlib import Path
 from typing import Callable, Optional, Union
 
 import numpy as np
 import torch
+import torch.nn.functional as F
 from PIL import Image
 from tqdm import tqdm
 
-from inkwell.components import Layout, LayoutBlock, Rectangle
+from inkwell.components import ArrayLayout, Layout
 from inkwell.layout_detector.base import BaseLayoutDetector, BaseLayoutEngine
+from inkwell.layout_detector.batching import make_size_batches, resized_shape
+from inkwell.layout_detector.compilation import (
+    compile_backbone,
+    compiled_models_directory,
+    hash_files,
+)
 from inkwell.utils.download import download_file, get_cache_directory
 from inkwell.utils.env_utils import (
     is_detectron2_available,
@@ -30,7 +38,56 @@ DETECTRON2_DEFAULT_BATCH_SIZE = 1
 
 
 class BatchPredictor(detectron2.engine.DefaultPredictor):
-    """Run d2 on a list of images."""
+    """Run d2 on a list of images.
+
+    Images of the same shape are copied to the model device as one uint8
+    tensor and converted and resized there in a single batched operation.
+    The model normalizes its inputs itself.
+
+    Args:
+        cfg: The Detectron2 config.
+        pin_memory (bool, optional): Stage batches in pinned host memory so
+            that the copy to a CUDA device is asynchronous.
+    """
+
+    def __init__(self, cfg, pin_memory: bool = False):
+        super().__init__(cfg)
+        self._device = torch.device(cfg.MODEL.DEVICE)
+        self._pin_memory = pin_memory and self._device.type == "cuda"
+
+    def _preprocess(self, images: list[np.ndarray]) -> list[dict]:
+        inputs = [None] * len(images)
+        shape_groups = defaultdict(list)
+        for index, image in enumerate(images):
+            shape_groups[image.shape].append(index)
+
+        for shape, indices in shape_groups.items():
+            height, width = shape[:2]
+            transform = self.aug.get_transform(images[indices[0]])
+
+            batch = torch.from_numpy(np.stack([images[i] for i in indices]))
+            if self._pin_memory:
+                batch = batch.pin_memory()
+            batch = batch.to(self._device, non_blocking=True)
+            if self.input_format == "RGB":
+                batch = batch.flip(-1)
+            batch = batch.permute(0, 3, 1, 2).float()
+            if (transform.new_h, transform.new_w) != (height, width):
+                batch = F.interpolate(
+                    batch,
+                    size=(transform.new_h, transform.new_w),
+                    mode="bilinear",
+                    align_corners=False,
+                    antialias=True,
+                )
+
+            for index, image in zip(indices, batch):
+                inputs[index] = {
+                    "image": image,
+                    "height": height,
+                    "width": width,
+                }
+        return inputs
 
     def __call__(self, images: list[np.ndarray]) -> list[dict]:
         """Run d2 on an image or a list of images.
@@ -39,20 +96,7 @@ class BatchPredictor(detectron2.engine.DefaultPredictor):
             images (list): BGR images of the expected shape: 720x1280
         """
         with torch.no_grad():
-            transformed_images = []
-            for image in images:
-                if self.input_format == "RGB":
-                    image = image[:, :, ::-1]
-                height, width = image.shape[:2]
-                image = self.aug.get_transform(image).apply_image(image)
-                image = torch.from_numpy(
-                    image.astype("float32").transpose(2, 0, 1)
-                )
-                image.to(self.cfg.MODEL.DEVICE)
-                inputs = {"image": image, "height": height, "width": width}
-                transformed_images.append(inputs)
-
-        preds = self.model(transformed_images)
+            preds = self.model(self._preprocess(images))
         return preds
 
 
@@ -82,6 +126,12 @@ class Detectron2LayoutEngine(BaseLayoutEngine):
         device(:obj:`str`, optional):
             Whether to use cuda or cpu devices. If not set, it will
             automatically determine the device to initialize the models on.
+        compile_mode (:obj:`str`, optional):
+            Run the backbone traced with TorchScript (`"trace"`) or
+            compiled with torch.compile (`"compile"`). The artifacts are
+            cached on disk by model hash and input shape. Compiling sets
+            `TORCHINDUCTOR_CACHE_DIR` for the process, unless it is set.
+            Defaults to `None`, running the backbone eagerly.
 
     """
 
@@ -102,6 +152,8 @@ class Detectron2LayoutEngine(BaseLayoutEngine):
         self._model_path = model_path
         self._label_map = label_map
         self._add_architecture_config_method = add_architecture_config_method
+        self._pin_memory = kwargs.pop("pin_memory", False)
+        self._compile_mode = kwargs.pop("compile_mode", None)
 
         if device is None:
             device = "cuda" if is_torch_cuda_available() else "cpu"
@@ -129,24 +181,39 @@ class Detectron2LayoutEngine(BaseLayoutEngine):
         self._cfg = cfg
 
     def _create_model(self):
-        self._model = BatchPredictor(self._cfg)
+        self._model = BatchPredictor(self._cfg, pin_memory=self._pin_memory)
+        if self._compile_mode is not None:
+            self._compile_backbone()
+
+    def _compile_backbone(self):
+        model_hash = hash_files(self._model_path, self._config_path)
+        cache_dir = compiled_models_directory(
+            Path(self._model_path).parent.name, model_hash
+        )
+        model = self._model.model
+        model.backbone = compile_backbone(
+            model.backbone, self._compile_mode, cache_dir
+        )
+
+    def resized_shape(self, height: int, width: int) -> tuple[int, int]:
+        """
+        The shape of an image of the given size at the model input.
+        """
+        return resized_shape(
+            height,
+            width,
+            self._cfg.INPUT.MIN_SIZE_TEST,
+            self._cfg.INPUT.MAX_SIZE_TEST,
+        )
 
     def _gather_output(self, outputs: dict) -> Layout:
         instance_pred = outputs["instances"].to("cpu")
-        layout = Layout()
-        scores = instance_pred.scores.tolist()
-        boxes = instance_pred.pred_boxes.tensor.tolist()
-        labels = instance_pred.pred_classes.tolist()
-
-        for score, box, label in zip(scores, boxes, labels):
-            x_1, y_1, x_2, y_2 = box
-            label = self._label_map.get(label, label)
-            cur_block = LayoutBlock(
-                Rectangle(x_1, y_1, x_2, y_2), type=label, score=score
-            )
-            layout.append(cur_block)
-
-        return layout
+        return ArrayLayout.from_tensors(
+            instance_pred.pred_boxes.tensor,
+            instance_pred.scores,
+            instance_pred.pred_classes,
+            label_map=self._label_map,
+        ).to_layout()
 
     def detect(self, image_batch: list[np.ndarray]) -> list[Layout]:
         """Detect the layout of a given image.
@@ -194,6 +261,10 @@ class Detectron2LayoutDetector(BaseLayoutDetector):
         self._batch_size = kwargs.get(
             "batch_size", DETECTRON2_DEFAULT_BATCH_SIZE
         )
+        # With a pixel budget, pages are batched by their resized shape and
+        # as many as fit in the budget go in a batch, up to max_batch_size
+        self._batch_pixel_budget = kwargs.get("batch_pixel_budget")
+        self._max_batch_size = kwargs.get("max_batch_size")
 
     def _load_model(self, **kwargs):
 
@@ -247,9 +318,29 @@ class Detectron2LayoutDetector(BaseLayoutDetector):
             or `list[Layout]`:
             The detected layout of the input image or list of images.
         """
-        batches = list(batched(image_batch, self._batch_size))
-        preds = []
-        for batch in tqdm(batches, desc="Processing layout detection batches"):
-            preds.extend(self._model.detect(batch))
+        if self._batch_pixel_budget is None:
+            batches = list(batched(image_batch, self._batch_size))
+            preds = []
+            for batch in tqdm(
+                batches, desc="Processing layout detection batches"
+            ):
+                preds.extend(self._model.detect(batch))
+
+            return preds
+
+        images = [self._model.image_loader(image) for image in image_batch]
+        shapes = [
+            self._model.resized_shape(*image.shape[:2]) for image in images
+        ]
+        batches = make_size_batches(
+            shapes, self._batch_pixel_budget, self._max_batch_size
+        )
+        preds = [None] * len(images)
+        for indices in tqdm(
+            batches, desc="Processing layout detection batches"
+        ):
+            layouts = self._model.detect([images[i] for i in indices])
+            for index, layout in zip(indices, layouts):
+                preds[index] = layout
 
         return preds
@@ -3,5 +3,6 @@ from enum import Enum
 
 class LayoutDetectorType(Enum):
     FASTER_RCNN = "faster_rcnn"
+    FASTER_RCNN_ONNX = "faster_rcnn_onnx"
     LAYOUTLMV3 = "layoutlmv3"
     PADDLE = "paddle"
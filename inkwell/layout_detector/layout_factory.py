@@ -2,7 +2,10 @@
 
 from inkwell.layout_detector.base import BaseLayoutDetector
 from inkwell.layout_detector.layout_detector import LayoutDetectorType
-from inkwell.utils.env_utils import is_paddleocr_available
+from inkwell.utils.env_utils import (
+    is_onnxruntime_available,
+    is_paddleocr_available,
+)
 
 
 class LayoutDetectorFactory:
@@ -18,13 +21,24 @@ class LayoutDetectorFactory:
         """
         Get a layout detector based on the type of layout detection engine.
         """
-        from inkwell.layout_detector.faster_rcnn_detector import (
-            FasterRCNNLayoutDetector,
-        )
-        from inkwell.layout_detector.layoutlmv3_detector import LayoutLMv3Detector
         if layout_detector_type == LayoutDetectorType.FASTER_RCNN:
+            from inkwell.layout_detector.faster_rcnn_detector import (  # pylint: disable=import-outside-toplevel
+                FasterRCNNLayoutDetector,
+            )
+
             return FasterRCNNLayoutDetector(**kwargs)
+        if layout_detector_type == LayoutDetectorType.FASTER_RCNN_ONNX:
+            if is_onnxruntime_available():
+                from inkwell.layout_detector.onnx_detector import (  # pylint: disable=import-outside-toplevel
+                    FasterRCNNOnnxLayoutDetector,
+                )
+
+                return FasterRCNNOnnxLayoutDetector(**kwargs)
         if layout_detector_type == LayoutDetectorType.LAYOUTLMV3:
+            from inkwell.layout_detector.layoutlmv3_detector import (  # pylint: disable=import-outside-toplevel
+                LayoutLMv3Detector,
+            )
+
             return LayoutLMv3Detector(**kwargs)
         if layout_detector_type == LayoutDetectorType.PADDLE:
             if is_paddleocr_available():
@@ -5,7 +5,8 @@
 
 import math
 import warnings
-from functools import partial
+from collections import OrderedDict
+from functools import lru_cache, partial
 
 import torch
 import torch.nn as nn
@@ -28,6 +29,139 @@ def _cfg(url="", **kwargs):
     }
 
 
+# Number of distinct window sizes, i.e. page shapes, whose interpolated
+# position biases and embeddings are kept per layer
+POSITION_CACHE_SIZE = 16
+
+
+def _window_size_tuple(window_size):
+    if isinstance(window_size, torch.Tensor):
+        window_size = window_size.tolist()
+    return tuple(int(size) for size in window_size)
+
+
+@lru_cache(maxsize=POSITION_CACHE_SIZE)
+def relative_position_index(window_size, device=None):
+    """
+    Pair-wise relative position index of the tokens of a window, with the
+    cls token first. Only depends on the window size, so it is shared by
+    all layers.
+    """
+    num_relative_distance = (2 * window_size[0] - 1) * (
+        2 * window_size[1] - 1
+    ) + 3
+    coords = torch.stack(
+        torch.meshgrid(
+            [torch.arange(window_size[0]), torch.arange(window_size[1])],
+            indexing="ij",
+        )
+    )  # 2, Wh, Ww
+    coords_flatten = torch.flatten(coords, 1)  # 2, Wh*Ww
+    relative_coords = (
+        coords_flatten[:, :, None] - coords_flatten[:, None, :]
+    )  # 2, Wh*Ww, Wh*Ww
+    relative_coords = relative_coords.permute(
+        1, 2, 0
+    ).contiguous()  # Wh*Ww, Wh*Ww, 2
+    relative_coords[:, :, 0] += window_size[0] - 1  # shift to start from 0
+    relative_coords[:, :, 1] += window_size[1] - 1
+    relative_coords[:, :, 0] *= 2 * window_size[1] - 1
+    index = torch.zeros(
+        size=(window_size[0] * window_size[1] + 1,) * 2,
+        dtype=relative_coords.dtype,
+    )
+    index[1:, 1:] = relative_coords.sum(-1)  # Wh*Ww, Wh*Ww
+    index[0, 0:] = num_relative_distance - 3
+    index[0:, 0] = num_relative_distance - 2
+    index[0, 0] = num_relative_distance - 1
+    return index.to(device)
+
+
+def _relative_position_index_buffer(window_size):
+    # A copy, so that loading a state dict never writes to the cached index
+    return relative_position_index(_window_size_tuple(window_size)).clone()
+
+
+def interpolate_relative_position_bias(
+    relative_position_bias_table, window_size, new_window_size, num_heads
+):
+    """
+    Relative position bias of a window of `new_window_size`, bicubically
+    interpolated from the table learned for `window_size`.
+    Returns a nH, Wh*Ww+1, Wh*Ww+1 tensor.
+    """
+    table = relative_position_bias_table
+    if new_window_size != window_size:
+        new_num_relative_distance = (2 * new_window_size[0] - 1) * (
+            2 * new_window_size[1] - 1
+        ) + 3
+        # new_num_relative_dis 为 所有可能的相对位置选项，包含cls-cls，tok-cls，与cls-tok
+        new_table = F.interpolate(
+            table[:-3, :]
+            .permute(1, 0)
+            .view(
+                1,
+                num_heads,
+                2 * window_size[0] - 1,
+                2 * window_size[1] - 1,
+            ),
+            size=(
+                2 * new_window_size[0] - 1,
+                2 * new_window_size[1] - 1,
+            ),
+            mode="bicubic",
+            align_corners=False,
+        )
+        new_table = new_table.view(
+            num_heads, new_num_relative_distance - 3
+        ).permute(1, 0)
+        table = torch.cat([new_table, table[-3::]], dim=0)
+
+    index = relative_position_index(new_window_size, table.device)
+    bias = table[index.view(-1)].view(
+        new_window_size[0] * new_window_size[1] + 1,
+        new_window_size[0] * new_window_size[1] + 1,
+        -1,
+    )  # Wh*Ww,Wh*Ww,nH
+    return bias.permute(2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
+
+
+class _TensorCache:
+    """
+    Bounded LRU cache of tensors derived from parameters, such as position
+    biases interpolated to a window size. The version counter of the source
+    parameter is part of the key, so updated weights are never served stale
+    values. Nothing is cached while gradients are enabled, as the cached
+    tensors would be part of a graph.
+    """
+
+    def __init__(self, maxsize=POSITION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, source, key, compute):
+        if torch.is_grad_enabled():
+            return compute()
+        key = (
+            key,
+            source.data_ptr(),
+            source._version,
+            source.device,
+            source.dtype,
+        )
+        value = self._entries.get(key)
+        if value is None:
+            value = self._entries[key] = compute()
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
 class DropPath(nn.Module):
     """Drop paths (Stochastic Depth) per sample  (when applied in main path of residual blocks)."""
 
@@ -109,34 +243,9 @@ class Attention(nn.Module):
             # cls to token & token 2 cls & cls to cls
 
             # get pair-wise relative position index for each token inside the window
-            coords_h = torch.arange(window_size[0])
-            coords_w = torch.arange(window_size[1])
-            coords = torch.stack(
-                torch.meshgrid([coords_h, coords_w])
-            )  # 2, Wh, Ww
-            coords_flatten = torch.flatten(coords, 1)  # 2, Wh*Ww
-            relative_coords = (
-                coords_flatten[:, :, None] - coords_flatten[:, None, :]
-            )  # 2, Wh*Ww, Wh*Ww
-            relative_coords = relative_coords.permute(
-                1, 2, 0
-            ).contiguous()  # Wh*Ww, Wh*Ww, 2
-            relative_coords[:, :, 0] += (
-                window_size[0] - 1
-            )  # shift to start from 0
-            relative_coords[:, :, 1] += window_size[1] - 1
-            relative_coords[:, :, 0] *= 2 * window_size[1] - 1
-            relative_position_index = torch.zeros(
-                size=(window_size[0] * window_size[1] + 1,) * 2,
-                dtype=relative_coords.dtype,
+            relative_position_index = _relative_position_index_buffer(
+                window_size
             )
-            relative_position_index[1:, 1:] = relative_coords.sum(
-                -1
-            )  # Wh*Ww, Wh*Ww
-            relative_position_index[0, 0:] = self.num_relative_distance - 3
-            relative_position_index[0:, 0] = self.num_relative_distance - 2
-            relative_position_index[0, 0] = self.num_relative_distance - 1
-
             self.register_buffer(
                 "relative_position_index", relative_position_index
             )
@@ -146,6 +255,7 @@ class Attention(nn.Module):
             self.window_size = None
             self.relative_position_bias_table = None
             self.relative_position_index = None
+        self._relative_position_bias_cache = _TensorCache()
 
         self.attn_drop = nn.Dropout(attn_drop)
         self.proj = nn.Linear(all_head_dim, dim)
@@ -175,96 +285,18 @@ class Attention(nn.Module):
         attn = q @ k.transpose(-2, -1)
 
         if self.relative_position_bias_table is not None:
-            if training_window_size == self.window_size:
-                relative_position_bias = self.relative_position_bias_table[
-                    self.relative_position_index.view(-1)
-                ].view(
-                    self.window_size[0] * self.window_size[1] + 1,
-                    self.window_size[0] * self.window_size[1] + 1,
-                    -1,
-                )  # Wh*Ww,Wh*Ww,nH
-                relative_position_bias = relative_position_bias.permute(
-                    2, 0, 1
-                ).contiguous()  # nH, Wh*Ww, Wh*Ww
-                attn = attn + relative_position_bias.unsqueeze(0)
-            else:
-                training_window_size = tuple(training_window_size.tolist())
-                new_num_relative_distance = (
-                    2 * training_window_size[0] - 1
-                ) * (2 * training_window_size[1] - 1) + 3
-                # new_num_relative_dis 为 所有可能的相对位置选项，包含cls-cls，tok-cls，与cls-tok
-                new_relative_position_bias_table = F.interpolate(
-                    self.relative_position_bias_table[:-3, :]
-                    .permute(1, 0)
-                    .view(
-                        1,
-                        self.num_heads,
-                        2 * self.window_size[0] - 1,
-                        2 * self.window_size[1] - 1,
-                    ),
-                    size=(
-                        2 * training_window_size[0] - 1,
-                        2 * training_window_size[1] - 1,
-                    ),
-                    mode="bicubic",
-                    align_corners=False,
-                )
-                new_relative_position_bias_table = (
-                    new_relative_position_bias_table.view(
-                        self.num_heads, new_num_relative_distance - 3
-                    ).permute(1, 0)
-                )
-                new_relative_position_bias_table = torch.cat(
-                    [
-                        new_relative_position_bias_table,
-                        self.relative_position_bias_table[-3::],
-                    ],
-                    dim=0,
-                )
-
-                # get pair-wise relative position index for each token inside the window
-                coords_h = torch.arange(training_window_size[0])
-                coords_w = torch.arange(training_window_size[1])
-                coords = torch.stack(
-                    torch.meshgrid([coords_h, coords_w])
-                )  # 2, Wh, Ww
-                coords_flatten = torch.flatten(coords, 1)  # 2, Wh*Ww
-                relative_coords = (
-                    coords_flatten[:, :, None] - coords_flatten[:, None, :]
-                )  # 2, Wh*Ww, Wh*Ww
-                relative_coords = relative_coords.permute(
-                    1, 2, 0
-                ).contiguous()  # Wh*Ww, Wh*Ww, 2
-                relative_coords[:, :, 0] += (
-                    training_window_size[0] - 1
-                )  # shift to start from 0
-                relative_coords[:, :, 1] += training_window_size[1] - 1
-                relative_coords[:, :, 0] *= 2 * training_window_size[1] - 1
-                relative_position_index = torch.zeros(
-                    size=(
-                        training_window_size[0] * training_window_size[1] + 1,
-                    )
-                    * 2,
-                    dtype=relative_coords.dtype,
-                )
-                relative_position_index[1:, 1:] = relative_coords.sum(
-                    -1
-                )  # Wh*Ww, Wh*Ww
-                relative_position_index[0, 0:] = new_num_relative_distance - 3
-                relative_position_index[0:, 0] = new_num_relative_distance - 2
-                relative_position_index[0, 0] = new_num_relative_distance - 1
-
-                relative_position_bias = new_relative_position_bias_table[
-                    relative_position_index.view(-1)
-                ].view(
-                    training_window_size[0] * training_window_size[1] + 1,
-                    training_window_size[0] * training_window_size[1] + 1,
-                    -1,
-                )  # Wh*Ww,Wh*Ww,nH
-                relative_position_bias = relative_position_bias.permute(
-                    2, 0, 1
-                ).contiguous()  # nH, Wh*Ww, Wh*Ww
-                attn = attn + relative_position_bias.unsqueeze(0)
+            training_window_size = _window_size_tuple(training_window_size)
+            relative_position_bias = self._relative_position_bias_cache.get(
+                self.relative_position_bias_table,
+                training_window_size,
+                lambda: interpolate_relative_position_bias(
+                    self.relative_position_bias_table,
+                    self.window_size,
+                    training_window_size,
+                    self.num_heads,
+                ),
+            )
+            attn = attn + relative_position_bias.unsqueeze(0)
 
         if rel_pos_bias is not None:
             attn = attn + rel_pos_bias
@@ -380,6 +412,7 @@ class PatchEmbed(nn.Module):
         self.proj = nn.Conv2d(
             in_chans, embed_dim, kernel_size=patch_size, stride=patch_size
         )
+        self._position_embedding_cache = _TensorCache()
 
     def forward(self, x, position_embedding=None, **kwargs):
         # FIXME look at relaxing size constraints
@@ -390,17 +423,24 @@ class PatchEmbed(nn.Module):
 
         if position_embedding is not None:
             # interpolate the position embedding to the corresponding size
-            position_embedding = position_embedding.view(
-                1, self.patch_shape[0], self.patch_shape[1], -1
-            ).permute(0, 3, 1, 2)
-            position_embedding = F.interpolate(
-                position_embedding, size=(Hp, Wp), mode="bicubic"
+            position_embedding = self._position_embedding_cache.get(
+                position_embedding,
+                (Hp, Wp),
+                lambda: self._interpolate_position_embedding(
+                    position_embedding, Hp, Wp
+                ),
             )
             x = x + position_embedding
 
         x = x.flatten(2).transpose(1, 2)
         return x, (Hp, Wp)
 
+    def _interpolate_position_embedding(self, position_embedding, Hp, Wp):
+        position_embedding = position_embedding.view(
+            1, self.patch_shape[0], self.patch_shape[1], -1
+        ).permute(0, 3, 1, 2)
+        return F.interpolate(position_embedding, size=(Hp, Wp), mode="bicubic")
+
 
 class HybridEmbed(nn.Module):
     """CNN Feature Map Embedding
@@ -462,125 +502,27 @@ class RelativePositionBias(nn.Module):
         # cls to token & token 2 cls & cls to cls
 
         # get pair-wise relative position index for each token inside the window
-        coords_h = torch.arange(window_size[0])
-        coords_w = torch.arange(window_size[1])
-        coords = torch.stack(torch.meshgrid([coords_h, coords_w]))  # 2, Wh, Ww
-        coords_flatten = torch.flatten(coords, 1)  # 2, Wh*Ww
-        relative_coords = (
-            coords_flatten[:, :, None] - coords_flatten[:, None, :]
-        )  # 2, Wh*Ww, Wh*Ww
-        relative_coords = relative_coords.permute(
-            1, 2, 0
-        ).contiguous()  # Wh*Ww, Wh*Ww, 2
-        relative_coords[:, :, 0] += window_size[0] - 1  # shift to start from 0
-        relative_coords[:, :, 1] += window_size[1] - 1
-        relative_coords[:, :, 0] *= 2 * window_size[1] - 1
-        relative_position_index = torch.zeros(
-            size=(window_size[0] * window_size[1] + 1,) * 2,
-            dtype=relative_coords.dtype,
-        )
-        relative_position_index[1:, 1:] = relative_coords.sum(
-            -1
-        )  # Wh*Ww, Wh*Ww
-        relative_position_index[0, 0:] = self.num_relative_distance - 3
-        relative_position_index[0:, 0] = self.num_relative_distance - 2
-        relative_position_index[0, 0] = self.num_relative_distance - 1
-
+        relative_position_index = _relative_position_index_buffer(window_size)
         self.register_buffer(
             "relative_position_index", relative_position_index
         )
 
+        self._relative_position_bias_cache = _TensorCache()
+
         # trunc_normal_(self.relative_position_bias_table, std=.02)
 
     def forward(self, training_window_size):
-        if training_window_size == self.window_size:
-            relative_position_bias = self.relative_position_bias_table[
-                self.relative_position_index.view(-1)
-            ].view(
-                self.window_size[0] * self.window_size[1] + 1,
-                self.window_size[0] * self.window_size[1] + 1,
-                -1,
-            )  # Wh*Ww,Wh*Ww,nH
-            relative_position_bias = relative_position_bias.permute(
-                2, 0, 1
-            ).contiguous()  # nH, Wh*Ww, Wh*Ww
-        else:
-            training_window_size = tuple(training_window_size.tolist())
-            new_num_relative_distance = (2 * training_window_size[0] - 1) * (
-                2 * training_window_size[1] - 1
-            ) + 3
-            # new_num_relative_dis 为 所有可能的相对位置选项，包含cls-cls，tok-cls，与cls-tok
-            new_relative_position_bias_table = F.interpolate(
-                self.relative_position_bias_table[:-3, :]
-                .permute(1, 0)
-                .view(
-                    1,
-                    self.num_heads,
-                    2 * self.window_size[0] - 1,
-                    2 * self.window_size[1] - 1,
-                ),
-                size=(
-                    2 * training_window_size[0] - 1,
-                    2 * training_window_size[1] - 1,
-                ),
-                mode="bicubic",
-                align_corners=False,
-            )
-            new_relative_position_bias_table = (
-                new_relative_position_bias_table.view(
-                    self.num_heads, new_num_relative_distance - 3
-                ).permute(1, 0)
-            )
-            new_relative_position_bias_table = torch.cat(
-                [
-                    new_relative_position_bias_table,
-                    self.relative_position_bias_table[-3::],
-                ],
-                dim=0,
-            )
-
-            # get pair-wise relative position index for each token inside the window
-            coords_h = torch.arange(training_window_size[0])
-            coords_w = torch.arange(training_window_size[1])
-            coords = torch.stack(
-                torch.meshgrid([coords_h, coords_w])
-            )  # 2, Wh, Ww
-            coords_flatten = torch.flatten(coords, 1)  # 2, Wh*Ww
-            relative_coords = (
-                coords_flatten[:, :, None] - coords_flatten[:, None, :]
-            )  # 2, Wh*Ww, Wh*Ww
-            relative_coords = relative_coords.permute(
-                1, 2, 0
-            ).contiguous()  # Wh*Ww, Wh*Ww, 2
-            relative_coords[:, :, 0] += (
-                training_window_size[0] - 1
-            )  # shift to start from 0
-            relative_coords[:, :, 1] += training_window_size[1] - 1
-            relative_coords[:, :, 0] *= 2 * training_window_size[1] - 1
-            relative_position_index = torch.zeros(
-                size=(training_window_size[0] * training_window_size[1] + 1,)
-                * 2,
-                dtype=relative_coords.dtype,
-            )
-            relative_position_index[1:, 1:] = relative_coords.sum(
-                -1
-            )  # Wh*Ww, Wh*Ww
-            relative_position_index[0, 0:] = new_num_relative_distance - 3
-            relative_position_index[0:, 0] = new_num_relative_distance - 2
-            relative_position_index[0, 0] = new_num_relative_distance - 1
-
-            relative_position_bias = new_relative_position_bias_table[
-                relative_position_index.view(-1)
-            ].view(
-                training_window_size[0] * training_window_size[1] + 1,
-                training_window_size[0] * training_window_size[1] + 1,
-                -1,
-            )  # Wh*Ww,Wh*Ww,nH
-            relative_position_bias = relative_position_bias.permute(
-                2, 0, 1
-            ).contiguous()  # nH, Wh*Ww, Wh*Ww
-
-        return relative_position_bias
+        training_window_size = _window_size_tuple(training_window_size)
+        return self._relative_position_bias_cache.get(
+            self.relative_position_bias_table,
+            training_window_size,
+            lambda: interpolate_relative_position_bias(
+                self.relative_position_bias_table,
+                self.window_size,
+                training_window_size,
+                self.num_heads,
+            ),
+        )
 
 
 class BEiT(nn.Module):
@@ -806,7 +748,7 @@ class BEiT(nn.Module):
         x = self.pos_drop(x)
 
         features = []
-        training_window_size = torch.tensor([Hp, Wp])
+        training_window_size = (Hp, Wp)
 
         rel_pos_bias = (
             self.rel_pos_bias(training_window_size)
@@ -17,7 +17,7 @@ class LayoutLMv3Detector(Detectron2LayoutDetector):
     """
 
     def __init__(self, **kwargs):
-        super().__init__()
+        super().__init__(**kwargs)
 
         self._model_name = "layoutlmv3"
 
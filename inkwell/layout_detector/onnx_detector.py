@@ -0,0 +1,89 @@
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from inkwell.components import Layout
+from inkwell.layout_detector.base import BaseLayoutDetector
+from inkwell.layout_detector.layout_detector import LayoutDetectorType
+from inkwell.layout_detector.onnx_engine import OnnxLayoutEngine
+from inkwell.layout_detector.onnx_export import (
+    export_detectron2_to_onnx,
+    is_onnx_export_complete,
+)
+from inkwell.layout_detector.utils import load_layout_detector_config
+from inkwell.utils.download import download_file, get_cache_directory
+from inkwell.utils.env_utils import is_detectron2_available
+
+_logger = logging.getLogger(__name__)
+
+ONNX_FILE_SUFFIX = ".onnx"
+
+
+class FasterRCNNOnnxLayoutDetector(BaseLayoutDetector):
+    """
+    Faster RCNN based layout detector running on ONNX Runtime. The
+    Detectron2 model is exported to ONNX on first use and the export is
+    cached next to the weights, so later runs do not need Detectron2.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__()
+
+        self._model_name = "faster_rcnn"
+        self._config = load_layout_detector_config(
+            LayoutDetectorType.FASTER_RCNN
+        )
+        onnx_path = self._export_model(kwargs.pop("model_path", None))
+
+        _logger.info("Loading ONNX Layout Detector model from %s", onnx_path)
+        self._model = OnnxLayoutEngine(
+            onnx_path=onnx_path,
+            label_map=self._config["LABEL_MAP"],
+            detection_threshold=kwargs.get("detection_threshold"),
+            num_threads=kwargs.get("num_threads"),
+        )
+
+    def _export_model(self, model_dir: str = None) -> Path:
+        if model_dir is not None:
+            model_path = Path(model_dir) / self._config["WEIGHTS_FILE"]
+        else:
+            model_path = (
+                get_cache_directory()
+                / self._model_name
+                / self._config["WEIGHTS_FILE"]
+            )
+
+        onnx_path = model_path.with_suffix(ONNX_FILE_SUFFIX)
+        if is_onnx_export_complete(onnx_path):
+            return onnx_path
+
+        if not is_detectron2_available():
+            raise ImportError(
+                f"No ONNX export found at {onnx_path}. Detectron2 is needed "
+                "to export the model. Please install it first."
+            )
+
+        if not model_path.exists():
+            model_path.parent.mkdir(parents=True, exist_ok=True)
+            file_name = os.path.join(
+                self._model_name, self._config["WEIGHTS_FILE"]
+            )
+            download_file(self._config["WEIGHTS_URL"], file_name)
+
+        config_path = (
+            Path(self._config["cfg_dir"]) / self._config["CONFIG_FILE"]
+        )
+        export_detectron2_to_onnx(str(model_path), config_path, onnx_path)
+        return onnx_path
+
+    @property
+    def model_id(self) -> str:
+        return LayoutDetectorType.FASTER_RCNN_ONNX.value
+
+    def process(self, image_batch: list[np.ndarray]) -> list[Layout]:
+        """
+        Detect the layout of a batch of images.
+        """
+        return self._model.detect(image_batch)
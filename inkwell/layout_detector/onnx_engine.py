@@ -0,0 +1,152 @@
+import json
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from inkwell.components import ArrayLayout, Layout
+from inkwell.layout_detector.base import BaseLayoutEngine
+from inkwell.layout_detector.batching import resized_shape
+from inkwell.layout_detector.onnx_export import onnx_metadata_path
+from inkwell.utils.env_utils import is_onnxruntime_available
+
+if is_onnxruntime_available():
+    import onnxruntime  # pylint: disable=import-outside-toplevel
+
+_logger = logging.getLogger(__name__)
+
+
+class OnnxLayoutEngine(BaseLayoutEngine):
+    """Run a Detectron2 detection model exported to ONNX with ONNX Runtime.
+
+    Images are resized as Detectron2 does at inference, and the detected
+    boxes are mapped back to the original image size.
+
+    Args:
+        onnx_path (:obj:`str`):
+            The path to the exported model.
+        label_map (:obj:`dict`):
+            The map from the model prediction (ids) to labels.
+        detection_threshold (:obj:`float`, optional):
+            The minimum confidence score of a detection.
+            Defaults to the `SCORE_THRESH_TEST` of the config the model
+            was exported with, as for the Detectron2 model.
+        num_threads (:obj:`int`, optional):
+            The number of threads ONNX Runtime uses per operator.
+            Defaults to the ONNX Runtime default.
+    """
+
+    DEPENDENCIES = ["onnxruntime"]
+    DETECTOR_NAME = "onnxruntime"
+
+    def __init__(
+        self,
+        onnx_path: Union[str, Path],
+        label_map: dict,
+        detection_threshold: Optional[float] = None,
+        num_threads: Optional[int] = None,
+    ):
+        self._label_map = label_map
+
+        with open(onnx_metadata_path(onnx_path), encoding="utf-8") as f:
+            metadata = json.load(f)
+        if detection_threshold is None:
+            detection_threshold = metadata["score_threshold"]
+        self._detection_threshold = detection_threshold
+        self._min_size = metadata["min_size"]
+        self._max_size = metadata["max_size"]
+        self._input_format = metadata["input_format"]
+        self._output_names = metadata["output_names"]
+
+        session_options = onnxruntime.SessionOptions()
+        if num_threads is not None:
+            session_options.intra_op_num_threads = num_threads
+        self._session = onnxruntime.InferenceSession(
+            str(onnx_path),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_name = self._session.get_inputs()[0].name
+
+    def _preprocess(self, image: np.ndarray) -> np.ndarray:
+        # Same channel handling as the Detectron2 BatchPredictor
+        if self._input_format == "RGB":
+            image = image[:, :, ::-1]
+        height, width = image.shape[:2]
+        new_height, new_width = resized_shape(
+            height, width, self._min_size, self._max_size
+        )
+        if (new_height, new_width) != (height, width):
+            image = np.asarray(
+                Image.fromarray(np.ascontiguousarray(image)).resize(
+                    (new_width, new_height), Image.BILINEAR
+                )
+            )
+        return np.ascontiguousarray(image.transpose(2, 0, 1), dtype=np.float32)
+
+    def _gather_output(
+        self, outputs: dict[str, np.ndarray], height: int, width: int
+    ) -> Layout:
+        input_height, input_width = outputs["image_size"]
+        boxes = outputs["boxes"].reshape(-1, 4).astype(float)
+        boxes[:, 0::2] *= width / input_width
+        boxes[:, 1::2] *= height / input_height
+        boxes[:, 0::2] = boxes[:, 0::2].clip(0, width)
+        boxes[:, 1::2] = boxes[:, 1::2].clip(0, height)
+
+        keep = (
+            (outputs["scores"] >= self._detection_threshold)
+            & (boxes[:, 2] > boxes[:, 0])
+            & (boxes[:, 3] > boxes[:, 1])
+        )
+
+        return ArrayLayout.from_tensors(
+            boxes[keep],
+            outputs["scores"][keep].astype(float),
+            outputs["classes"][keep],
+            label_map=self._label_map,
+        ).to_layout()
+
+    def detect(self, image_batch: list[np.ndarray]) -> list[Layout]:
+        """Detect the layout of a batch of images, one image at a time.
+
+        Args:
+            image_batch (:obj:`list[np.ndarray]` or `list[PIL.Image]`):
+            The RGB input images.
+
+        Returns:
+            :obj:`list[Layout]`: The detected layout of each image.
+        """
+        layouts = []
+        for image in image_batch:
+            image = self.image_loader(image)
+            height, width = image.shape[:2]
+            outputs = self._session.run(
+                self._output_names,
+                {self._input_name: self._preprocess(image)},
+            )
+            layouts.append(
+                self._gather_output(
+                    dict(zip(self._output_names, outputs)), height, width
+                )
+            )
+        return layouts
+
+    def image_loader(
+        self, image: Union[np.ndarray, Image.Image]
+    ) -> np.ndarray:
+        if isinstance(image, Image.Image):
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image = np.array(image)
+
+        return image
+
+    def __new__(cls, *args, **kwargs) -> "OnnxLayoutEngine":
+        if not is_onnxruntime_available():
+            raise ImportError(
+                "ONNX Runtime is not installed. Please install it first."
+            )
+        return super().__new__(cls)
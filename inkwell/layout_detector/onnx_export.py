@@ -0,0 +1,110 @@
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from inkwell.utils.files import atomic_write_path
+
+_logger = logging.getLogger(__name__)
+
+ONNX_OPSET_VERSION = 16
+ONNX_OUTPUT_NAMES = ["boxes", "classes", "scores", "image_size"]
+# Detections are exported with a low threshold and filtered at inference,
+# so that one export serves every detection_threshold. Filtering after NMS
+# keeps the same boxes, as lower scored boxes never suppress higher ones.
+ONNX_EXPORT_SCORE_THRESHOLD = 0.05
+
+
+def onnx_metadata_path(onnx_path: Union[str, Path]) -> Path:
+    return Path(f"{onnx_path}.json")
+
+
+def is_onnx_export_complete(onnx_path: Union[str, Path]) -> bool:
+    """
+    Whether both the ONNX model and its metadata were exported.
+    """
+    return Path(onnx_path).exists() and onnx_metadata_path(onnx_path).exists()
+
+
+def export_detectron2_to_onnx(
+    model_path: str,
+    config_path: Union[str, Path],
+    onnx_path: Union[str, Path],
+    add_architecture_config_method: Optional[Callable] = None,
+):
+    """
+    Export a Detectron2 detection model to ONNX by tracing its inference
+    without postprocessing. The resize parameters and input format the
+    model expects, and the detection threshold of its config, are saved
+    next to the ONNX file, so that inference does not need Detectron2.
+
+    Both files are written to temporary paths unique to the export and
+    moved into place, the model last, so neither concurrent nor
+    interrupted exports leave a partial model behind.
+
+    Args:
+        model_path (str): The path to the model weights.
+        config_path (str or Path): The path to the Detectron2 config.
+        onnx_path (str or Path): The path of the exported model.
+        add_architecture_config_method (Callable, optional): Adds the config
+            keys of a custom architecture.
+    """
+    # pylint: disable=import-outside-toplevel
+    import detectron2.config
+    import torch
+    from detectron2.checkpoint import DetectionCheckpointer
+    from detectron2.export import TracingAdapter
+    from detectron2.modeling import build_model
+
+    cfg = detectron2.config.get_cfg()
+    if add_architecture_config_method:
+        add_architecture_config_method(cfg)
+    cfg.merge_from_file(str(config_path))
+    cfg.MODEL.WEIGHTS = model_path
+    cfg.MODEL.DEVICE = "cpu"
+    # The threshold of the config is kept as the default of the inference
+    score_threshold = cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST
+    cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = ONNX_EXPORT_SCORE_THRESHOLD
+
+    model = build_model(cfg)
+    DetectionCheckpointer(model).load(cfg.MODEL.WEIGHTS)
+    model.eval()
+
+    def inference(model, inputs):
+        instances = model.inference(inputs, do_postprocess=False)[0]
+        return [{"instances": instances}]
+
+    sample_size = cfg.INPUT.MIN_SIZE_TEST
+    sample_inputs = [{"image": torch.zeros(3, sample_size, sample_size)}]
+    traceable_model = TracingAdapter(model, sample_inputs, inference)
+
+    onnx_path = Path(onnx_path)
+    metadata_path = onnx_metadata_path(onnx_path)
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    _logger.info("Exporting %s to ONNX at %s", model_path, onnx_path)
+    # The metadata is moved into place first, so the model is the last
+    with atomic_write_path(onnx_path) as tmp_onnx_path, atomic_write_path(
+        metadata_path
+    ) as tmp_metadata_path:
+        with torch.no_grad():
+            torch.onnx.export(
+                traceable_model,
+                (sample_inputs[0]["image"],),
+                str(tmp_onnx_path),
+                opset_version=ONNX_OPSET_VERSION,
+                input_names=["image"],
+                output_names=ONNX_OUTPUT_NAMES,
+                dynamic_axes={"image": {1: "height", 2: "width"}},
+            )
+
+        with open(tmp_metadata_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "min_size": cfg.INPUT.MIN_SIZE_TEST,
+                    "max_size": cfg.INPUT.MAX_SIZE_TEST,
+                    "input_format": cfg.INPUT.FORMAT,
+                    "output_names": ONNX_OUTPUT_NAMES,
+                    "score_threshold": score_threshold,
+                },
+                f,
+            )
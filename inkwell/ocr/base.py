@@ -3,6 +3,32 @@ from typing import Optional
 
 import numpy as np
 
+from inkwell.components import Layout, LayoutBlock
+
+# The type of the layout blocks of single words
+WORD_BLOCK_TYPE = "word"
+
+
+def words_to_text(words: list[LayoutBlock]) -> str:
+    """
+    Join words into text, line by line from top to bottom and left to
+    right within a line.
+    """
+    lines: list[list[LayoutBlock]] = []
+    line_top: Optional[float] = None
+    line_bottom: Optional[float] = None
+    for word in sorted(words, key=lambda w: w.block.center[1]):
+        center_y = word.block.center[1]
+        if line_bottom is None or not line_top <= center_y <= line_bottom:
+            lines.append([])
+            line_top, line_bottom = word.block.y_1, word.block.y_2
+        lines[-1].append(word)
+
+    return "\n".join(
+        " ".join(word.text for word in sorted(line, key=lambda w: w.block.x_1))
+        for line in lines
+    )
+
 
 class BaseOCR(ABC):
 
@@ -19,3 +45,32 @@ class BaseOCR(ABC):
         system_prompt: Optional[str] = None,
     ) -> list[str]:
         pass
+
+    @property
+    def config_id(self) -> str:
+        """
+        The configuration of the backend that changes its results, e.g. its
+        language or model weights. Empty by default.
+        """
+        return ""
+
+    @property
+    def supports_words(self) -> bool:
+        """
+        Whether `process_words` can recognize the words of whole pages.
+        """
+        return False
+
+    def process_words(self, image_batch: list[np.ndarray]) -> list[Layout]:
+        """
+        Recognize the words of the images, e.g. of whole pages, with their
+        boxes.
+
+        Returns:
+            list[Layout]: The words of each image, as blocks of type "word"
+            in pixel coordinates, with the word as text and the confidence,
+            from 0 to 1, as score.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not recognize words"
+        )
@@ -0,0 +1,182 @@
+import logging
+from typing import Any, Optional, Union
+
+import numpy as np
+
+from inkwell.components import Layout
+from inkwell.ocr.base import BaseOCR, words_to_text
+from inkwell.ocr.ocr import OCRType
+from inkwell.utils.metrics import current_metrics, record
+
+_logger = logging.getLogger(__name__)
+
+# Counters of the crops recognized by a cascade and of those escalated,
+# whose ratio is the escalation rate of the recorded run
+CASCADE_CROPS_COUNTER = "ocr_cascade_crops"
+CASCADE_ESCALATIONS_COUNTER = "ocr_cascade_escalations"
+
+
+def _word_statistics(words: Layout) -> tuple[int, float]:
+    # The number of recognized characters and their mean confidence
+    lengths = np.array([len(word.text) for word in words], dtype=float)
+    if not lengths.sum():
+        return 0, 0.0
+    scores = np.array([word.score for word in words], dtype=float)
+    return int(lengths.sum()), float((lengths * scores).sum() / lengths.sum())
+
+
+class CascadeOCR(BaseOCR):
+    """
+    OCR that recognizes crops with a fast engine, e.g. Tesseract, and only
+    sends the crops it recognized poorly to an expensive one, e.g. a
+    vision language model.
+
+    A crop is escalated when the mean confidence of its words, weighted by
+    their length, is below `min_confidence`, when it has fewer recognized
+    characters per 1000 pixels than `min_text_density`, or when it is less
+    than `min_height` pixels high. Crops without any recognized word are
+    always escalated.
+
+    When called within a block recorded by :obj:`PipelineMetrics`, the
+    numbers of recognized and escalated crops are added to its counters
+    and the escalation backend is timed as the "ocr_escalation" stage.
+    Their ratio is the escalation rate of a document processed with
+    `Pipeline.process`. `Pipeline.process_many` pools the crops of several
+    documents in one batch, so there the counters cover the whole batch.
+
+    Args:
+        fast_ocr (BaseOCR): The first engine, which must recognize words.
+        escalation_ocr (BaseOCR): The engine of the escalated crops.
+        min_confidence (float, optional): The minimal mean confidence of the
+            words of a crop, from 0 to 1.
+        min_text_density (float, optional): The minimal number of
+            recognized characters per 1000 pixels of a crop.
+        min_height (int, optional): The minimal height of a crop in pixels.
+    """
+
+    def __init__(
+        self,
+        fast_ocr: BaseOCR,
+        escalation_ocr: BaseOCR,
+        min_confidence: float = 0.7,
+        min_text_density: Optional[float] = None,
+        min_height: Optional[int] = None,
+    ):
+        if not fast_ocr.supports_words:
+            raise ValueError(
+                f"The fast OCR of a cascade should recognize words, "
+                f"{fast_ocr.model_id} does not"
+            )
+        self._fast_ocr = fast_ocr
+        self._escalation_ocr = escalation_ocr
+        self._min_confidence = min_confidence
+        self._min_text_density = min_text_density
+        self._min_height = min_height
+
+    @classmethod
+    def from_types(
+        cls,
+        fast_ocr: Union[str, OCRType] = OCRType.TESSERACT,
+        escalation_ocr: Union[str, OCRType] = OCRType.PHI3_VISION,
+        fast_ocr_kwargs: Optional[dict[str, Any]] = None,
+        escalation_ocr_kwargs: Optional[dict[str, Any]] = None,
+        **kwargs,
+    ) -> "CascadeOCR":
+        """
+        Build a cascade of backends created by :obj:`OCRFactory`. The
+        inference backend is passed to both of them, and the other keyword
+        arguments to the cascade.
+        """
+        # pylint: disable=import-outside-toplevel
+        from inkwell.ocr.ocr_factory import OCRFactory
+
+        shared_kwargs = {}
+        if "inference_backend" in kwargs:
+            shared_kwargs["inference_backend"] = kwargs.pop(
+                "inference_backend"
+            )
+        return cls(
+            OCRFactory.get_ocr(
+                OCRType(fast_ocr), **shared_kwargs, **(fast_ocr_kwargs or {})
+            ),
+            OCRFactory.get_ocr(
+                OCRType(escalation_ocr),
+                **shared_kwargs,
+                **(escalation_ocr_kwargs or {}),
+            ),
+            **kwargs,
+        )
+
+    @property
+    def model_id(self) -> str:
+        # The thresholds decide which engine recognizes a crop, so they are
+        # part of the identity of the results
+        return (
+            f"{OCRType.CASCADE.value}({self._fast_ocr.model_id},"
+            f"{self._escalation_ocr.model_id},{self._min_confidence},"
+            f"{self._min_text_density},{self._min_height})"
+        )
+
+    @property
+    def config_id(self) -> str:
+        return f"{self._fast_ocr.config_id};{self._escalation_ocr.config_id}"
+
+    def _escalated(
+        self, image_batch: list[np.ndarray], batch_words: list[Layout]
+    ) -> np.ndarray:
+        statistics = np.array(
+            [_word_statistics(words) for words in batch_words], dtype=float
+        ).reshape(-1, 2)
+        num_characters, confidences = statistics.T
+        escalated = (num_characters == 0) | (
+            confidences < self._min_confidence
+        )
+        sizes = np.array([image.shape[:2] for image in image_batch]).reshape(
+            -1, 2
+        )
+        if self._min_text_density is not None:
+            pixels = np.maximum(sizes.prod(axis=1), 1)
+            escalated |= (
+                num_characters * 1000 / pixels < self._min_text_density
+            )
+        if self._min_height is not None:
+            escalated |= sizes[:, 0] < self._min_height
+        return escalated
+
+    def process(
+        self,
+        image_batch: list[np.ndarray],
+        user_prompt: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+    ) -> list[str]:
+        batch_words = self._fast_ocr.process_words(image_batch)
+        texts = [words_to_text(list(words)) for words in batch_words]
+        escalated = np.flatnonzero(self._escalated(image_batch, batch_words))
+
+        metrics = current_metrics()
+        _logger.info(
+            "Escalating %d of %d crops to %s",
+            len(escalated),
+            len(image_batch),
+            self._escalation_ocr.model_id,
+        )
+        if len(escalated):
+            with record(
+                metrics,
+                "ocr_escalation",
+                len(escalated),
+                category="model",
+                model_id=self._escalation_ocr.model_id,
+            ):
+                escalated_texts = self._escalation_ocr.process(
+                    [image_batch[index] for index in escalated],
+                    user_prompt,
+                    system_prompt,
+                )
+            for index, text in zip(escalated.tolist(), escalated_texts):
+                texts[index] = text
+
+        if metrics is not None:
+            metrics.count(CASCADE_CROPS_COUNTER, len(image_batch))
+            metrics.count(CASCADE_ESCALATIONS_COUNTER, len(escalated))
+        return texts
@@ -27,6 +27,10 @@ class MiniCPMOCR(BaseOCR):
     def model_id(self) -> str:
         return OCRType.MINI_CPM.value
 
+    @property
+    def config_id(self) -> str:
+        return f"model={self._model_name},path={self._model_path}"
+
     def process(
         self,
         image_batch: list[np.ndarray],
@@ -6,6 +6,7 @@ from inkwell.ocr.tesseract_ocr import TesseractOCR
 from inkwell.utils.env_utils import (
     is_paddleocr_available,
     is_qwen2_available,
+    is_tesserocr_available,
     is_vllm_available,
 )
 
@@ -16,6 +17,15 @@ class OCRFactory:
         if ocr_type == OCRType.TESSERACT:
             return TesseractOCR(**kwargs)
 
+        if ocr_type == OCRType.TESSEROCR:
+            if is_tesserocr_available():
+                from inkwell.ocr.tesserocr_ocr import (  # pylint: disable=import-outside-toplevel
+                    TesserocrOCR,
+                )
+
+                return TesserocrOCR(**kwargs)
+            raise ValueError("Please install tesserocr to use TesserocrOCR")
+
         if ocr_type == OCRType.PHI3_VISION:
             if is_vllm_available():
                 from inkwell.ocr.phi3_ocr import (  # pylint: disable=import-outside-toplevel
@@ -53,4 +63,10 @@ class OCRFactory:
 
                 return PaddleOCR(**kwargs)
             raise ValueError("Please install paddleocr to use PaddleOCR")
+        if ocr_type == OCRType.CASCADE:
+            from inkwell.ocr.cascade_ocr import (  # pylint: disable=import-outside-toplevel
+                CascadeOCR,
+            )
+
+            return CascadeOCR.from_types(**kwargs)
         raise ValueError(f"Invalid OCR type: {ocr_type}")
@@ -25,6 +25,10 @@ class OpenAI4OMiniOCR(BaseOCR):
     def model_id(self) -> str:
         return OCRType.OPENAI_GPT4O_MINI.value
 
+    @property
+    def config_id(self) -> str:
+        return f"model={self._model_cfg.model_name_openai}"
+
     def _load_client(self):
         self._client = openai.OpenAI(api_key=os.getenv(OPENAI_API_KEY_NAME))
 
@@ -4,7 +4,8 @@ from typing import List, Optional, Union
 
 import numpy as np
 
-from inkwell.ocr.base import BaseOCR
+from inkwell.components import Layout, LayoutBlock, Rectangle
+from inkwell.ocr.base import WORD_BLOCK_TYPE, BaseOCR
 from inkwell.ocr.ocr import OCRType
 from inkwell.utils.env_utils import is_paddleocr_available
 
@@ -23,6 +24,10 @@ class PaddleOCR(BaseOCR):
     def model_id(self) -> str:
         return OCRType.PADDLE.value
 
+    @property
+    def config_id(self) -> str:
+        return f"lang={self._lang}"
+
     def _load_engine(self):
         self._engine = PPStructure(
             layout=True,
@@ -43,6 +48,24 @@ class PaddleOCR(BaseOCR):
         text_str = "\n".join(text_results)
         return text_str
 
+    def _detect_words(self, image: np.ndarray) -> Layout:
+        # PaddleOCR recognizes lines, which are assigned to blocks as words
+        words = []
+        for result in self._engine(image):
+            for text_box in result["res"]:
+                if not isinstance(text_box, dict) or not text_box["text"]:
+                    continue
+                points = np.asarray(text_box["text_region"], dtype=float)
+                words.append(
+                    LayoutBlock(
+                        Rectangle(*points.min(axis=0), *points.max(axis=0)),
+                        text=text_box["text"],
+                        type=WORD_BLOCK_TYPE,
+                        score=float(text_box["confidence"]),
+                    )
+                )
+        return Layout(words)
+
     def process(
         self,
         image_batch: list[np.ndarray],
@@ -60,3 +83,10 @@ class PaddleOCR(BaseOCR):
         """
         _, _ = user_prompt, system_prompt
         return [self._detect(img) for img in image_batch]
+
+    @property
+    def supports_words(self) -> bool:
+        return True
+
+    def process_words(self, image_batch: list[np.ndarray]) -> list[Layout]:
+        return [self._detect_words(img) for img in image_batch]
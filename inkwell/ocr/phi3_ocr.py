@@ -34,6 +34,10 @@ class Phi3VisionOCR(BaseOCR):
     def model_id(self) -> str:
         return OCRType.PHI3_VISION.value
 
+    @property
+    def config_id(self) -> str:
+        return f"model={self._model_name},path={self._model_path}"
+
     def process(
         self,
         image_batch: list[np.ndarray],
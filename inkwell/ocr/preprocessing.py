@@ -0,0 +1,460 @@
+import logging
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from inkwell.components import Layout
+from inkwell.ocr.base import BaseOCR
+from inkwell.utils.metrics import current_metrics, record
+
+_logger = logging.getLogger(__name__)
+
+# Connected components smaller than this, in pixels, are noise rather than
+# glyphs and are left out of the glyph height
+MIN_GLYPH_AREA = 4
+# Crops with fewer ink pixels keep their skew angle at zero
+MIN_DESKEW_INK_PIXELS = 64
+# Ink pixels of a batch sampled to estimate the skew angles
+MAX_DESKEW_SAMPLES = 1 << 18
+# Crops are analysed together on canvases of up to this many pixels
+MAX_CANVAS_PIXELS = 1 << 26
+
+
+class CropStatistics(NamedTuple):
+    """
+    The statistics of a batch of crops, one value per crop.
+
+    Attributes:
+        thresholds (np.ndarray): The Otsu threshold of the grayscale crop.
+        dark_text (np.ndarray): Whether the ink is darker than the
+            background.
+        glyph_heights (np.ndarray): The median height of the glyphs, in
+            pixels, NaN for crops without glyphs.
+        skew_angles (np.ndarray): The angle of the text lines in degrees,
+            clockwise.
+    """
+
+    thresholds: np.ndarray
+    dark_text: np.ndarray
+    glyph_heights: np.ndarray
+    skew_angles: np.ndarray
+
+
+def _grayscale(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+
+def _otsu_thresholds(histograms: np.ndarray) -> np.ndarray:
+    # The Otsu threshold of every row of a Bx256 histogram array: the gray
+    # level maximizing the variance between the two classes it separates
+    levels = np.arange(histograms.shape[1], dtype=float)
+    weights = np.cumsum(histograms, axis=1, dtype=float)
+    means = np.cumsum(histograms * levels, axis=1, dtype=float)
+    total_weights = weights[:, -1:]
+    total_means = means[:, -1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variances = (total_means * weights - means * total_weights) ** 2 / (
+            weights * (total_weights - weights)
+        )
+    return np.argmax(np.nan_to_num(variances, nan=-1.0), axis=1)
+
+
+def _group_medians(
+    groups: np.ndarray, values: np.ndarray, num_groups: int
+) -> np.ndarray:
+    # The lower median of the values of each group, NaN for empty groups
+    order = np.lexsort((values, groups))
+    counts = np.bincount(groups, minlength=num_groups)
+    starts = np.cumsum(counts) - counts
+    medians = np.full(num_groups, np.nan)
+    present = counts > 0
+    medians[present] = values[order][
+        starts[present] + (counts[present] - 1) // 2
+    ]
+    return medians
+
+
+class _Canvas:
+    # The ink of a batch of crops stacked on one binary image, one crop
+    # under the other and separated by a blank row, so that whole-batch
+    # operations run once on the canvas
+
+    def __init__(self, gray_batch: list[np.ndarray]):
+        self.shapes = np.array(
+            [gray.shape[:2] for gray in gray_batch], dtype=np.int64
+        ).reshape(-1, 2)
+        histograms = np.stack(
+            [
+                cv2.calcHist([gray], [0], None, [256], [0, 256])[:, 0]
+                for gray in gray_batch
+            ]
+        ).reshape(-1, 256)
+        self.thresholds = _otsu_thresholds(histograms)
+        # Text covers less of a crop than its background
+        below = np.take_along_axis(
+            np.cumsum(histograms, axis=1), self.thresholds[:, None], axis=1
+        )[:, 0]
+        self.dark_text = 2 * below <= self.shapes.prod(axis=1)
+
+        # The first row of every crop, followed by the canvas height
+        self.offsets = np.concatenate([[0], np.cumsum(self.shapes[:, 0] + 1)])
+        self.ink = np.zeros(
+            (self.offsets[-1], self.shapes[:, 1].max()), dtype=np.uint8
+        )
+        for gray, offset, (height, width), threshold, dark_text in zip(
+            gray_batch,
+            self.offsets,
+            self.shapes,
+            self.thresholds,
+            self.dark_text,
+        ):
+            cv2.threshold(
+                gray,
+                int(threshold),
+                1,
+                cv2.THRESH_BINARY_INV if dark_text else cv2.THRESH_BINARY,
+                dst=self.ink[offset : offset + height, :width],
+            )
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    def crops(self, rows: np.ndarray) -> np.ndarray:
+        # The crop of rows of the canvas
+        return np.searchsorted(self.offsets, rows, side="right") - 1
+
+
+def _chunks(image_batch: list[np.ndarray]) -> list[slice]:
+    # Consecutive crops whose canvas has at most MAX_CANVAS_PIXELS pixels,
+    # or single crops
+    chunks, start, height, width = [], 0, 0, 0
+    for end, image in enumerate(image_batch):
+        crop_height, crop_width = image.shape[:2]
+        if (
+            end > start
+            and (height + crop_height + 1) * max(width, crop_width)
+            > MAX_CANVAS_PIXELS
+        ):
+            chunks.append(slice(start, end))
+            start, height, width = end, 0, 0
+        height += crop_height + 1
+        width = max(width, crop_width)
+    if start < len(image_batch):
+        chunks.append(slice(start, len(image_batch)))
+    return chunks
+
+
+class OCRPreprocessor:
+    """
+    Prepare text crops for OCR: rescale them so that their glyphs are
+    `target_x_height` pixels high, and optionally deskew and binarize them.
+
+    Text crops are rendered at a fixed resolution, so glyph sizes vary with
+    the font size of the document, and Tesseract is much slower on large
+    glyphs without being more accurate. The glyph height of a crop is
+    estimated as the median height of its connected components, which for
+    running text is close to the x-height.
+
+    The statistics of a batch, i.e. the Otsu thresholds, glyph heights and
+    skew angles, are computed at once for all its crops, stacked on one
+    canvas; only the resizing, rotation and binarization of the crops run
+    crop by crop.
+
+    Args:
+        target_x_height (int, optional): The glyph height of the crops
+            passed to the OCR, in pixels.
+        max_scale (float, optional): The maximal upscaling factor, to not
+            blow up crops of tiny text. Defaults to 2.
+        scale_tolerance (float, optional): The relative difference to the
+            target height under which crops are left at their size.
+        binarize (bool, optional): Threshold the crops to black text on a
+            white background, with their Otsu threshold.
+        deskew (bool, optional): Rotate the crops so that their text lines
+            are horizontal.
+        max_skew_angle (float, optional): The largest skew angle looked for,
+            in degrees.
+        skew_angle_step (float, optional): The precision of the skew angle,
+            in degrees.
+    """
+
+    def __init__(
+        self,
+        target_x_height: int = 24,
+        max_scale: float = 2.0,
+        scale_tolerance: float = 0.15,
+        binarize: bool = False,
+        deskew: bool = False,
+        max_skew_angle: float = 5.0,
+        skew_angle_step: float = 0.5,
+    ):
+        if target_x_height <= 0:
+            raise ValueError("target_x_height should be positive")
+        self.target_x_height = target_x_height
+        self.max_scale = max_scale
+        self.scale_tolerance = scale_tolerance
+        self.binarize = binarize
+        self.deskew = deskew
+        self.max_skew_angle = max_skew_angle
+        self.skew_angle_step = skew_angle_step
+
+    @property
+    def config_id(self) -> str:
+        """
+        The parameters changing the pixels passed to the OCR.
+        """
+        config_id = f"x{self.target_x_height},s{self.max_scale},t{self.scale_tolerance}"
+        if self.binarize:
+            config_id += ",bin"
+        if self.deskew:
+            config_id += f",deskew{self.max_skew_angle}/{self.skew_angle_step}"
+        return config_id
+
+    def statistics(self, image_batch: list[np.ndarray]) -> CropStatistics:
+        """
+        The Otsu thresholds, text polarities, glyph heights and, when
+        deskewing, skew angles of a batch of crops.
+        """
+        chunks = [
+            self._chunk_statistics(image_batch[chunk])
+            for chunk in _chunks(image_batch)
+        ]
+        if not chunks:
+            return CropStatistics(
+                *(np.empty(0) for _ in CropStatistics._fields)
+            )
+        return CropStatistics(
+            *(np.concatenate(values) for values in zip(*chunks))
+        )
+
+    def _chunk_statistics(
+        self, image_batch: list[np.ndarray]
+    ) -> CropStatistics:
+        canvas = _Canvas([_grayscale(image) for image in image_batch])
+        glyph_heights = self._glyph_heights(canvas)
+        if self.deskew:
+            skew_angles = self._skew_angles(canvas)
+        else:
+            skew_angles = np.zeros(len(canvas))
+        return CropStatistics(
+            canvas.thresholds, canvas.dark_text, glyph_heights, skew_angles
+        )
+
+    def _glyph_heights(self, canvas: _Canvas) -> np.ndarray:
+        # The connected components of all the crops are labelled at once
+        _, _, stats, _ = cv2.connectedComponentsWithStats(
+            canvas.ink, connectivity=8
+        )
+        # The first component is the background
+        tops = stats[1:, cv2.CC_STAT_TOP]
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        glyphs = stats[1:, cv2.CC_STAT_AREA] >= MIN_GLYPH_AREA
+        return _group_medians(
+            canvas.crops(tops[glyphs]), heights[glyphs], len(canvas)
+        )
+
+    def _skew_angles(self, canvas: _Canvas) -> np.ndarray:
+        # The angle whose sheared row profile of the ink is the sharpest,
+        # i.e. has the largest sum of squares, with the ink of all crops
+        # binned together for every candidate angle
+        angles = np.arange(
+            -self.max_skew_angle,
+            self.max_skew_angle + self.skew_angle_step / 2,
+            self.skew_angle_step,
+        )
+        rows, columns = np.nonzero(canvas.ink)
+        if len(rows) > MAX_DESKEW_SAMPLES:
+            stride = -(-len(rows) // MAX_DESKEW_SAMPLES)
+            rows, columns = rows[::stride], columns[::stride]
+        crops = canvas.crops(rows)
+
+        # Each crop gets the bins of its sheared rows, from minus to plus
+        # its largest shift around its own rows
+        max_shifts = np.ceil(
+            canvas.shapes[:, 1] * np.tan(np.radians(angles.max(initial=0)))
+        ).astype(np.int64)
+        bin_counts = canvas.shapes[:, 0] + 2 * max_shifts + 1
+        bin_starts = np.cumsum(bin_counts) - bin_counts
+        rows = rows - canvas.offsets[crops] + bin_starts[crops]
+        rows += max_shifts[crops]
+        columns = columns.astype(np.float32)
+
+        sharpness = np.zeros((len(angles), len(canvas)))
+        for i, angle in enumerate(angles):
+            bins = rows - np.rint(columns * np.tan(np.radians(angle))).astype(
+                np.int64
+            )
+            profile = np.bincount(bins, minlength=bin_counts.sum())
+            if len(profile):
+                sharpness[i] = np.add.reduceat(
+                    profile.astype(float) ** 2, bin_starts
+                )
+
+        # Ties, e.g. for blank crops, go to the smallest rotation
+        by_rotation = np.argsort(np.abs(angles), kind="stable")
+        best = by_rotation[np.argmax(sharpness[by_rotation], axis=0)]
+        enough_ink = (
+            np.bincount(crops, minlength=len(canvas)) >= MIN_DESKEW_INK_PIXELS
+        )
+        return np.where(enough_ink, angles[best], 0.0)
+
+    def scales(self, statistics: CropStatistics) -> np.ndarray:
+        """
+        The factor each crop is resized by, 1 for crops left at their size.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scales = self.target_x_height / statistics.glyph_heights
+        scales = np.minimum(np.nan_to_num(scales, nan=1.0), self.max_scale)
+        return np.where(
+            np.abs(scales - 1) <= self.scale_tolerance, 1.0, scales
+        )
+
+    def _prepare(
+        self,
+        image: np.ndarray,
+        scale: float,
+        skew_angle: float,
+        threshold: int,
+        dark_text: bool,
+    ) -> np.ndarray:
+        if scale != 1:
+            height, width = image.shape[:2]
+            image = cv2.resize(
+                image,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC,
+            )
+        if skew_angle:
+            image = _rotate(image, skew_angle)
+        if self.binarize:
+            _, image = cv2.threshold(
+                _grayscale(image),
+                threshold,
+                255,
+                cv2.THRESH_BINARY if dark_text else cv2.THRESH_BINARY_INV,
+            )
+        return image
+
+    def transform(
+        self, image_batch: list[np.ndarray], deskew: bool = True
+    ) -> tuple[list[np.ndarray], np.ndarray]:
+        """
+        Preprocess a batch of crops.
+
+        Args:
+            image_batch (list[np.ndarray]): The crops.
+            deskew (bool, optional): Whether to deskew the crops when the
+                preprocessor does, e.g. False to keep the boxes of words
+                recognized on the crops mappable back to the input.
+
+        Returns:
+            tuple[list[np.ndarray], np.ndarray]: The preprocessed crops, in
+            the same order, and the factor each crop was resized by.
+        """
+        statistics = self.statistics(image_batch)
+        scales = self.scales(statistics)
+        skew_angles = statistics.skew_angles * deskew
+        _logger.debug(
+            "Preprocessed %d crops, %d rescaled, %d deskewed",
+            len(image_batch),
+            np.count_nonzero(scales != 1),
+            np.count_nonzero(skew_angles),
+        )
+        images = [
+            self._prepare(
+                image,
+                float(scale),
+                float(skew_angle),
+                int(threshold),
+                bool(dark_text),
+            )
+            for image, scale, skew_angle, threshold, dark_text in zip(
+                image_batch,
+                scales,
+                skew_angles,
+                statistics.thresholds,
+                statistics.dark_text,
+            )
+        ]
+        return images, scales
+
+    def process(self, image_batch: list[np.ndarray]) -> list[np.ndarray]:
+        """
+        Preprocess a batch of crops, returned in the same order.
+        """
+        images, _ = self.transform(image_batch)
+        return images
+
+
+def _rotate(image: np.ndarray, skew_angle: float) -> np.ndarray:
+    # Rotate text lines going down by `skew_angle` degrees back to the
+    # horizontal, enlarging the image so that none of it is cut
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), skew_angle, 1)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_width = int(np.ceil(height * sin + width * cos))
+    new_height = int(np.ceil(height * cos + width * sin))
+    matrix[0, 2] += (new_width - width) / 2
+    matrix[1, 2] += (new_height - height) / 2
+    return cv2.warpAffine(
+        image,
+        matrix,
+        (new_width, new_height),
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_REPLICATE,
+    )
+
+
+class PreprocessedOCR(BaseOCR):
+    """
+    OCR of crops prepared by an :obj:`OCRPreprocessor` before they are
+    passed to another backend.
+
+    When called within a block recorded by :obj:`PipelineMetrics`, the
+    preprocessing is timed as the "ocr_preprocessing" stage.
+
+    Words are recognized on the preprocessed images and their boxes scaled
+    back to the input images, so that page OCR keeps working; crops are
+    then not deskewed, since rotated boxes could not be mapped back.
+    """
+
+    def __init__(self, ocr: BaseOCR, preprocessor: OCRPreprocessor):
+        self._ocr = ocr
+        self._preprocessor = preprocessor
+
+    @property
+    def model_id(self) -> str:
+        return f"{self._ocr.model_id}[{self._preprocessor.config_id}]"
+
+    @property
+    def config_id(self) -> str:
+        return self._ocr.config_id
+
+    def process(
+        self,
+        image_batch: list[np.ndarray],
+        user_prompt: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+    ) -> list[str]:
+        with record(current_metrics(), "ocr_preprocessing", len(image_batch)):
+            image_batch = self._preprocessor.process(image_batch)
+        return self._ocr.process(image_batch, user_prompt, system_prompt)
+
+    @property
+    def supports_words(self) -> bool:
+        return self._ocr.supports_words
+
+    def process_words(self, image_batch: list[np.ndarray]) -> list[Layout]:
+        with record(current_metrics(), "ocr_preprocessing", len(image_batch)):
+            image_batch, scales = self._preprocessor.transform(
+                image_batch, deskew=False
+            )
+        batch_words = self._ocr.process_words(image_batch)
+        return [
+            words.scale(1 / scale) if scale != 1 else words
+            for words, scale in zip(batch_words, scales.tolist())
+        ]
@@ -34,6 +34,10 @@ class Qwen2OCR(BaseOCR):
     def model_id(self) -> str:
         return OCRType.QWEN2_2B_VISION.value
 
+    @property
+    def config_id(self) -> str:
+        return f"model={self._model_name},path={self._model_path}"
+
     def process(
         self,
         image_batch: list[np.ndarray],
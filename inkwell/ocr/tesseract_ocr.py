@@ -1,25 +1,218 @@
-from typing import Optional
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import partial
+from typing import Callable, Iterator, Optional
 
 import numpy as np
 import pytesseract
+import pytesseract.pytesseract
 
-from inkwell.ocr.base import BaseOCR
+from inkwell.components import Layout, LayoutBlock, Rectangle
+from inkwell.ocr.base import WORD_BLOCK_TYPE, BaseOCR
 from inkwell.ocr.ocr import OCRType
 
+# Tesseract reads its OpenMP thread count from this variable
+OMP_THREAD_LIMIT_VARIABLE = "OMP_THREAD_LIMIT"
+
+
+def _available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def resolve_omp_thread_limit(
+    num_workers: int, omp_thread_limit: Optional[int] = None
+) -> Optional[int]:
+    """
+    The number of OpenMP threads of each Tesseract run: `omp_thread_limit`
+    when given, otherwise the available CPUs divided among `num_workers`
+    workers when there are several and `OMP_THREAD_LIMIT` is not set in the
+    environment. None leaves the environment as is.
+    """
+    if omp_thread_limit is not None:
+        return omp_thread_limit
+    if num_workers > 1 and OMP_THREAD_LIMIT_VARIABLE not in os.environ:
+        return max(1, _available_cpus() // num_workers)
+    return None
+
+
+# The OpenMP thread limit of the tesseract processes started in the current
+# context, i.e. by the detector running in it
+_omp_thread_limit: ContextVar[Optional[int]] = ContextVar(
+    "omp_thread_limit", default=None
+)
+
+
+class _TesseractEnvironment(Mapping):
+    # The environment pytesseract starts tesseract with: that of this
+    # process, with the OpenMP thread limit of the current context, so that
+    # detectors with different limits do not share a process-wide value
+
+    def _overrides(self) -> dict[str, str]:
+        limit = _omp_thread_limit.get()
+        if limit is None:
+            return {}
+        return {OMP_THREAD_LIMIT_VARIABLE: str(limit)}
+
+    def __getitem__(self, key: str) -> str:
+        overrides = self._overrides()
+        return overrides[key] if key in overrides else os.environ[key]
+
+    def __iter__(self) -> Iterator[str]:
+        overrides = self._overrides()
+        yield from overrides
+        yield from (key for key in os.environ if key not in overrides)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _EnvironmentOverride:
+    # pytesseract passes its module attribute `environ` as the env of every
+    # tesseract process it starts. The attribute is replaced by the
+    # environment above only while detectors with a thread limit run, and
+    # restored once the last of them is done
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._replaced: Optional[Mapping] = None
+
+    @contextmanager
+    def installed(self) -> Iterator[None]:
+        with self._lock:
+            if self._users == 0:
+                self._replaced = pytesseract.pytesseract.environ
+                pytesseract.pytesseract.environ = _TesseractEnvironment()
+            self._users += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._users -= 1
+                if self._users == 0:
+                    pytesseract.pytesseract.environ = self._replaced
+                    self._replaced = None
+
+
+_environment_override = _EnvironmentOverride()
+
+
+def _call_with_omp_thread_limit(
+    omp_thread_limit: Optional[int], function: Callable, *args
+):
+    token = _omp_thread_limit.set(omp_thread_limit)
+    try:
+        return function(*args)
+    finally:
+        _omp_thread_limit.reset(token)
+
+
+def word_block(
+    text: str,
+    left: float,
+    top: float,
+    width: float,
+    height: float,
+    confidence: float,
+) -> LayoutBlock:
+    """
+    A word recognized by Tesseract, with its confidence from 0 to 100.
+    """
+    return LayoutBlock(
+        Rectangle(left, top, left + width, top + height),
+        text=text,
+        type=WORD_BLOCK_TYPE,
+        score=float(confidence) / 100,
+    )
+
 
 class TesseractOCR(BaseOCR):
+    """
+    OCR with the tesseract command line, through pytesseract.
+
+    Every image runs in its own tesseract process, so with `num_workers`
+    greater than one the images of a batch are sent to that many processes
+    at once from a thread pool. Each process is then limited to a share of
+    the CPUs through `OMP_THREAD_LIMIT`, so that the workers do not
+    oversubscribe them. The limit is only set in the environment of the
+    processes of this detector, so detectors with different numbers of
+    workers each keep their own.
+
+    Args:
+        lang (str, optional): The tesseract language(s), e.g. "eng+fra".
+        num_workers (int, optional): The number of images recognized at
+            once. Defaults to 1, one image after the other.
+        omp_thread_limit (int, optional): The number of OpenMP threads of
+            each tesseract process. Defaults to the available CPUs divided
+            among the workers, unless `OMP_THREAD_LIMIT` is already set.
+    """
 
     def __init__(self, **kwargs):
         self._lang = kwargs.get("lang", "eng")
+        self._num_workers = kwargs.get("num_workers") or 1
+        if self._num_workers < 1:
+            raise ValueError("num_workers should be a positive integer")
+
+        self._omp_thread_limit = resolve_omp_thread_limit(
+            self._num_workers, kwargs.get("omp_thread_limit")
+        )
 
     @property
     def model_id(self) -> str:
         return OCRType.TESSERACT.value
 
+    @property
+    def config_id(self) -> str:
+        return f"lang={self._lang}"
+
     def _detect(self, image: np.ndarray) -> str:
         text = pytesseract.image_to_string(image, lang=self._lang)
         return text
 
+    def _detect_words(self, image: np.ndarray) -> Layout:
+        data = pytesseract.image_to_data(
+            image, lang=self._lang, output_type=pytesseract.Output.DICT
+        )
+        return Layout(
+            [
+                word_block(text, left, top, width, height, confidence)
+                for text, left, top, width, height, confidence in zip(
+                    data["text"],
+                    data["left"],
+                    data["top"],
+                    data["width"],
+                    data["height"],
+                    data["conf"],
+                )
+                # Lines, paragraphs and blocks have no text
+                if text.strip() and float(confidence) >= 0
+            ]
+        )
+
+    def _map(self, detect: Callable, image_batch: list[np.ndarray]) -> list:
+        detect = partial(
+            _call_with_omp_thread_limit, self._omp_thread_limit, detect
+        )
+        num_workers = min(self._num_workers, len(image_batch))
+        with (
+            nullcontext()
+            if self._omp_thread_limit is None
+            else _environment_override.installed()
+        ):
+            if num_workers <= 1:
+                return [detect(img) for img in image_batch]
+
+            with ThreadPoolExecutor(
+                max_workers=num_workers, thread_name_prefix="tesseract"
+            ) as executor:
+                return list(executor.map(detect, image_batch))
+
     def process(
         self,
         image_batch: list[np.ndarray],
@@ -33,7 +226,15 @@ class TesseractOCR(BaseOCR):
             image (np.ndarray or list[np.ndarray]): The image(s) to process.
 
         Returns:
-            str or list[str]: The text(s) detected.
+            str or list[str]: The text(s) detected, in the order of the
+            images.
         """
         _, _ = user_prompt, system_prompt
-        return [self._detect(img) for img in image_batch]
+        return self._map(self._detect, image_batch)
+
+    @property
+    def supports_words(self) -> bool:
+        return True
+
+    def process_words(self, image_batch: list[np.ndarray]) -> list[Layout]:
+        return self._map(self._detect_words, image_batch)
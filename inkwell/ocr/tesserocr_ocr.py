@@ -0,0 +1,164 @@
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from queue import Queue
+from typing import Any, Iterator, Optional
+
+import numpy as np
+from pytesseract.pytesseract import prepare
+
+from inkwell.components import Layout
+from inkwell.ocr.ocr import OCRType
+from inkwell.ocr.tesseract_ocr import (
+    OMP_THREAD_LIMIT_VARIABLE,
+    TesseractOCR,
+    word_block,
+)
+from inkwell.utils.env_utils import is_tesserocr_available
+
+_logger = logging.getLogger(__name__)
+
+
+# The OpenMP thread limit in the environment when tesserocr was loaded
+_loaded_omp_thread_limit: Optional[str] = None
+
+
+def _import_tesserocr(omp_thread_limit: Optional[int]):
+    # Loading tesserocr loads libtesseract and its OpenMP runtime, which
+    # reads OMP_THREAD_LIMIT once, so the limit is set for the first import
+    # only. The environment is then restored, so that the limit does not
+    # leak into other detectors
+    global _loaded_omp_thread_limit  # pylint: disable=global-statement
+    first_import = "tesserocr" not in sys.modules
+    if (
+        not first_import
+        and omp_thread_limit is not None
+        and _loaded_omp_thread_limit != str(omp_thread_limit)
+    ):
+        _logger.warning(
+            "tesserocr is already loaded, its engines keep their "
+            "OpenMP thread limit instead of %d",
+            omp_thread_limit,
+        )
+
+    previous = os.environ.get(OMP_THREAD_LIMIT_VARIABLE)
+    if first_import and omp_thread_limit is not None:
+        os.environ[OMP_THREAD_LIMIT_VARIABLE] = str(omp_thread_limit)
+    try:
+        # pylint: disable=import-outside-toplevel
+        import tesserocr
+
+        if first_import:
+            _loaded_omp_thread_limit = os.environ.get(
+                OMP_THREAD_LIMIT_VARIABLE
+            )
+    finally:
+        if first_import:
+            if previous is None:
+                os.environ.pop(OMP_THREAD_LIMIT_VARIABLE, None)
+            else:
+                os.environ[OMP_THREAD_LIMIT_VARIABLE] = previous
+
+    return tesserocr
+
+
+class TesserocrOCR(TesseractOCR):
+    """
+    OCR with Tesseract running in this process, through tesserocr.
+
+    The Tesseract engines are created once, with their language data, and
+    kept for the lifetime of the detector; images are passed to them in
+    memory. This avoids the process start, language loading and temporary
+    files that pytesseract pays for every image, and gives the same text.
+
+    With `num_workers` greater than one, that many engines recognize the
+    images of a batch at once, as with :obj:`TesseractOCR`. tesserocr
+    releases the GIL while recognizing.
+
+    Args:
+        lang (str, optional): The tesseract language(s), e.g. "eng+fra".
+        num_workers (int, optional): The number of engines. Defaults to 1.
+        omp_thread_limit (int, optional): The number of OpenMP threads of
+            the engines, as for :obj:`TesseractOCR`. The engines run in this
+            process, whose OpenMP runtime reads the limit once when tesserocr
+            is first loaded: the limit of the first detector created
+            applies to all of them. It is only set in `OMP_THREAD_LIMIT`
+            while tesserocr loads.
+        tessdata_path (str, optional): The directory of the language data.
+            Defaults to the tessdata directory of the Tesseract install.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._tessdata_path = kwargs.get("tessdata_path")
+        path_kwargs = {}
+        if self._tessdata_path:
+            path_kwargs["path"] = self._tessdata_path
+
+        tesserocr = _import_tesserocr(self._omp_thread_limit)
+        self._engines: Queue = Queue()
+        for _ in range(self._num_workers):
+            self._engines.put(
+                tesserocr.PyTessBaseAPI(lang=self._lang, **path_kwargs)
+            )
+
+    @property
+    def model_id(self) -> str:
+        return OCRType.TESSEROCR.value
+
+    @property
+    def config_id(self) -> str:
+        return f"lang={self._lang},tessdata={self._tessdata_path}"
+
+    @contextmanager
+    def _engine(self, image: np.ndarray) -> Iterator[Any]:
+        # Images are prepared as pytesseract does, e.g. transparent pixels
+        # become white, so that both backends see the same pixels
+        image, _ = prepare(image)
+        engine = self._engines.get()
+        try:
+            engine.SetImage(image)
+            yield engine
+        finally:
+            engine.Clear()
+            self._engines.put(engine)
+
+    def _detect(self, image: np.ndarray) -> str:
+        with self._engine(image) as engine:
+            text = engine.GetUTF8Text()
+            # The text output of the tesseract command, which pytesseract
+            # returns, ends every page with the page separator
+            return text + engine.GetVariableAsString("page_separator")
+
+    def _detect_words(self, image: np.ndarray) -> Layout:
+        # pylint: disable=import-outside-toplevel
+        import tesserocr
+
+        level = tesserocr.RIL.WORD
+        words = []
+        with self._engine(image) as engine:
+            engine.Recognize()
+            for word in tesserocr.iterate_level(engine.GetIterator(), level):
+                text = word.GetUTF8Text(level)
+                if not text or not text.strip():
+                    continue
+                x_1, y_1, x_2, y_2 = word.BoundingBox(level)
+                words.append(
+                    word_block(
+                        text,
+                        x_1,
+                        y_1,
+                        x_2 - x_1,
+                        y_2 - y_1,
+                        word.Confidence(level),
+                    )
+                )
+        return Layout(words)
+
+    def __new__(cls, *args, **kwargs) -> "TesserocrOCR":
+        if not is_tesserocr_available():
+            raise ImportError(
+                "tesserocr is not installed. Please install it first."
+            )
+        return super().__new__(cls)
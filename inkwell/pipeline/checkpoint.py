@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Union
+
+from inkwell.api.page import Page
+from inkwell.utils.files import atomic_write_path
+
+_logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_document(document_path: str) -> str:
+    """
+    Hash the contents of a local document. Documents that are not local
+    files, such as URLs, are identified by their path.
+    """
+    digest = hashlib.sha256()
+    if os.path.isfile(document_path):
+        with open(document_path, "rb") as document_file:
+            for chunk in iter(
+                lambda: document_file.read(_HASH_CHUNK_SIZE), b""
+            ):
+                digest.update(chunk)
+    else:
+        digest.update(document_path.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write_json(path: Path, data: Any):
+    # Write to a temporary file first so that an interrupted write never
+    # leaves a truncated file behind
+    with atomic_write_path(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as json_file:
+            json.dump(data, json_file)
+
+
+class PageCheckpoint:
+    """
+    Pages of a document completed by a pipeline, persisted so that an
+    interrupted run can be resumed. Checkpoints live in a directory named
+    after the hash of the document and of the pipeline's model ids, so a
+    changed document or model never reuses stale pages.
+
+    Args:
+        checkpoint_dir (str or Path): The root directory of checkpoints.
+        document_path (str): The path or URL of the document.
+        model_ids (dict): The model ids of the pipeline.
+    """
+
+    def __init__(
+        self,
+        checkpoint_dir: Union[str, Path],
+        document_path: str,
+        model_ids: dict[str, Any],
+    ):
+        document_hash = hash_document(document_path)
+        model_ids = json.loads(json.dumps(model_ids, default=str))
+        key = hashlib.sha256(
+            json.dumps([document_hash, model_ids], sort_keys=True).encode(
+                "utf-8"
+            )
+        ).hexdigest()
+
+        self._directory = Path(checkpoint_dir) / key
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self._directory / MANIFEST_FILE
+
+        if self._manifest_path.exists():
+            with open(self._manifest_path, encoding="utf-8") as manifest:
+                self._manifest = json.load(manifest)
+            _logger.info(
+                "Resuming %s from %d completed pages",
+                document_path,
+                len(self._manifest["completed_pages"]),
+            )
+        else:
+            self._manifest = {
+                "document_path": document_path,
+                "document_hash": document_hash,
+                "model_ids": model_ids,
+                "completed_pages": [],
+            }
+
+    @property
+    def completed_pages(self) -> set[int]:
+        return set(self._manifest["completed_pages"])
+
+    def _page_path(self, page_number: int) -> Path:
+        return self._directory / f"page_{page_number}.json"
+
+    def save(self, page_numbers: Iterable[int], pages: list[Page]):
+        """
+        Persist the processed pages and mark `page_numbers` as completed.
+        Page numbers without a page are pages without fragments.
+        """
+        for page in pages:
+            _write_json(self._page_path(page.page_number), page.to_dict())
+
+        completed = self.completed_pages | set(page_numbers)
+        self._manifest["completed_pages"] = sorted(completed)
+        _write_json(self._manifest_path, self._manifest)
+
+    def iter_pages(self, page_numbers: Iterable[int]) -> Iterator[Page]:
+        """
+        Load the persisted pages among `page_numbers`, in the given order.
+        """
+        for page_number in page_numbers:
+            page_path = self._page_path(page_number)
+            if not page_path.exists():
+                continue
+            with open(page_path, encoding="utf-8") as page_file:
+                yield Page.from_dict(json.load(page_file))
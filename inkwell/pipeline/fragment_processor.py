@@ -1,5 +1,7 @@
 import logging
+import threading
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
 from dataclasses import dataclass
 from typing import Optional
 
@@ -11,10 +13,21 @@ from inkwell.api.page import PageFragment, PageFragmentType
 from inkwell.api.table import Table, TableEncoding
 from inkwell.api.text import TextBox
 from inkwell.components import LayoutBlock
+from inkwell.components.document import PageBlocks
 from inkwell.figure_extractor.base import BaseFigureExtractor
-from inkwell.ocr.base import BaseOCR
-from inkwell.pipeline.utils import DocumentPageBlocks
+from inkwell.ocr.base import BaseOCR, words_to_text
+from inkwell.pipeline.text_layer import (
+    assign_words_to_blocks,
+    extract_text_layer,
+    is_usable_text,
+)
+from inkwell.pipeline.utils import (
+    DocumentPageBlocks,
+    crop_block_image,
+    render_page_image,
+)
 from inkwell.table_extractor.base import BaseTableExtractor
+from inkwell.utils.metrics import PipelineMetrics, record, span
 
 _logger = logging.getLogger(__name__)
 
@@ -30,11 +43,41 @@ class DocumentProcessor(ABC):
 class FragmentProcessor(ABC):
     @abstractmethod
     def process(
-        self, document_page_blocks: DocumentPageBlocks
+        self,
+        document_page_blocks: DocumentPageBlocks,
+        metrics: Optional[PipelineMetrics] = None,
     ) -> list[PageFragment]:
         pass
 
 
+def _reading_pdf(pdf_lock: Optional[threading.Lock]):
+    # Pages of a document share the file handle of their PDF, so reads from
+    # it, but not the models run on what was read, take turns
+    return pdf_lock or nullcontext()
+
+
+def _crop_fragment(
+    page_block: PageBlocks,
+    block: LayoutBlock,
+    crop_resolution: Optional[int],
+    fragment_type: PageFragmentType,
+    metrics: Optional[PipelineMetrics] = None,
+    pdf_lock: Optional[threading.Lock] = None,
+) -> np.ndarray:
+    with span(
+        metrics,
+        "fragment",
+        "fragment",
+        page_number=page_block.page_number,
+        fragment_type=fragment_type.value,
+        block_type=block.type,
+    ) as attributes:
+        with _reading_pdf(pdf_lock):
+            image = crop_block_image(page_block, block, crop_resolution)
+        attributes["crop_size"] = f"{image.shape[1]}x{image.shape[0]}"
+    return image
+
+
 @dataclass
 class TableFragmentInformation:
     page_number: int
@@ -46,40 +89,74 @@ class TableFragmentProcessor(FragmentProcessor):
         self,
         ocr_detector: BaseOCR,
         table_extractor: Optional[BaseTableExtractor] = None,
+        crop_resolution: Optional[int] = None,
+        pdf_lock: Optional[threading.Lock] = None,
     ):
         self.ocr_detector = ocr_detector
         self.table_extractor = table_extractor
+        self.crop_resolution = crop_resolution
+        self.pdf_lock = pdf_lock
 
     def process(
-        self, document_page_blocks: DocumentPageBlocks
+        self,
+        document_page_blocks: DocumentPageBlocks,
+        metrics: Optional[PipelineMetrics] = None,
     ) -> list[PageFragment]:
         table_images = []
         table_blocks: list[TableFragmentInformation] = []
         for page_block in document_page_blocks.page_blocks:
-            for table_block in page_block.table_blocks:
-                table_image = table_block.pad_ratio(0.05).crop_image(
-                    page_block.page_image
-                )
-                table_images.append(table_image)
-                table_blocks.append(
-                    TableFragmentInformation(
-                        page_number=page_block.page_number,
-                        table_block=table_block,
+            with span(
+                metrics,
+                "page",
+                "page",
+                page_number=page_block.page_number,
+                fragment_type=PageFragmentType.TABLE.value,
+            ):
+                for table_block in page_block.table_blocks:
+                    table_image = _crop_fragment(
+                        page_block,
+                        table_block,
+                        self.crop_resolution,
+                        PageFragmentType.TABLE,
+                        metrics,
+                        self.pdf_lock,
+                    )
+                    table_images.append(table_image)
+                    table_blocks.append(
+                        TableFragmentInformation(
+                            page_number=page_block.page_number,
+                            table_block=table_block,
+                        )
                     )
-                )
 
         if self.table_extractor:
             _logger.info(
                 "Running table extractor on %d table fragments",
                 len(table_images),
             )
-            ocr_results = self.table_extractor.process(table_images)
+            with record(
+                metrics,
+                "table_extractor",
+                len(table_images),
+                category="model",
+                model_id=self.table_extractor.model_id,
+                fragment_type=PageFragmentType.TABLE.value,
+            ):
+                ocr_results = self.table_extractor.process(table_images)
             table_encoding = TableEncoding.JSON
         else:
             _logger.info(
                 "Running OCR on %d table fragments", len(table_images)
             )
-            ocr_results = self.ocr_detector.process(table_images)
+            with record(
+                metrics,
+                "ocr",
+                len(table_images),
+                category="model",
+                model_id=self.ocr_detector.model_id,
+                fragment_type=PageFragmentType.TABLE.value,
+            ):
+                ocr_results = self.ocr_detector.process(table_images)
             table_encoding = TableEncoding.TEXT
 
         table_fragments = []
@@ -111,38 +188,74 @@ class FigureFragmentInformation:
 
 class FigureFragmentProcessor(FragmentProcessor):
     def __init__(
-        self, ocr_detector: BaseOCR, figure_extractor: BaseFigureExtractor
+        self,
+        ocr_detector: BaseOCR,
+        figure_extractor: BaseFigureExtractor,
+        crop_resolution: Optional[int] = None,
+        pdf_lock: Optional[threading.Lock] = None,
     ):
         self.ocr_detector = ocr_detector
         self.figure_extractor = figure_extractor
+        self.crop_resolution = crop_resolution
+        self.pdf_lock = pdf_lock
 
     def process(
-        self, document_page_blocks: DocumentPageBlocks
+        self,
+        document_page_blocks: DocumentPageBlocks,
+        metrics: Optional[PipelineMetrics] = None,
     ) -> list[PageFragment]:
         figure_images = []
         figure_blocks: list[FigureFragmentInformation] = []
         for page_block in document_page_blocks.page_blocks:
-            for figure_block in page_block.figure_blocks:
-                figure_images.append(
-                    figure_block.pad_ratio(0.05).crop_image(
-                        page_block.page_image
+            with span(
+                metrics,
+                "page",
+                "page",
+                page_number=page_block.page_number,
+                fragment_type=PageFragmentType.FIGURE.value,
+            ):
+                for figure_block in page_block.figure_blocks:
+                    figure_images.append(
+                        _crop_fragment(
+                            page_block,
+                            figure_block,
+                            self.crop_resolution,
+                            PageFragmentType.FIGURE,
+                            metrics,
+                            self.pdf_lock,
+                        )
                     )
-                )
-                figure_blocks.append(
-                    FigureFragmentInformation(
-                        page_number=page_block.page_number,
-                        figure_block=figure_block,
+                    figure_blocks.append(
+                        FigureFragmentInformation(
+                            page_number=page_block.page_number,
+                            figure_block=figure_block,
+                        )
                     )
-                )
 
         _logger.info(
             "Running figure extractor on %d figure fragments",
             len(figure_images),
         )
         if self.figure_extractor:
-            ocr_results = self.figure_extractor.process(figure_images)
+            with record(
+                metrics,
+                "figure_extractor",
+                len(figure_images),
+                category="model",
+                model_id=self.figure_extractor.model_id,
+                fragment_type=PageFragmentType.FIGURE.value,
+            ):
+                ocr_results = self.figure_extractor.process(figure_images)
         else:
-            ocr_results = self.ocr_detector.process(figure_images)
+            with record(
+                metrics,
+                "ocr",
+                len(figure_images),
+                category="model",
+                model_id=self.ocr_detector.model_id,
+                fragment_type=PageFragmentType.FIGURE.value,
+            ):
+                ocr_results = self.ocr_detector.process(figure_images)
 
         figure_fragments = []
         for ocr_result, figure_block in zip(ocr_results, figure_blocks):
@@ -165,40 +278,167 @@ class FigureFragmentProcessor(FragmentProcessor):
 class TextFragmentInformation:
     page_number: int
     text_block: LayoutBlock
+    text: Optional[str] = None
 
 
 class TextFragmentProcessor(FragmentProcessor):
-    def __init__(self, ocr_detector: BaseOCR):
+    def __init__(
+        self,
+        ocr_detector: BaseOCR,
+        crop_resolution: Optional[int] = None,
+        use_text_layer: bool = False,
+        page_ocr: bool = False,
+        pdf_lock: Optional[threading.Lock] = None,
+    ):
         self.ocr_detector = ocr_detector
+        self.crop_resolution = crop_resolution
+        self.use_text_layer = use_text_layer
+        self.page_ocr = page_ocr
+        self.pdf_lock = pdf_lock
+        if page_ocr and ocr_detector and not ocr_detector.supports_words:
+            _logger.warning(
+                "OCR detector %s does not recognize words, text blocks are "
+                "recognized one by one",
+                ocr_detector.model_id,
+            )
+            self.page_ocr = False
+
+    def _read_text_layer(self, page_block: PageBlocks) -> list[Optional[str]]:
+        if not self.use_text_layer or page_block.pdf_page is None:
+            return [None] * len(page_block.text_blocks)
+
+        with _reading_pdf(self.pdf_lock):
+            words = extract_text_layer(
+                page_block.pdf_page, scale=1 / page_block.pdf_scale
+            )
+        block_words = assign_words_to_blocks(words, page_block.text_blocks)
+        texts = [words_to_text(words) for words in block_words]
+        return [text if is_usable_text(text) else None for text in texts]
+
+    def _ocr_crops(
+        self,
+        text_images: list[np.ndarray],
+        ocr_blocks: list[TextFragmentInformation],
+        metrics: Optional[PipelineMetrics] = None,
+    ):
+        _logger.info("Running OCR on %d text fragments", len(text_images))
+        if not text_images:
+            return
+        with record(
+            metrics,
+            "ocr",
+            len(text_images),
+            category="model",
+            model_id=self.ocr_detector.model_id,
+            fragment_type=PageFragmentType.TEXT.value,
+        ):
+            ocr_results = self.ocr_detector.process(text_images)
+        for ocr_result, text_block in zip(ocr_results, ocr_blocks):
+            text_block.text = ocr_result
+
+    def _ocr_pages(
+        self,
+        ocr_pages: list[tuple[PageBlocks, list[TextFragmentInformation]]],
+        metrics: Optional[PipelineMetrics] = None,
+    ):
+        # Pages are recognized once and their words are assigned to the
+        # blocks containing them, instead of recognizing every block crop
+        _logger.info("Running OCR on %d pages", len(ocr_pages))
+        if not ocr_pages:
+            return
+        with _reading_pdf(self.pdf_lock):
+            page_images, image_scales = zip(
+                *[
+                    render_page_image(page_block, self.crop_resolution)
+                    for page_block, _ in ocr_pages
+                ]
+            )
+        with record(
+            metrics,
+            "ocr",
+            len(page_images),
+            category="model",
+            model_id=self.ocr_detector.model_id,
+            fragment_type=PageFragmentType.TEXT.value,
+            ocr_mode="page",
+        ):
+            page_words = self.ocr_detector.process_words(list(page_images))
+
+        for words, image_scale, (_, ocr_blocks) in zip(
+            page_words, image_scales, ocr_pages
+        ):
+            block_words = assign_words_to_blocks(
+                words.scale(1 / image_scale),
+                [text_block.text_block for text_block in ocr_blocks],
+            )
+            for text_block, words in zip(ocr_blocks, block_words):
+                text_block.text = words_to_text(words)
 
     def process(
-        self, document_page_blocks: DocumentPageBlocks
+        self,
+        document_page_blocks: DocumentPageBlocks,
+        metrics: Optional[PipelineMetrics] = None,
     ) -> list[PageFragment]:
         text_images: list[np.ndarray] = []
         text_blocks: list[TextFragmentInformation] = []
+        ocr_blocks: list[TextFragmentInformation] = []
+        ocr_pages: list[tuple[PageBlocks, list[TextFragmentInformation]]] = []
         for page_block in document_page_blocks.page_blocks:
-            for text_block in page_block.text_blocks:
-                text_images.append(
-                    text_block.pad_ratio(0.05).crop_image(
-                        page_block.page_image
-                    )
-                )
-                text_blocks.append(
-                    TextFragmentInformation(
+            with span(
+                metrics,
+                "page",
+                "page",
+                page_number=page_block.page_number,
+                fragment_type=PageFragmentType.TEXT.value,
+            ):
+                texts = self._read_text_layer(page_block)
+                page_ocr_blocks = []
+                for text_block, text in zip(page_block.text_blocks, texts):
+                    text_information = TextFragmentInformation(
                         page_number=page_block.page_number,
                         text_block=text_block,
+                        text=text,
                     )
-                )
+                    text_blocks.append(text_information)
+                    if text is not None:
+                        continue
+                    if self.page_ocr:
+                        page_ocr_blocks.append(text_information)
+                        continue
+
+                    text_images.append(
+                        _crop_fragment(
+                            page_block,
+                            text_block,
+                            self.crop_resolution,
+                            PageFragmentType.TEXT,
+                            metrics,
+                            self.pdf_lock,
+                        )
+                    )
+                    ocr_blocks.append(text_information)
+                if page_ocr_blocks:
+                    ocr_pages.append((page_block, page_ocr_blocks))
+
+        if self.use_text_layer:
+            _logger.info(
+                "Read %d text fragments from the PDF text layer",
+                len(text_blocks)
+                - len(ocr_blocks)
+                - sum(len(blocks) for _, blocks in ocr_pages),
+            )
+        if self.page_ocr:
+            self._ocr_pages(ocr_pages, metrics)
+        else:
+            self._ocr_crops(text_images, ocr_blocks, metrics)
 
-        _logger.info("Running OCR on %d text fragments", len(text_images))
-        ocr_results = self.ocr_detector.process(text_images)
         text_fragments = []
-        for ocr_result, text_block in zip(ocr_results, text_blocks):
+        for text_block in text_blocks:
             text_fragments.append(
                 PageFragment(
                     fragment_type=PageFragmentType.TEXT,
                     content=TextBox(
-                        text=ocr_result,
+                        text=text_block.text,
                         text_type=text_block.text_block.type,
                         bbox=text_block.text_block.rectangle.bbox_dict(),
                         score=text_block.text_block.score,
@@ -2,8 +2,11 @@ import logging
 from typing import Optional
 
 from inkwell.components.document import PageImage
+from inkwell.io.input import DEFAULT_PAGE_RESOLUTION
 from inkwell.layout_detector.base import BaseLayoutDetector
+from inkwell.pipeline.overlap_suppression import OverlapSuppressor
 from inkwell.reading_order.base import BaseReadingOrderDetector
+from inkwell.utils.metrics import PipelineMetrics, record
 
 _logger = logging.getLogger(__name__)
 
@@ -13,25 +16,68 @@ class LayoutProcessor:
         self,
         layout_detector: BaseLayoutDetector,
         reading_order_detector: Optional[BaseReadingOrderDetector] = None,
+        page_resolution: int = DEFAULT_PAGE_RESOLUTION,
+        overlap_suppressor: Optional[OverlapSuppressor] = None,
     ):
 
         self._layout_detector = layout_detector
         self._reading_order_detector = reading_order_detector
+        self._overlap_suppressor = overlap_suppressor
+        self._page_resolution = page_resolution
 
-    def process(self, page_images: list[PageImage]) -> list[PageImage]:
+    def _to_page_coordinates(self, page_image: PageImage, layout):
+        # Layouts detected on a raster rendered at another resolution are
+        # mapped to the coordinates of a page rendered at page_resolution
+        if (
+            page_image.resolution is None
+            or page_image.resolution == self._page_resolution
+        ):
+            return layout
+        return layout.scale(self._page_resolution / page_image.resolution)
+
+    def process(
+        self,
+        page_images: list[PageImage],
+        metrics: Optional[PipelineMetrics] = None,
+    ) -> list[PageImage]:
         _logger.info("Running layout detector on %d pages", len(page_images))
         image_batch = [page_image.page_image for page_image in page_images]
-        layouts = self._layout_detector.process(image_batch=image_batch)
+        with record(
+            metrics,
+            "layout",
+            len(image_batch),
+            category="model",
+            model_id=self._layout_detector.model_id,
+        ):
+            layouts = self._layout_detector.process(image_batch=image_batch)
+        if self._overlap_suppressor:
+            # Before reading order, which then only orders the kept blocks
+            with record(metrics, "overlap_suppression", len(layouts)):
+                layouts, saved_calls = self._overlap_suppressor.process(
+                    layouts
+                )
+            if metrics is not None:
+                for name, count in saved_calls.items():
+                    metrics.count(name, count)
         if self._reading_order_detector:
-            layouts = self._reading_order_detector.process(
-                image_batch=image_batch, layout_batch=layouts
-            )
+            with record(
+                metrics,
+                "reading_order",
+                len(image_batch),
+                category="model",
+                model_id=self._reading_order_detector.model_id,
+            ):
+                layouts = self._reading_order_detector.process(
+                    image_batch=image_batch, layout_batch=layouts
+                )
 
         return [
             PageImage(
                 page_image=page_image.page_image,
                 page_number=page_image.page_number,
-                page_layout=layout,
+                page_layout=self._to_page_coordinates(page_image, layout),
+                pdf_page=page_image.pdf_page,
+                resolution=page_image.resolution,
             )
             for (page_image, layout) in zip(page_images, layouts)
         ]
@@ -0,0 +1,187 @@
+from collections import Counter
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from inkwell.components import Layout, Rectangle, SpatialIndex
+
+# The counters of the downstream calls saved by dropping a block, by the
+# type of the block, as split_layout_blocks routes them
+_SAVED_CALL_COUNTERS = {
+    "Figure": "saved_figure_extractor_calls",
+    "Table": "saved_table_extractor_calls",
+}
+_SAVED_OCR_CALLS = "saved_ocr_calls"
+
+
+class PriorityRule(NamedTuple):
+    """
+    Drop a block of type `loser` when at least `min_coverage` of its area
+    is covered by a block of type `winner`, e.g. the Text blocks detected
+    inside a Table.
+    """
+
+    winner: str
+    loser: str
+    min_coverage: float = 0.8
+
+
+DEFAULT_PRIORITY_RULES = (
+    PriorityRule("Table", "Text"),
+    PriorityRule("Table", "List"),
+    PriorityRule("Figure", "Text"),
+    PriorityRule("Figure", "List"),
+)
+
+
+def saved_call_counter(block_type: str) -> str:
+    """
+    The name of the counter of the downstream calls saved by dropping a
+    block of `block_type`.
+    """
+    return _SAVED_CALL_COUNTERS.get(block_type, _SAVED_OCR_CALLS)
+
+
+class OverlapSuppressor:
+    """
+    Remove the blocks of a detected layout that cover the same region as
+    another block, so that the region is only sent once to OCR, the table
+    extractor or the figure extractor.
+
+    Blocks of different types are resolved by the priority rules. Blocks
+    of the same type are duplicates when their IoU or the fraction of the
+    smaller one inside the other reaches a threshold; the best block, by
+    score and then area, is extended to cover its duplicates. As in Fast
+    NMS, a block is dropped when any better block suppresses it, even if
+    that block is itself dropped.
+
+    Args:
+        priority_rules (Iterable[PriorityRule], optional): The rules that
+            resolve the overlaps between blocks of different types.
+        iou_threshold (float, optional): The IoU above which blocks of the
+            same type are merged.
+        containment_threshold (float, optional): The fraction of the area
+            of a block inside another block of the same type above which
+            they are merged.
+    """
+
+    def __init__(
+        self,
+        priority_rules: Iterable[PriorityRule] = DEFAULT_PRIORITY_RULES,
+        iou_threshold: float = 0.5,
+        containment_threshold: float = 0.8,
+    ):
+        self.priority_rules = [PriorityRule(*rule) for rule in priority_rules]
+        self.iou_threshold = iou_threshold
+        self.containment_threshold = containment_threshold
+
+    def _min_coverages(self, type_names: np.ndarray) -> np.ndarray:
+        # The minimal coverage of a loser by a winner, by their type codes
+        type_codes = {name: code for code, name in enumerate(type_names)}
+        min_coverages = np.full((len(type_names), len(type_names)), np.inf)
+        for winner, loser, min_coverage in self.priority_rules:
+            if winner in type_codes and loser in type_codes:
+                index = type_codes[winner], type_codes[loser]
+                min_coverages[index] = min(min_coverages[index], min_coverage)
+        return min_coverages
+
+    def suppress(self, layout: Layout) -> tuple[Layout, Counter]:
+        """
+        Suppress the overlapping blocks of a layout.
+
+        Returns:
+            tuple[Layout, Counter]: The remaining blocks, in their original
+            order, and the number of downstream calls saved by counter
+            name.
+        """
+        blocks = layout.get_blocks()
+        if len(blocks) < 2:
+            return layout, Counter()
+
+        boxes = np.array([block.coordinates for block in blocks], dtype=float)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        type_names, type_codes = np.unique(
+            [str(block.type) for block in blocks], return_inverse=True
+        )
+        scores = np.array(
+            [
+                -np.inf if block.score is None else block.score
+                for block in blocks
+            ],
+            dtype=float,
+        )
+
+        first, second = SpatialIndex(boxes).intersecting(boxes)
+        distinct = first != second
+        first, second = first[distinct], second[distinct]
+        overlaps = np.maximum(
+            0,
+            np.minimum(boxes[first, 2:], boxes[second, 2:])
+            - np.maximum(boxes[first, :2], boxes[second, :2]),
+        ).prod(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            coverages = overlaps / areas[second]
+            ious = overlaps / (areas[first] + areas[second] - overlaps)
+            containments = overlaps / np.minimum(areas[first], areas[second])
+
+        # Blocks covered by a block of a type with priority over theirs
+        ruled = (
+            coverages
+            >= self._min_coverages(type_names)[
+                type_codes[first], type_codes[second]
+            ]
+        )
+
+        # Duplicate blocks of the same type, merged into the best one
+        ranks = np.empty(len(blocks), dtype=np.int64)
+        ranks[np.lexsort((np.arange(len(blocks)), -areas, -scores))] = (
+            np.arange(len(blocks))
+        )
+        merged = (
+            (type_codes[first] == type_codes[second])
+            & (
+                (ious >= self.iou_threshold)
+                | (containments >= self.containment_threshold)
+            )
+            & (ranks[first] < ranks[second])
+        )
+
+        dropped = np.zeros(len(blocks), dtype=bool)
+        dropped[second[ruled | merged]] = True
+        if not dropped.any():
+            return layout, Counter()
+
+        winners, losers = first[merged], second[merged]
+        merged_boxes = boxes.copy()
+        for column, reduce in enumerate(
+            [np.minimum, np.minimum, np.maximum, np.maximum]
+        ):
+            reduce.at(merged_boxes[:, column], winners, boxes[losers, column])
+        extended = (merged_boxes != boxes).any(axis=1)
+
+        remaining = []
+        for index in np.flatnonzero(~dropped).tolist():
+            block = blocks[index]
+            if extended[index]:
+                block = block.set(
+                    block=Rectangle(*merged_boxes[index].tolist())
+                )
+            remaining.append(block)
+
+        saved_calls = Counter(
+            saved_call_counter(blocks[index].type)
+            for index in np.flatnonzero(dropped).tolist()
+        )
+        return Layout(remaining, page_data=layout.page_data), saved_calls
+
+    def process(self, layouts: list[Layout]) -> tuple[list[Layout], Counter]:
+        """
+        Suppress the overlapping blocks of a batch of layouts.
+        """
+        saved_calls = Counter()
+        results = []
+        for layout in layouts:
+            layout, layout_saved_calls = self.suppress(layout)
+            saved_calls.update(layout_saved_calls)
+            results.append(layout)
+        return results, saved_calls
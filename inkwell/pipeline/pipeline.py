@@ -1,36 +1,125 @@
+import heapq
 import logging
-from typing import List, Optional
+import threading
+import time
+from contextlib import ExitStack, nullcontext
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional
 
 from inkwell.api.document import Document
-from inkwell.api.page import Page
+from inkwell.api.page import Page, PageFragment
+from inkwell.cache import (
+    CachedFigureExtractor,
+    CachedOCR,
+    CachedTableExtractor,
+    FragmentCache,
+    cache_model_id,
+)
+from inkwell.components.document import DocumentPageBlocks, PageImage
 from inkwell.figure_extractor import FigureExtractorFactory
 from inkwell.figure_extractor.base import BaseFigureExtractor
-from inkwell.io import read_pdf_pages
+from inkwell.io import iter_pdf_pages
+from inkwell.io.input import DEFAULT_PAGE_RESOLUTION
 from inkwell.layout_detector import LayoutDetectorFactory
 from inkwell.layout_detector.base import BaseLayoutDetector
 from inkwell.ocr import OCRFactory
 from inkwell.ocr.base import BaseOCR
+from inkwell.ocr.preprocessing import OCRPreprocessor, PreprocessedOCR
+from inkwell.pipeline.checkpoint import PageCheckpoint
 from inkwell.pipeline.fragment_processor import (
     FigureFragmentProcessor,
     TableFragmentProcessor,
     TextFragmentProcessor,
 )
 from inkwell.pipeline.layout_processor import LayoutProcessor
+from inkwell.pipeline.overlap_suppression import OverlapSuppressor
 from inkwell.pipeline.pipeline_config import (
     DefaultPipelineConfig,
     PipelineConfig,
 )
-from inkwell.pipeline.utils import combine_fragments, split_layout_blocks
+from inkwell.pipeline.staged_executor import StagedExecutor
+from inkwell.pipeline.utils import (
+    combine_fragments,
+    iter_windows,
+    split_layout_blocks,
+)
 from inkwell.reading_order import ReadingOrderDetectorFactory
 from inkwell.reading_order.base import BaseReadingOrderDetector
 from inkwell.table_detector import TableDetectorFactory
 from inkwell.table_detector.base import BaseTableDetector
 from inkwell.table_extractor import TableExtractorFactory
 from inkwell.table_extractor.base import BaseTableExtractor
+from inkwell.utils.metrics import (
+    MetricsCallback,
+    PipelineMetrics,
+    record,
+    span,
+)
+from inkwell.utils.tracing import Tracer
 
 _logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _Window:
+    """
+    A window of pages and the results of the stages run on it so far.
+    """
+
+    pages: list[PageImage]
+    page_blocks: Optional[DocumentPageBlocks] = None
+    text_fragments: list[PageFragment] = field(default_factory=list)
+    figure_fragments: list[PageFragment] = field(default_factory=list)
+    table_fragments: list[PageFragment] = field(default_factory=list)
+    metrics: Optional[PipelineMetrics] = None
+
+
+@dataclass
+class _WindowResult:
+    page_numbers: list[int]
+    pages_map: dict[int, list[PageFragment]]
+
+
+def _with_locks(stage: Callable, *locks: Optional[threading.Lock]) -> Callable:
+    locks = [lock for lock in locks if lock is not None]
+    if not locks:
+        return stage
+
+    def locked_stage(item):
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            return stage(item)
+
+    return locked_stage
+
+
+def _locked_iter(iterable: Iterable, lock: Optional[threading.Lock]):
+    # Pages attached to rendered windows share the file handle of their PDF
+    # document, so rendering waits for the stages' reads from it
+    iterator = iter(iterable)
+    try:
+        while True:
+            with lock or nullcontext():
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
+
+
+def _start_window(
+    pages: list[PageImage], metrics: Optional[PipelineMetrics] = None
+) -> _Window:
+    _logger.info("Processing a window of %d pages", len(pages))
+    return _Window(pages=pages, metrics=metrics)
+
+
 class Pipeline:
     def __init__(
         self,
@@ -41,8 +130,10 @@ class Pipeline:
         table_extractor: BaseTableExtractor = None,
         figure_extractor: BaseFigureExtractor = None,
         reading_order_detector: BaseReadingOrderDetector = None,
+        metrics_callback: Optional[MetricsCallback] = None,
     ):
         self.config = config
+        self.metrics_callback = metrics_callback
         self._model_ids = {}
 
         self._initialize_layout_detector(layout_detector)
@@ -51,23 +142,68 @@ class Pipeline:
         self._initialize_table_extractor(table_extractor)
         self._initialize_figure_extractor(figure_extractor)
         self._initialize_reading_order_detector(reading_order_detector)
+        self._initialize_fragment_cache()
+        # Serializes the reads from the PDF documents the pages are attached
+        # to, which share one file handle per document
+        self._pdf_lock = threading.Lock()
         self.table_fragment_processor = TableFragmentProcessor(
             ocr_detector=self.ocr_detector,
             table_extractor=self.table_extractor,
+            crop_resolution=self._crop_resolution(
+                self.config.table_crop_resolution
+            ),
+            pdf_lock=self._pdf_lock,
         )
 
         self.figure_fragment_processor = FigureFragmentProcessor(
             ocr_detector=self.ocr_detector,
             figure_extractor=self.figure_extractor,
+            crop_resolution=self._crop_resolution(
+                self.config.figure_crop_resolution
+            ),
+            pdf_lock=self._pdf_lock,
         )
 
         self.text_fragment_processor = TextFragmentProcessor(
-            ocr_detector=self.ocr_detector
+            ocr_detector=self.ocr_detector,
+            crop_resolution=self._crop_resolution(
+                self.config.text_crop_resolution
+            ),
+            use_text_layer=self.config.use_text_layer,
+            page_ocr=self.config.page_ocr,
+            pdf_lock=self._pdf_lock,
         )
 
         self._layout_processor = LayoutProcessor(
             layout_detector=self.layout_detector,
             reading_order_detector=self.reading_order_detector,
+            overlap_suppressor=self._overlap_suppressor(),
+        )
+
+    def _overlap_suppressor(self) -> Optional[OverlapSuppressor]:
+        if not self.config.suppress_overlapping_blocks:
+            return None
+        return OverlapSuppressor(
+            priority_rules=self.config.overlap_priority_rules,
+            iou_threshold=self.config.overlap_iou_threshold,
+            containment_threshold=self.config.overlap_containment_threshold,
+        )
+
+    def _crop_resolution(self, crop_resolution: Optional[int]):
+        if crop_resolution is None and self.config.layout_resolution:
+            return DEFAULT_PAGE_RESOLUTION
+        return crop_resolution
+
+    def _attach_pdf_pages(self) -> bool:
+        if self.text_fragment_processor.use_text_layer:
+            return True
+        return any(
+            processor.crop_resolution is not None
+            for processor in (
+                self.text_fragment_processor,
+                self.figure_fragment_processor,
+                self.table_fragment_processor,
+            )
         )
 
     def _initialize_layout_detector(
@@ -92,13 +228,26 @@ class Pipeline:
         elif self.config.ocr_detector:
             self.ocr_detector = OCRFactory.get_ocr(
                 self.config.ocr_detector,
-                **{"inference_backend": self.config.inference_backend},
+                **{
+                    "inference_backend": self.config.inference_backend,
+                    **self.config.ocr_detector_kwargs,
+                },
             )
         else:
             self.ocr_detector = None
 
+        if self.ocr_detector and self.config.preprocess_ocr_crops:
+            self.ocr_detector = PreprocessedOCR(
+                self.ocr_detector,
+                OCRPreprocessor(
+                    target_x_height=self.config.ocr_target_x_height,
+                    binarize=self.config.ocr_binarize,
+                    deskew=self.config.ocr_deskew,
+                ),
+            )
+
         if self.ocr_detector:
-            self._model_ids["ocr_detector"] = self.ocr_detector.model_id
+            self._model_ids["ocr_detector"] = cache_model_id(self.ocr_detector)
 
     def _initialize_table_detector(
         self, table_detector: Optional[BaseTableDetector] = None
@@ -129,7 +278,9 @@ class Pipeline:
             self.table_extractor = None
 
         if self.table_extractor:
-            self._model_ids["table_extractor"] = self.table_extractor.model_id
+            self._model_ids["table_extractor"] = cache_model_id(
+                self.table_extractor
+            )
 
     def _initialize_figure_extractor(
         self, figure_extractor: Optional[BaseFigureExtractor] = None
@@ -146,8 +297,8 @@ class Pipeline:
             self.figure_extractor = None
 
         if self.figure_extractor:
-            self._model_ids["figure_extractor"] = (
-                self.figure_extractor.model_id
+            self._model_ids["figure_extractor"] = cache_model_id(
+                self.figure_extractor
             )
 
     def _initialize_reading_order_detector(
@@ -169,6 +320,28 @@ class Pipeline:
                 self.reading_order_detector.model_id
             )
 
+    def _initialize_fragment_cache(self):
+        if not self.config.use_fragment_cache:
+            self.fragment_cache = None
+            return
+
+        self.fragment_cache = FragmentCache(
+            self.config.fragment_cache_path,
+            max_size_bytes=self.config.fragment_cache_max_bytes,
+        )
+        if self.ocr_detector:
+            self.ocr_detector = CachedOCR(
+                self.ocr_detector, self.fragment_cache
+            )
+        if self.table_extractor:
+            self.table_extractor = CachedTableExtractor(
+                self.table_extractor, self.fragment_cache
+            )
+        if self.figure_extractor:
+            self.figure_extractor = CachedFigureExtractor(
+                self.figure_extractor, self.fragment_cache
+            )
+
     def model_ids(self):
         return self._model_ids
 
@@ -181,33 +354,163 @@ class Pipeline:
     def __repr__(self):
         return self._str_repr()
 
-    def process(
-        self, document_path: str, pages_to_parse: List[int] = None
-    ) -> Document:
+    def _detect_layout(self, window: _Window) -> _Window:
+        pages_layouts = self._layout_processor.process(
+            window.pages, metrics=window.metrics
+        )
+        window.page_blocks = split_layout_blocks(pages_layouts)
+        return window
 
-        _logger.info(self._str_repr())
+    def _process_text_fragments(self, window: _Window) -> _Window:
+        num_blocks = sum(
+            len(page_block.text_blocks)
+            for page_block in window.page_blocks.page_blocks
+        )
+        with record(
+            window.metrics,
+            "text_fragments",
+            num_blocks,
+            page_numbers=[page.page_number for page in window.pages],
+        ):
+            window.text_fragments = self.text_fragment_processor.process(
+                window.page_blocks, metrics=window.metrics
+            )
+        return window
 
-        pages = read_pdf_pages(document_path, pages_to_parse)
-        pages_layouts = self._layout_processor.process(pages)
+    def _process_figure_fragments(self, window: _Window) -> _Window:
+        num_blocks = sum(
+            len(page_block.figure_blocks)
+            for page_block in window.page_blocks.page_blocks
+        )
+        with record(
+            window.metrics,
+            "figure_fragments",
+            num_blocks,
+            page_numbers=[page.page_number for page in window.pages],
+        ):
+            window.figure_fragments = self.figure_fragment_processor.process(
+                window.page_blocks, metrics=window.metrics
+            )
+        return window
 
-        document_page_blocks = split_layout_blocks(pages_layouts)
+    def _process_table_fragments(self, window: _Window) -> _Window:
+        num_blocks = sum(
+            len(page_block.table_blocks)
+            for page_block in window.page_blocks.page_blocks
+        )
+        with record(
+            window.metrics,
+            "table_fragments",
+            num_blocks,
+            page_numbers=[page.page_number for page in window.pages],
+        ):
+            window.table_fragments = self.table_fragment_processor.process(
+                window.page_blocks, metrics=window.metrics
+            )
+        return window
 
-        text_fragments = self.text_fragment_processor.process(
-            document_page_blocks
+    def _combine_fragments(self, window: _Window) -> _WindowResult:
+        # Release the objects parsed while re-rendering fragment crops, and
+        # the source PDF after its last page. Windows are combined in page
+        # order, so no later window uses that PDF.
+        for page in window.pages:
+            if page.pdf_page is not None:
+                page.pdf_page.close()
+            if page.pdf_document is not None:
+                page.pdf_document.close()
+
+        _logger.info("Combining fragments")
+        pages_map = combine_fragments(
+            window.figure_fragments,
+            window.table_fragments,
+            window.text_fragments,
         )
-        figure_fragments = self.figure_fragment_processor.process(
-            document_page_blocks
+        return _WindowResult(
+            page_numbers=[page.page_number for page in window.pages],
+            pages_map=pages_map,
         )
-        table_fragments = self.table_fragment_processor.process(
-            document_page_blocks
+
+    def _window_stages(self) -> list[Callable]:
+        return [
+            self._detect_layout,
+            self._process_text_fragments,
+            self._process_figure_fragments,
+            self._process_table_fragments,
+            self._combine_fragments,
+        ]
+
+    def _process_window(
+        self,
+        pages: list[PageImage],
+        metrics: Optional[PipelineMetrics] = None,
+    ) -> _WindowResult:
+        result = _Window(pages=pages, metrics=metrics)
+        with span(
+            metrics,
+            "batch",
+            "batch",
+            page_numbers=[page.page_number for page in pages],
+        ):
+            for stage in self._window_stages():
+                result = stage(result)
+        return result
+
+    def _overlapped_window_stages(
+        self, pdf_lock: Optional[threading.Lock]
+    ) -> list[Callable]:
+        # Backends are not assumed to be thread safe: stages sharing the OCR
+        # backend take turns. Reads from the source PDF take turns within
+        # the fragment processors, and with closing it once combined.
+        ocr_lock = threading.Lock()
+        text_stage, figure_stage, table_stage = (
+            _with_locks(self._process_text_fragments, ocr_lock),
+            _with_locks(
+                self._process_figure_fragments,
+                None if self.figure_extractor else ocr_lock,
+            ),
+            _with_locks(
+                self._process_table_fragments,
+                None if self.table_extractor else ocr_lock,
+            ),
         )
+        return [
+            self._detect_layout,
+            text_stage,
+            figure_stage,
+            table_stage,
+            _with_locks(self._combine_fragments, pdf_lock),
+        ]
 
-        _logger.info("Combining fragments")
-        pages_map = combine_fragments(
-            figure_fragments, table_fragments, text_fragments
+    def _iter_window_results(
+        self,
+        page_images: Iterator[PageImage],
+        window_size: Optional[int],
+        first_window_size: Optional[int] = None,
+        metrics: Optional[PipelineMetrics] = None,
+    ) -> Iterator[_WindowResult]:
+        if metrics is not None:
+            page_images = metrics.iter_timed("rasterization", page_images)
+        windows = iter_windows(page_images, window_size, first_window_size)
+        if not self.config.overlap_stages:
+            for window in windows:
+                _logger.info("Processing a window of %d pages", len(window))
+                yield self._process_window(window, metrics)
+            return
+
+        pdf_lock = self._pdf_lock if self._attach_pdf_pages() else None
+        executor = StagedExecutor(
+            [partial(_start_window, metrics=metrics)]
+            + self._overlapped_window_stages(pdf_lock),
+            queue_size=self.config.stage_queue_size,
         )
+        yield from executor.run(_locked_iter(windows, pdf_lock))
+
+    def _assemble_pages(
+        self, pages_map: dict[int, list[PageFragment]]
+    ) -> list[Page]:
         pages = []
-        for page_number, page_fragments in pages_map.items():
+        for page_number in sorted(pages_map):
+            page_fragments = pages_map[page_number]
             if self.reading_order_detector:
                 page_fragments.sort(key=lambda x: x.reading_order_index)
 
@@ -216,6 +519,256 @@ class Pipeline:
                 page_fragments=page_fragments,
             )
             pages.append(page)
+        return pages
+
+    def _new_metrics(self) -> PipelineMetrics:
+        tracer = Tracer() if self.config.trace_dir else None
+        return PipelineMetrics(self.metrics_callback, tracer=tracer)
+
+    def _save_trace(self, metrics: PipelineMetrics, name: str):
+        if metrics.tracer is None or not self.config.trace_dir:
+            return
+
+        trace_path = (
+            Path(self.config.trace_dir) / f"{name}-{time.time_ns()}.json"
+        )
+        metrics.tracer.save(trace_path)
+        _logger.info("Saved trace to %s", trace_path)
+
+    def _iter_page_images(
+        self,
+        document_path: str,
+        pages_to_parse: List[int] = None,
+        skip_page_numbers: Optional[set[int]] = None,
+    ) -> Iterator[PageImage]:
+        return iter_pdf_pages(
+            document_path,
+            pages_to_parse,
+            num_workers=self.config.rasterization_workers,
+            chunk_size=self.config.rasterization_chunk_size,
+            resolution=self.config.layout_resolution
+            or DEFAULT_PAGE_RESOLUTION,
+            attach_pdf_pages=self._attach_pdf_pages(),
+            skip_page_numbers=skip_page_numbers,
+        )
+
+    def process_iter(
+        self,
+        document_path: str,
+        pages_to_parse: List[int] = None,
+        first_page_fast_path: bool = True,
+        metrics: Optional[PipelineMetrics] = None,
+    ) -> Iterator[Page]:
+        """
+        Process a document and yield its pages as soon as each page window
+        is done, in page order. With a checkpoint directory configured,
+        pages completed by an earlier run are loaded instead of processed.
+
+        Args:
+            document_path (str): The path or URL of the PDF or image.
+            pages_to_parse (List[int], optional): The pages to process.
+            first_page_fast_path (bool, optional): Process the first page in
+                a window of its own, so that it is yielded without waiting
+                for the rest of the first window.
+            metrics (PipelineMetrics, optional): Collects the timings of the
+                run. Defaults to metrics that are only reported to the
+                metrics callback of the pipeline.
+        """
+        _logger.info(self._str_repr())
+        if metrics is None:
+            metrics = self._new_metrics()
+
+        try:
+            with metrics.span(
+                "document", "document", document_path=document_path
+            ):
+                yield from self._iter_document_pages(
+                    document_path,
+                    pages_to_parse,
+                    first_page_fast_path,
+                    metrics,
+                )
+        finally:
+            self._save_trace(metrics, Path(document_path).stem)
+
+    def _open_checkpoint(
+        self, document_path: str, pages_to_parse: Optional[List[int]]
+    ) -> tuple[Optional[PageCheckpoint], set[int]]:
+        """
+        The checkpoint of a document, if checkpoints are configured, and the
+        numbers of the pages to parse that it already completed.
+        """
+        if not self.config.checkpoint_dir:
+            return None, set()
+
+        checkpoint = PageCheckpoint(
+            self.config.checkpoint_dir, document_path, self.model_ids()
+        )
+        completed_pages = checkpoint.completed_pages
+        if pages_to_parse is not None:
+            completed_pages &= {i + 1 for i in pages_to_parse}
+        return checkpoint, completed_pages
+
+    def _iter_document_pages(
+        self,
+        document_path: str,
+        pages_to_parse: Optional[List[int]],
+        first_page_fast_path: bool,
+        metrics: PipelineMetrics,
+    ) -> Iterator[Page]:
+        checkpoint, completed_pages = self._open_checkpoint(
+            document_path, pages_to_parse
+        )
+        page_images = self._iter_page_images(
+            document_path, pages_to_parse, skip_page_numbers=completed_pages
+        )
 
-        document = Document(pages=pages)
+        def iter_processed_pages() -> Iterator[Page]:
+            for result in self._iter_window_results(
+                page_images,
+                self.config.page_window_size,
+                1 if first_page_fast_path else None,
+                metrics,
+            ):
+                pages = self._assemble_pages(result.pages_map)
+                if checkpoint:
+                    checkpoint.save(result.page_numbers, pages)
+                yield from pages
+
+        if not completed_pages:
+            yield from iter_processed_pages()
+            return
+
+        # Pages restored from the checkpoint are merged in page order with
+        # the pages processed now
+        yield from heapq.merge(
+            checkpoint.iter_pages(sorted(completed_pages)),
+            iter_processed_pages(),
+            key=lambda page: page.page_number,
+        )
+
+    def process(
+        self, document_path: str, pages_to_parse: List[int] = None
+    ) -> Document:
+        metrics = self._new_metrics()
+        pages = list(
+            self.process_iter(
+                document_path,
+                pages_to_parse,
+                first_page_fast_path=False,
+                metrics=metrics,
+            )
+        )
+        document = Document(
+            pages=pages, metadata={"metrics": metrics.to_dict()}
+        )
         return document
+
+    def process_many(
+        self, document_paths: List[str], pages_to_parse: List[int] = None
+    ) -> List[Document]:
+        """
+        Process several documents together. Windows are filled with pages
+        from consecutive documents, so layout detection and the OCR, table
+        and figure models run on batches pooled across documents. Windows
+        hold `page_window_size` pages, or `pooled_page_window_size` when it
+        is None, so that memory stays bounded however many documents are
+        passed. With a checkpoint directory configured, each document is
+        checkpointed on its own, as with `process_iter`.
+
+        Returns:
+            List[Document]: One document per path, in the order of the paths.
+            Their metadata holds the metrics of the whole batch, including
+            counters such as the OCR cascade escalations, which are not
+            broken down per document.
+        """
+        _logger.info(self._str_repr())
+        metrics = self._new_metrics()
+        window_size = (
+            self.config.page_window_size or self.config.pooled_page_window_size
+        )
+        checkpoints = [
+            self._open_checkpoint(document_path, pages_to_parse)
+            for document_path in document_paths
+        ]
+
+        # Pooled pages are numbered globally while they are processed and
+        # mapped back to their document and page number afterwards
+        page_sources: list[tuple[int, int]] = []
+
+        def iter_pooled_pages() -> Iterator[PageImage]:
+            for document_index, document_path in enumerate(document_paths):
+                _, completed_pages = checkpoints[document_index]
+                for page_image in self._iter_page_images(
+                    document_path,
+                    pages_to_parse,
+                    skip_page_numbers=completed_pages,
+                ):
+                    page_sources.append(
+                        (document_index, page_image.page_number)
+                    )
+                    page_image.page_number = len(page_sources) - 1
+                    yield page_image
+
+        documents_pages: list[list[Page]] = [[] for _ in document_paths]
+        try:
+            with metrics.span(
+                "documents", "document", document_paths=document_paths
+            ):
+                for result in self._iter_window_results(
+                    iter_pooled_pages(), window_size, metrics=metrics
+                ):
+                    self._collect_pooled_pages(
+                        result, page_sources, checkpoints, documents_pages
+                    )
+        finally:
+            self._save_trace(metrics, "batch")
+
+        for document_index, (checkpoint, completed_pages) in enumerate(
+            checkpoints
+        ):
+            if completed_pages:
+                documents_pages[document_index] = list(
+                    heapq.merge(
+                        checkpoint.iter_pages(sorted(completed_pages)),
+                        documents_pages[document_index],
+                        key=lambda page: page.page_number,
+                    )
+                )
+
+        metadata = {"metrics": metrics.to_dict()}
+        return [
+            Document(pages=pages, metadata=metadata)
+            for pages in documents_pages
+        ]
+
+    def _collect_pooled_pages(
+        self,
+        result: _WindowResult,
+        page_sources: list[tuple[int, int]],
+        checkpoints: list[tuple[Optional[PageCheckpoint], set[int]]],
+        documents_pages: list[list[Page]],
+    ):
+        # Pages of a pooled window are renumbered within their document and
+        # checkpointed with the other pages of that document in the window
+        window_page_numbers: dict[int, list[int]] = {}
+        for pooled_page_number in result.page_numbers:
+            document_index, page_number = page_sources[pooled_page_number]
+            window_page_numbers.setdefault(document_index, []).append(
+                page_number
+            )
+
+        window_pages: dict[int, list[Page]] = {}
+        for page in self._assemble_pages(result.pages_map):
+            document_index, page_number = page_sources[page.page_number]
+            page.page_number = page_number
+            for page_fragment in page.page_fragments:
+                page_fragment.page_number = page_number
+            window_pages.setdefault(document_index, []).append(page)
+
+        for document_index, page_numbers in window_page_numbers.items():
+            pages = window_pages.get(document_index, [])
+            documents_pages[document_index].extend(pages)
+            checkpoint, _ = checkpoints[document_index]
+            if checkpoint:
+                checkpoint.save(page_numbers, pages)
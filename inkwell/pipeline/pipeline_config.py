@@ -1,11 +1,17 @@
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel
 
+from inkwell.cache.fragment_cache import DEFAULT_FRAGMENT_CACHE_MAX_BYTES
 from inkwell.figure_extractor import FigureExtractorType
+from inkwell.io.input import DEFAULT_RASTERIZATION_CHUNK_SIZE
 from inkwell.layout_detector import LayoutDetectorType
 from inkwell.models import InferenceBackend
 from inkwell.ocr import OCRType
+from inkwell.pipeline.overlap_suppression import (
+    DEFAULT_PRIORITY_RULES,
+    PriorityRule,
+)
 from inkwell.reading_order import ReadingOrderDetectorType
 from inkwell.table_detector import TableDetectorType
 from inkwell.table_extractor import TableExtractorType
@@ -20,6 +26,69 @@ class PipelineConfig(BaseModel):
     table_extractor: Union[TableExtractorType, None] = None
     inference_backend: Union[InferenceBackend, None] = None
     reading_order_detector: Union[ReadingOrderDetectorType, None] = None
+    # Extra arguments of the OCR detector, e.g. {"num_workers": 4} to run
+    # Tesseract on several blocks at once
+    ocr_detector_kwargs: Dict[str, Any] = {}
+    # Number of pages rendered and processed together. None processes the
+    # whole document at once; a bounded window keeps peak memory flat.
+    page_window_size: Optional[int] = None
+    # Number of pages per window when process_many pools the pages of
+    # several documents and page_window_size is None, so that memory stays
+    # bounded however many documents are passed
+    pooled_page_window_size: int = 32
+    # Number of processes used to rasterize PDF pages and the number of
+    # pages handed to a worker at a time. None renders in-process.
+    rasterization_workers: Optional[int] = None
+    rasterization_chunk_size: int = DEFAULT_RASTERIZATION_CHUNK_SIZE
+    # Resolution (DPI) of the page raster fed to the layout detector. When
+    # set, fragment crops are re-rendered from the PDF at the crop
+    # resolutions below, which default to 512 DPI.
+    layout_resolution: Optional[int] = None
+    text_crop_resolution: Optional[int] = None
+    table_crop_resolution: Optional[int] = None
+    figure_crop_resolution: Optional[int] = None
+    # Read text blocks from the embedded PDF text layer when it is usable
+    # and only OCR the remaining blocks
+    use_text_layer: bool = False
+    # Recognize each page once and assign the recognized words to the text
+    # blocks containing them, instead of recognizing every block crop.
+    # Only used with OCR detectors that recognize words, e.g. Tesseract.
+    page_ocr: bool = False
+    # Rescale the crops sent to the OCR detector so that their glyphs are
+    # ocr_target_x_height pixels high, which speeds up Tesseract on large
+    # glyphs, and optionally binarize and deskew them
+    preprocess_ocr_crops: bool = False
+    ocr_target_x_height: int = 24
+    ocr_binarize: bool = False
+    ocr_deskew: bool = False
+    # Run rasterization, layout detection and the text, figure and table
+    # processors on their own threads, so that consecutive page windows
+    # move through the stages concurrently. stage_queue_size bounds the
+    # number of windows waiting in front of each stage.
+    overlap_stages: bool = False
+    stage_queue_size: int = 2
+    # Persistent cache of OCR, table and figure results keyed by the crop
+    # pixels, model and prompt. The path defaults to the TensorLake cache
+    # directory.
+    use_fragment_cache: bool = False
+    fragment_cache_path: Optional[str] = None
+    fragment_cache_max_bytes: int = DEFAULT_FRAGMENT_CACHE_MAX_BYTES
+    # Directory where completed pages are saved, so that an interrupted
+    # document can be resumed without processing those pages again
+    checkpoint_dir: Optional[str] = None
+    # Directory where a Chrome trace-event file of the spans of each run is
+    # written, to be opened in chrome://tracing or Perfetto
+    trace_dir: Optional[str] = None
+    # Drop the detected blocks that cover the region of another block
+    # before fragments are extracted, so the region is not sent twice to
+    # OCR or to the table and figure extractors. Blocks of different types
+    # follow the priority rules, e.g. a Table drops the Text inside it;
+    # duplicates of one type are merged when their IoU or containment
+    # reaches the thresholds.
+    suppress_overlapping_blocks: bool = False
+    overlap_priority_rules: List[PriorityRule] = list(DEFAULT_PRIORITY_RULES)
+    overlap_iou_threshold: float = 0.5
+    overlap_containment_threshold: float = 0.8
 
 
 class DefaultPipelineConfig(PipelineConfig):
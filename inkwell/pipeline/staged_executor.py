@@ -0,0 +1,149 @@
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
+
+_logger = logging.getLogger(__name__)
+
+# Interval at which blocked threads check whether the run was stopped
+_POLL_INTERVAL_SECONDS = 0.1
+
+
+class _End:
+    pass
+
+
+_END = _End()
+
+
+@dataclass
+class _StageFailure:
+    exception: Exception
+
+
+class StagedExecutor:
+    """
+    Run items through a chain of stages with one thread per stage. Stages
+    are connected by bounded queues, so a stage works on the next item
+    while the following stages process the previous ones, and a slow stage
+    stalls its producers once its queue is full.
+
+    Items come out in input order with the same results as applying the
+    stages one after another. An exception raised by a stage is re-raised
+    to the consumer.
+
+    Args:
+        stages (list[Callable]): Functions applied to each item in order,
+            each receiving the result of the previous one.
+        queue_size (int, optional): Capacity of the queue in front of each
+            stage and of the output queue.
+    """
+
+    def __init__(
+        self, stages: list[Callable[[Any], Any]], queue_size: int = 2
+    ):
+        if queue_size < 1:
+            raise ValueError("queue_size should be a positive integer")
+        self._stages = stages
+        self._queue_size = queue_size
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        stop = threading.Event()
+        queues = [
+            queue.Queue(maxsize=self._queue_size)
+            for _ in range(len(self._stages) + 1)
+        ]
+        threads = [
+            threading.Thread(
+                target=self._feed,
+                args=(items, queues[0], stop),
+                name="inkwell-stage-feed",
+                daemon=True,
+            )
+        ]
+        for index, stage in enumerate(self._stages):
+            threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(stage, queues[index], queues[index + 1], stop),
+                    name=f"inkwell-stage-{index}",
+                    daemon=True,
+                )
+            )
+
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _END:
+                    return
+                if isinstance(item, _StageFailure):
+                    raise item.exception
+                yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    @staticmethod
+    def _put(output_queue: queue.Queue, item: Any, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                output_queue.put(item, timeout=_POLL_INTERVAL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(input_queue: queue.Queue, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                return input_queue.get(timeout=_POLL_INTERVAL_SECONDS)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _feed(
+        self,
+        items: Iterable[Any],
+        output_queue: queue.Queue,
+        stop: threading.Event,
+    ):
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not self._put(output_queue, item, stop):
+                    return
+        except Exception as exception:  # pylint: disable=broad-except
+            self._put(output_queue, _StageFailure(exception), stop)
+        finally:
+            # Generators release their resources in the thread that ran them
+            if hasattr(iterator, "close"):
+                iterator.close()
+        self._put(output_queue, _END, stop)
+
+    def _run_stage(
+        self,
+        stage: Callable[[Any], Any],
+        input_queue: queue.Queue,
+        output_queue: queue.Queue,
+        stop: threading.Event,
+    ):
+        while True:
+            item = self._get(input_queue, stop)
+            if item is _END:
+                self._put(output_queue, _END, stop)
+                return
+
+            if not isinstance(item, _StageFailure):
+                try:
+                    item = stage(item)
+                except Exception as exception:  # pylint: disable=broad-except
+                    _logger.error("Stage %s failed", stage, exc_info=True)
+                    item = _StageFailure(exception)
+
+            if not self._put(output_queue, item, stop):
+                return
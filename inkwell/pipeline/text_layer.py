@@ -0,0 +1,107 @@
+import re
+from typing import Any, Optional
+
+import numpy as np
+
+from inkwell.components import Layout, LayoutBlock, Rectangle, SpatialIndex
+from inkwell.ocr.base import WORD_BLOCK_TYPE
+
+# pdfplumber emits "(cid:123)" for glyphs without a unicode mapping
+_UNMAPPED_GLYPH_PATTERN = re.compile(r"\(cid:\d+\)")
+
+
+def extract_text_layer(pdf_page: Any, scale: float = 1.0) -> Layout:
+    """
+    Extract the words of the embedded text layer of a PDF page.
+
+    Args:
+        pdf_page (pdfplumber.pdf.Page): The PDF page.
+        scale (float, optional): Units of the returned coordinates per PDF
+            point, e.g. resolution / 72 for pixels of a rendered page.
+
+    Returns:
+        Layout: One block of type "word" per word, with the word as text.
+    """
+    page_x, page_y = pdf_page.bbox[0], pdf_page.bbox[1]
+    words = pdf_page.extract_words(keep_blank_chars=False)
+    return Layout(
+        [
+            LayoutBlock(
+                Rectangle(
+                    (word["x0"] - page_x) * scale,
+                    (word["top"] - page_y) * scale,
+                    (word["x1"] - page_x) * scale,
+                    (word["bottom"] - page_y) * scale,
+                ),
+                text=word["text"],
+                type=WORD_BLOCK_TYPE,
+            )
+            for word in words
+        ]
+    )
+
+
+def _block_coordinates(blocks: list[LayoutBlock]) -> np.ndarray:
+    if not blocks:
+        return np.zeros((0, 4))
+    return np.array([block.coordinates for block in blocks], dtype=float)
+
+
+def assign_words_to_blocks(
+    words: Layout, blocks: list[LayoutBlock]
+) -> list[list[LayoutBlock]]:
+    """
+    Assign each word to the smallest block that contains its center.
+
+    Args:
+        words (Layout): The word blocks.
+        blocks (list[LayoutBlock]): The blocks to assign the words to.
+
+    Returns:
+        list[list[LayoutBlock]]: The words of each block, in the order of
+        `blocks`. Words outside of all blocks are dropped.
+    """
+    assigned = [[] for _ in blocks]
+    if not blocks or not len(words):
+        return assigned
+
+    word_blocks = words.get_blocks()
+    word_boxes = _block_coordinates(word_blocks)
+    block_boxes = _block_coordinates(blocks)
+
+    centers = (word_boxes[:, :2] + word_boxes[:, 2:]) / 2
+    word_indices, block_indices = SpatialIndex(block_boxes).containing(
+        np.hstack([centers, centers])
+    )
+
+    # The smallest block containing each word, the first one on ties
+    block_areas = (block_boxes[:, 2] - block_boxes[:, 0]) * (
+        block_boxes[:, 3] - block_boxes[:, 1]
+    )
+    order = np.lexsort(
+        (block_indices, block_areas[block_indices], word_indices)
+    )
+    word_indices, block_indices = word_indices[order], block_indices[order]
+    is_first = np.diff(word_indices, prepend=-1) != 0
+
+    for word_index, block_index in zip(
+        word_indices[is_first].tolist(), block_indices[is_first].tolist()
+    ):
+        assigned[block_index].append(word_blocks[word_index])
+    return assigned
+
+
+def is_usable_text(
+    text: Optional[str], max_unmapped_ratio: float = 0.1
+) -> bool:
+    """
+    Check whether text from a text layer can be used instead of OCR.
+
+    Text is unusable when it is empty or when too many of its glyphs have
+    no unicode mapping, as happens with some embedded fonts.
+    """
+    if not text or not any(c.isalnum() for c in text):
+        return False
+
+    unmapped = sum(len(m) for m in _UNMAPPED_GLYPH_PATTERN.findall(text))
+    return unmapped / len(text) <= max_unmapped_ratio
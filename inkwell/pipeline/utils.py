@@ -1,22 +1,69 @@
 from collections import defaultdict
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TypeVar
+
+import numpy as np
 
 from inkwell.api.page import PageFragment
+from inkwell.components import LayoutBlock
 from inkwell.components.document import (
     DocumentPageBlocks,
     PageBlocks,
     PageImage,
 )
+from inkwell.io.input import (
+    DEFAULT_PAGE_RESOLUTION,
+    PDF_POINTS_PER_INCH,
+    render_page_region,
+)
+
+T = TypeVar("T")
+
 
+def iter_windows(
+    iterable: Iterable[T],
+    window_size: Optional[int] = None,
+    first_window_size: Optional[int] = None,
+) -> Iterator[list[T]]:
+    """
+    Group an iterable into consecutive lists of at most `window_size`
+    items. A `window_size` of None yields everything as a single window.
+    When `first_window_size` is given, the first window holds at most that
+    many items instead.
+    """
+    for size in (window_size, first_window_size):
+        if size is not None and size < 1:
+            raise ValueError("window_size should be a positive integer")
 
-def split_layout_blocks(page_images: list[PageImage]) -> DocumentPageBlocks:
+    iterator = iter(iterable)
+    size = first_window_size or window_size
+    while True:
+        window = list(islice(iterator, size))
+        if not window:
+            return
+        yield window
+        size = window_size
+
+
+def split_layout_blocks(
+    page_images: list[PageImage],
+    page_resolution: int = DEFAULT_PAGE_RESOLUTION,
+) -> DocumentPageBlocks:
     document_page_blocks = []
     for page_image in page_images:
+        image_scale = 1.0
+        if page_image.resolution is not None:
+            image_scale = page_image.resolution / page_resolution
+
         page_image_blocks = PageBlocks(
             page_image=page_image.page_image,
             figure_blocks=[],
             table_blocks=[],
             text_blocks=[],
             page_number=page_image.page_number,
+            pdf_page=page_image.pdf_page,
+            image_scale=image_scale,
+            pdf_scale=PDF_POINTS_PER_INCH / page_resolution,
         )
 
         for block in page_image.page_layout.get_blocks():
@@ -32,6 +79,52 @@ def split_layout_blocks(page_images: list[PageImage]) -> DocumentPageBlocks:
     return DocumentPageBlocks(page_blocks=document_page_blocks)
 
 
+def crop_block_image(
+    page_block: PageBlocks,
+    block: LayoutBlock,
+    crop_resolution: Optional[int] = None,
+    pad_ratio: float = 0.05,
+) -> np.ndarray:
+    """
+    Crop a padded layout block out of its page.
+
+    When a crop resolution is given and the page comes from a PDF, only the
+    block region is re-rendered from the PDF at that resolution. Otherwise
+    the block is cropped from the page raster.
+    """
+    block = block.pad_ratio(pad_ratio)
+    if crop_resolution is not None and page_block.pdf_page is not None:
+        bbox = tuple(
+            coordinate * page_block.pdf_scale
+            for coordinate in block.coordinates
+        )
+        return render_page_region(page_block.pdf_page, bbox, crop_resolution)
+
+    if page_block.image_scale != 1.0:
+        block = block.scale(page_block.image_scale)
+    return block.crop_image(page_block.page_image)
+
+
+def render_page_image(
+    page_block: PageBlocks, resolution: Optional[int] = None
+) -> tuple[np.ndarray, float]:
+    """
+    The image of a whole page and its pixels per unit of the block
+    coordinates.
+
+    When a resolution is given and the page comes from a PDF, the page is
+    re-rendered from the PDF at that resolution, as `crop_block_image` does
+    for block regions. Otherwise the page raster is returned.
+    """
+    if resolution is not None and page_block.pdf_page is not None:
+        pdf_page = page_block.pdf_page
+        image = render_page_region(
+            pdf_page, (0, 0, pdf_page.width, pdf_page.height), resolution
+        )
+        return image, page_block.pdf_scale * resolution / PDF_POINTS_PER_INCH
+    return page_block.page_image, page_block.image_scale
+
+
 def combine_fragments(
     document_figure_fragments: list[PageFragment],
     document_table_fragments: list[PageFragment],
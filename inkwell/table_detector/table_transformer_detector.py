@@ -5,7 +5,7 @@ import torch
 from PIL import Image
 from transformers import DetrImageProcessor, TableTransformerForObjectDetection
 
-from inkwell.components import Layout, LayoutBlock, Rectangle
+from inkwell.components import ArrayLayout, Layout
 from inkwell.table_detector.base import BaseTableDetector
 from inkwell.table_detector.config import (
     TABLE_TRANSFORMER_TABLE_DETECTOR_CONFIG,
@@ -38,24 +38,14 @@ class TableTransformerDetector(BaseTableDetector):
 
         table_idx = outputs["labels"] == 0
 
-        table_scores = outputs["scores"][table_idx]
-        table_labels = outputs["labels"][table_idx]
-        table_boxes = outputs["boxes"][table_idx]
-
-        blocks = []
-        for score, label, box in zip(table_scores, table_labels, table_boxes):
-            block = LayoutBlock(
-                text="",
-                block=Rectangle(
-                    x_1=box[0], y_1=box[1], x_2=box[2], y_2=box[3]
-                ),
-                score=score.item(),
-                type=self._model.config.id2label[label.item()],
-            )
-            blocks.append(block)
-
-        table_block = Layout(blocks=blocks)
-        return table_block
+        table_block = ArrayLayout.from_tensors(
+            outputs["boxes"][table_idx],
+            outputs["scores"][table_idx],
+            outputs["labels"][table_idx],
+            label_map=self._model.config.id2label,
+        )
+        table_block.texts[:] = ""
+        return table_block.to_layout()
 
     def process(self, image: list[np.ndarray]) -> list[Layout]:
         return [self._process_image(img) for img in image]
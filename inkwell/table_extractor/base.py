@@ -12,3 +12,11 @@ class BaseTableExtractor(ABC):
     @abstractmethod
     def model_id(self) -> str:
         pass
+
+    @property
+    def config_id(self) -> str:
+        """
+        The configuration of the backend that changes its results, e.g. its
+        language or model weights. Empty by default.
+        """
+        return ""
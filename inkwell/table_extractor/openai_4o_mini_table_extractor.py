@@ -16,6 +16,10 @@ class OpenAI4OMiniTableExtractor(BaseTableExtractor):
     def model_id(self) -> str:
         return TableExtractorType.OPENAI_GPT4O_MINI.value
 
+    @property
+    def config_id(self) -> str:
+        return self._client.config_id
+
     def _load_client(self):
         self._client = OpenAI4OMiniOCR()
 
@@ -20,6 +20,10 @@ class Qwen2TableExtractor(BaseTableExtractor):
     def model_id(self) -> str:
         return TableExtractorType.QWEN2_2B_VISION.value
 
+    @property
+    def config_id(self) -> str:
+        return self._ocr_client.config_id
+
     @convert_markdown_to_json
     def process(self, image_batch: list[np.ndarray]) -> list[dict]:
         _logger.info("Running Qwen2 Vision Table Extractor")
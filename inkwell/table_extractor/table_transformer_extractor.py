@@ -31,6 +31,14 @@ class TableTransformerExtractor(BaseTableExtractor):
     def model_id(self) -> str:
         return TableExtractorType.TABLE_TRANSFORMER.value
 
+    @property
+    def config_id(self) -> str:
+        # The cells are read by the OCR detector
+        return (
+            f"ocr={self._ocr_detector.model_id}"
+            f"[{self._ocr_detector.config_id}]"
+        )
+
     def _load_processor(self):
         self._processor = DetrImageProcessor()
 
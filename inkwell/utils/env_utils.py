@@ -70,3 +70,17 @@ def is_vllm_available():
     Check if VLLM is available.
     """
     return importlib.util.find_spec("vllm") is not None
+
+
+def is_onnxruntime_available():
+    """
+    Check if ONNX Runtime is available.
+    """
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def is_tesserocr_available():
+    """
+    Check if tesserocr is available.
+    """
+    return importlib.util.find_spec("tesserocr") is not None
@@ -0,0 +1,26 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+
+@contextmanager
+def atomic_write_path(path: Union[str, Path]) -> Iterator[Path]:
+    """
+    Yield a temporary path to write `path` through. The temporary file is
+    unique to the writer and lives next to `path`, which it replaces once
+    the block completes, so that concurrent writers and interrupted writes
+    never leave a partial file at `path`. It is removed if the block fails.
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,219 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, ContextManager, Iterable, Iterator, Optional
+
+from inkwell.utils.tracing import Tracer
+
+# Called with the stage name, the wall time in seconds and the number of
+# items of every recorded call
+MetricsCallback = Callable[[str, float, int], None]
+
+# The metrics of the innermost recorded block, so that backends called
+# within it can add their own counters and stages
+_current_metrics: ContextVar[Optional["PipelineMetrics"]] = ContextVar(
+    "current_metrics", default=None
+)
+
+
+@dataclass
+class StageMetrics:
+    """
+    Timings of the calls of one pipeline stage or backend. Batch sizes are
+    kept as aggregates, as stages such as rasterization are called once
+    per page.
+    """
+
+    name: str
+    wall_time: float = 0.0
+    calls: int = 0
+    items: int = 0
+    min_batch_size: Optional[int] = None
+    max_batch_size: Optional[int] = None
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.calls if self.calls else 0.0
+
+    def add(self, wall_time: float, items: int):
+        self.wall_time += wall_time
+        self.calls += 1
+        self.items += items
+        if self.min_batch_size is None or items < self.min_batch_size:
+            self.min_batch_size = items
+        if self.max_batch_size is None or items > self.max_batch_size:
+            self.max_batch_size = items
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "wall_time": self.wall_time,
+            "calls": self.calls,
+            "items": self.items,
+            "min_batch_size": self.min_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "mean_batch_size": self.mean_batch_size,
+            "items_per_second": self.items_per_second,
+        }
+
+
+class PipelineMetrics:
+    """
+    Collects the timings of the stages of a pipeline run. Stages are
+    timed with `record`, which may be called from several threads.
+
+    Args:
+        callback (MetricsCallback, optional): Called after every recorded
+            call, e.g. to forward timings to a metrics system.
+        tracer (Tracer, optional): Receives a span for every recorded call
+            and for the spans opened with `span`.
+    """
+
+    def __init__(
+        self,
+        callback: Optional[MetricsCallback] = None,
+        tracer: Optional[Tracer] = None,
+    ):
+        self._callback = callback
+        self.tracer = tracer
+        self._stages: dict[str, StageMetrics] = {}
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._start_time = time.perf_counter()
+
+    @contextmanager
+    def record(
+        self,
+        stage: str,
+        items: int = 0,
+        category: str = "stage",
+        **attributes: Any,
+    ) -> Iterator[None]:
+        """
+        Time the enclosed block as one call of `stage` on a batch of
+        `items` items. The attributes are only added to the trace span.
+        """
+        start_time = time.perf_counter()
+        token = _current_metrics.set(self)
+        try:
+            yield
+        finally:
+            _current_metrics.reset(token)
+            end_time = time.perf_counter()
+            self.add(stage, end_time - start_time, items)
+            if self.tracer:
+                self.tracer.add_span(
+                    stage,
+                    start_time * 1e6,
+                    end_time * 1e6,
+                    category,
+                    items=items,
+                    **attributes,
+                )
+
+    def span(
+        self, name: str, category: str = "", **attributes: Any
+    ) -> ContextManager:
+        """
+        Trace the enclosed block without recording its timings. The span
+        attributes are yielded as a dict that can be extended.
+        """
+        if self.tracer is None:
+            return nullcontext({})
+        return self.tracer.span(name, category, **attributes)
+
+    def add(self, stage: str, wall_time: float, items: int = 0):
+        with self._lock:
+            stage_metrics = self._stages.get(stage)
+            if stage_metrics is None:
+                stage_metrics = self._stages[stage] = StageMetrics(stage)
+            stage_metrics.add(wall_time, items)
+
+        if self._callback:
+            self._callback(stage, wall_time, items)
+
+    def count(self, name: str, value: int = 1):
+        """
+        Add `value` to the counter `name`, e.g. the number of model calls
+        a stage saved.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def iter_timed(self, stage: str, iterable: Iterable) -> Iterator:
+        """
+        Yield from `iterable`, timing the production of each item.
+        """
+        iterator = iter(iterable)
+        try:
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                self.add(stage, time.perf_counter() - start_time, items=1)
+                yield item
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    def stages(self) -> dict[str, StageMetrics]:
+        with self._lock:
+            return dict(self._stages)
+
+    def counters(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "wall_time": time.perf_counter() - self._start_time,
+            "stages": {
+                name: stage_metrics.to_dict()
+                for name, stage_metrics in self.stages().items()
+            },
+            "counters": self.counters(),
+        }
+
+
+def record(
+    metrics: Optional[PipelineMetrics],
+    stage: str,
+    items: int = 0,
+    category: str = "stage",
+    **attributes: Any,
+) -> ContextManager:
+    """
+    Time a block with `metrics`, or do nothing when it is None.
+    """
+    if metrics is None:
+        return nullcontext()
+    return metrics.record(stage, items, category, **attributes)
+
+
+def current_metrics() -> Optional[PipelineMetrics]:
+    """
+    The metrics recording the calling block, if any. Backends use it to
+    report to the metrics of the document they are called for.
+    """
+    return _current_metrics.get()
+
+
+def span(
+    metrics: Optional[PipelineMetrics],
+    name: str,
+    category: str = "",
+    **attributes: Any,
+) -> ContextManager:
+    """
+    Trace a block with the tracer of `metrics`, if there is one.
+    """
+    if metrics is None:
+        return nullcontext({})
+    return metrics.span(name, category, **attributes)
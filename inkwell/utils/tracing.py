@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Union
+
+
+def _now_us() -> float:
+    return time.perf_counter() * 1e6
+
+
+class Tracer:
+    """
+    Records nested spans as Chrome trace events, which can be opened in
+    chrome://tracing or Perfetto. Spans of a thread nest by time, so a span
+    opened inside another one is shown below it.
+    """
+
+    def __init__(self):
+        self._events: list[dict[str, Any]] = []
+        self._thread_names: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @contextmanager
+    def span(
+        self, name: str, category: str = "", **attributes: Any
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Trace the enclosed block. The attributes dict is yielded, so that
+        attributes known only inside the block can be added to it.
+        """
+        start_time = _now_us()
+        try:
+            yield attributes
+        finally:
+            self.add_span(name, start_time, _now_us(), category, **attributes)
+
+    def add_span(
+        self,
+        name: str,
+        start_time: float,
+        end_time: float,
+        category: str = "",
+        **attributes: Any,
+    ):
+        """
+        Add a span with start and end times in microseconds of
+        `time.perf_counter`.
+        """
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start_time,
+            "dur": end_time - start_time,
+            "pid": self._pid,
+            "tid": thread.ident,
+            "args": attributes,
+        }
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault(thread.ident, thread.name)
+
+    def events(self) -> list[dict[str, Any]]:
+        with self._lock:
+            thread_events = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                }
+                for tid, thread_name in self._thread_names.items()
+            ]
+            return thread_events + list(self._events)
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump(
+                {"traceEvents": self.events(), "displayTimeUnit": "ms"},
+                trace_file,
+                default=str,
+            )
@@ -0,0 +1,91 @@
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from inkwell.cache import CachedOCR, CachedTableExtractor, FragmentCache
+
+_logger = logging.getLogger(__name__)
+
+
+def _image(value):
+    return np.full((8, 8, 3), value, dtype=np.uint8)
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def setUp(self):
+        _logger.info("Running test: %s", self._testMethodName)
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._tmp_dir.name) / "cache.sqlite"
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _ocr_backend(self):
+        ocr_detector = MagicMock()
+        ocr_detector.model_id = "mock_ocr"
+        ocr_detector.config_id = "lang=eng"
+        ocr_detector.process.side_effect = lambda images, *args: [
+            f"text {int(image[0, 0, 0])}" for image in images
+        ]
+        return ocr_detector
+
+    def test_only_misses_reach_backend(self):
+        cache = FragmentCache(self._path)
+        ocr_detector = self._ocr_backend()
+        cached_ocr = CachedOCR(ocr_detector, cache)
+
+        result = cached_ocr.process([_image(1), _image(2), _image(1)])
+        self.assertEqual(result, ["text 1", "text 2", "text 1"])
+        self.assertEqual(len(ocr_detector.process.call_args[0][0]), 2)
+
+        result = cached_ocr.process([_image(2), _image(3)])
+        self.assertEqual(result, ["text 2", "text 3"])
+        self.assertEqual(len(ocr_detector.process.call_args[0][0]), 1)
+        self.assertEqual(ocr_detector.process.call_count, 2)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 4)
+
+        cached_ocr.process([_image(3)], user_prompt="another prompt")
+        self.assertEqual(ocr_detector.process.call_count, 3)
+
+        # Results of another configuration of the backend are not reused
+        ocr_detector.config_id = "lang=fra"
+        cached_ocr.process([_image(3)])
+        self.assertEqual(ocr_detector.process.call_count, 4)
+
+    def test_results_persist(self):
+        table_extractor = MagicMock()
+        table_extractor.model_id = "mock_table"
+        table_extractor.config_id = ""
+        table_extractor.process.return_value = [{"cells": [[1, 2]]}]
+
+        cache = FragmentCache(self._path)
+        CachedTableExtractor(table_extractor, cache).process([_image(5)])
+        cache.close()
+
+        cache = FragmentCache(self._path)
+        result = CachedTableExtractor(table_extractor, cache).process(
+            [_image(5)]
+        )
+        self.assertEqual(result, [{"cells": [[1, 2]]}])
+        self.assertEqual(table_extractor.process.call_count, 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_least_recently_used_eviction(self):
+        cache = FragmentCache(self._path, max_size_bytes=20)
+        cache.put_many({"a": "x" * 6})
+        cache.put_many({"b": "y" * 6})
+        cache.get_many(["a"])
+        cache.put_many({"c": "z" * 6})
+
+        self.assertEqual(set(cache.get_many(["a", "b", "c"])), {"a", "c"})
+        self.assertLessEqual(cache.size_bytes, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,17 +14,21 @@
 
 # flake8: noqa
 
+import copy
+import pickle
 import unittest
 
 import numpy as np
 import pytest
 
 from inkwell.components import (
+    ArrayLayout,
     Interval,
     Layout,
     LayoutBlock,
     Quadrilateral,
     Rectangle,
+    SpatialIndex,
 )
 from inkwell.components.elements import (
     InvalidShapeError,
@@ -645,3 +649,191 @@ class TestElements(unittest.TestCase):
         self.assertEqual(blocks[1].type, "Table")
         self.assertEqual(blocks[2].type, "Text")
         self.assertEqual(layout.to_dict(), test_layout_dict)
+
+    def test_slots(self):
+        r = Rectangle(1, 2, 3, 4)
+        i = Interval(1, 2, axis="y")
+        t = LayoutBlock(r, id=1, type="Text", score=0.5)
+        for element in [r, i, t]:
+            self.assertFalse(hasattr(element, "__dict__"))
+            with pytest.raises(AttributeError):
+                element.unknown_attribute = 1
+
+        t_copy = copy.copy(t)
+        self.assertEqual(t_copy, t)
+        self.assertIsNot(t_copy, t)
+        self.assertEqual(t.set(type="Title").type, "Title")
+        self.assertEqual(t.type, "Text")
+        self.assertEqual(t.pad(left=1).block, r.pad(left=1))
+        self.assertEqual(pickle.loads(pickle.dumps(t)), t)
+        self.assertEqual(LayoutBlock.from_dict(t.to_dict()), t)
+        self.assertEqual(
+            repr(t),
+            "LayoutBlock(block=Rectangle(x_1=1, y_1=2, x_2=3, y_2=4), "
+            "text=None, id=1, type=Text, parent=None, next=None, "
+            "score=0.5, reading_order_index=None)",
+        )
+
+        # Subclasses without slots keep their extra attributes
+        class TaggedRectangle(Rectangle):
+            pass
+
+        tagged = TaggedRectangle(1, 2, 3, 4)
+        tagged.tag = "a"
+        self.assertEqual(tagged.set(x_1=0).tag, "a")
+        self.assertNotEqual(tagged, tagged.set(tag="b"))
+
+    def test_array_layout(self):
+        layout = Layout(
+            [
+                LayoutBlock(
+                    Rectangle(10.5, 20, 110, 60),
+                    type="Text",
+                    score=0.9,
+                    text="a",
+                ),
+                LayoutBlock(
+                    Rectangle(5, 80, 50, 200),
+                    type="Table",
+                    score=0.7,
+                    reading_order_index=1,
+                ),
+                LayoutBlock(Rectangle(120, 15, 300, 400), type="Figure"),
+            ],
+            page_data={"width": 400},
+        )
+        array_layout = ArrayLayout.from_layout(layout)
+        self.assertEqual(len(array_layout), 3)
+        self.assertEqual(array_layout.to_layout(), layout)
+        self.assertEqual(array_layout[1], layout[1])
+        self.assertEqual(array_layout[1:].to_layout(), layout[1:])
+
+        # The vectorized operations match those of Layout
+        self.assertEqual(
+            array_layout.pad(5, 10, 25, 5).to_layout(),
+            layout.pad(5, 10, 25, 5),
+        )
+        self.assertEqual(
+            array_layout.scale((2, 0.5)).to_layout(), layout.scale((2, 0.5))
+        )
+        self.assertEqual(array_layout.shift(-3).to_layout(), layout.shift(-3))
+
+        r = Rectangle(0, 0, 150, 250)
+        i = Interval(100, 500, axis="x")
+        q = Quadrilateral(np.array([[0, 0], [200, 0], [200, 300], [0, 250]]))
+        for other in [r, i, q, LayoutBlock(r)]:
+            for center in [False, True]:
+                self.assertEqual(
+                    array_layout.is_in(other, center=center).tolist(),
+                    [block.is_in(other, center=center) for block in layout],
+                )
+                self.assertEqual(
+                    array_layout.filter_by(other, center=center).to_layout(),
+                    layout.filter_by(other, center=center),
+                )
+        self.assertEqual(
+            array_layout.is_in(r, soft_margin={"right": 200}).tolist(),
+            [block.is_in(r, soft_margin={"right": 200}) for block in layout],
+        )
+
+        image = np.zeros((500, 400, 3))
+        for crop, expected in zip(
+            array_layout.crop_image(image), layout.crop_image(image)
+        ):
+            self.assertEqual(crop.shape, expected.shape)
+
+    def test_array_layout_from_tensors(self):
+        boxes = np.array([[1, 2, 3, 4], [5, 6, 7, 8]], dtype=np.float32)
+        array_layout = ArrayLayout.from_tensors(
+            boxes,
+            np.array([0.5, 0.25], dtype=np.float32),
+            np.array([1, 7]),
+            label_map={1: "Text"},
+        )
+        blocks = array_layout.to_layout().get_blocks()
+        self.assertEqual([block.type for block in blocks], ["Text", 7])
+        self.assertEqual([block.score for block in blocks], [0.5, 0.25])
+        self.assertEqual(blocks[1].coordinates, (5, 6, 7, 8))
+        # Boxes are not copied
+        self.assertTrue(np.shares_memory(array_layout.coordinates, boxes))
+
+    def test_spatial_index(self):
+        rng = np.random.default_rng(0)
+        corners = rng.uniform(0, 1000, (500, 2))
+        boxes = np.hstack([corners, corners + rng.uniform(1, 80, (500, 2))])
+        corners = rng.uniform(0, 1000, (40, 2))
+        queries = np.hstack([corners, corners + rng.uniform(0, 200, (40, 2))])
+        index = SpatialIndex(boxes, node_capacity=4)
+
+        def brute_force(relation, queries=queries):
+            pairs = [
+                (query, box)
+                for query in range(len(queries))
+                for box in range(len(boxes))
+                if relation(queries[query], boxes[box])
+            ]
+            return tuple(np.array(column) for column in zip(*pairs))
+
+        def intersects(query, box):
+            return (query[:2] <= box[2:]).all() and (
+                box[:2] <= query[2:]
+            ).all()
+
+        def contains(outer, inner):
+            return (outer[:2] <= inner[:2]).all() and (
+                inner[2:] <= outer[2:]
+            ).all()
+
+        def center_in(query, box):
+            center = (box[:2] + box[2:]) / 2
+            return contains(query, np.hstack([center, center]))
+
+        points = np.tile(queries[:, :2], 2)
+        for result, expected in [
+            (index.intersecting(queries), brute_force(intersects)),
+            (index.contained_in(queries), brute_force(contains)),
+            (
+                index.contained_in(queries, center=True),
+                brute_force(center_in),
+            ),
+            (
+                index.containing(points),
+                brute_force(lambda query, box: contains(box, query), points),
+            ),
+        ]:
+            self.assertTrue(len(expected[0]))
+            np.testing.assert_array_equal(result[0], expected[0])
+            np.testing.assert_array_equal(result[1], expected[1])
+
+        indices, distances = index.nearest(queries, k=5)
+        for query, query_indices, query_distances in zip(
+            queries, indices, distances
+        ):
+            gaps = np.maximum(
+                0,
+                np.maximum(query[:2] - boxes[:, 2:], boxes[:, :2] - query[2:]),
+            )
+            expected_distances = np.hypot(gaps[:, 0], gaps[:, 1])
+            expected = np.lexsort((np.arange(len(boxes)), expected_distances))
+            np.testing.assert_array_equal(query_indices, expected[:5])
+            np.testing.assert_allclose(
+                query_distances, expected_distances[expected[:5]]
+            )
+
+        per_query = SpatialIndex.group(index.intersecting(queries), 40)
+        self.assertEqual(len(per_query), 40)
+        self.assertEqual(
+            sum(len(items) for items in per_query),
+            len(brute_force(intersects)[0]),
+        )
+
+        empty = SpatialIndex(np.zeros((0, 4)))
+        self.assertEqual(len(empty.intersecting(queries)[0]), 0)
+        indices, distances = empty.nearest(queries[:2], k=2)
+        self.assertTrue((indices == -1).all() and np.isinf(distances).all())
+
+        layout = Layout([LayoutBlock(Rectangle(0, 0, 10, 10))])
+        self.assertEqual(
+            SpatialIndex(layout).containing(Rectangle(2, 2, 3, 3))[1].tolist(),
+            [0],
+        )
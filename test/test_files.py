@@ -0,0 +1,49 @@
+import logging
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from inkwell.utils.files import atomic_write_path
+
+_logger = logging.getLogger(__name__)
+
+
+class TestFiles(unittest.TestCase):
+
+    def setUp(self):
+        _logger.info("Running test: %s", self._testMethodName)
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = Path(self._directory.name) / "model.pt"
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_atomic_write_path(self):
+        with atomic_write_path(self._path) as tmp_path, atomic_write_path(
+            self._path
+        ) as other_tmp_path:
+            # Concurrent writers never share a temporary file
+            self.assertNotEqual(tmp_path, other_tmp_path)
+            self.assertEqual(tmp_path.parent, self._path.parent)
+            tmp_path.write_text("first")
+            other_tmp_path.write_text("second")
+            self.assertFalse(self._path.exists())
+
+        self.assertEqual(self._path.read_text(), "first")
+        self.assertEqual(os.listdir(self._directory.name), ["model.pt"])
+
+    def test_atomic_write_path_failure(self):
+        self._path.write_text("previous")
+
+        with self.assertRaises(RuntimeError):
+            with atomic_write_path(self._path) as tmp_path:
+                tmp_path.write_text("partial")
+                raise RuntimeError("interrupted")
+
+        self.assertEqual(self._path.read_text(), "previous")
+        self.assertEqual(os.listdir(self._directory.name), ["model.pt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
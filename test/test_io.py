@@ -2,7 +2,16 @@ import logging
 import os
 import unittest
 
-from inkwell.io import read_image, read_pdf_as_images, read_pdf_document
+import numpy as np
+
+from inkwell.io import (
+    iter_pdf_pages,
+    read_image,
+    read_pdf_as_images,
+    read_pdf_document,
+    read_pdf_pages,
+    render_page_region,
+)
 
 _logger = logging.getLogger(__name__)
 
@@ -33,6 +42,85 @@ class TestIO(unittest.TestCase):
         self.assertIsNotNone(images)
         self.assertEqual(len(images), 5)
 
+    def test_iter_pdf_pages(self):
+        page_images = iter_pdf_pages(self._pdf_path, pages_to_parse=[1, 3])
+        self.assertNotIsInstance(page_images, list)
+        page_numbers = [page_image.page_number for page_image in page_images]
+        self.assertEqual(page_numbers, [2, 4])
+
+        page_images = iter_pdf_pages(self._pdf_path, skip_page_numbers={1, 4})
+        page_numbers = [page_image.page_number for page_image in page_images]
+        self.assertEqual(page_numbers, [2, 3, 5])
+
+    def test_iter_pdf_pages_attached(self):
+        page_images = list(
+            iter_pdf_pages(
+                self._pdf_path, pages_to_parse=[1, 3], attach_pdf_pages=True
+            )
+        )
+        self.assertIsNone(page_images[0].pdf_document)
+        document = page_images[-1].pdf_document
+        self.assertIs(page_images[0].pdf_page.pdf, document)
+        self.assertFalse(document.stream.closed)
+        document.close()
+
+        # Documents that hand over no page are closed by the iterator
+        page_images = iter_pdf_pages(
+            self._pdf_path,
+            pages_to_parse=[1],
+            attach_pdf_pages=True,
+            skip_page_numbers={2},
+        )
+        self.assertEqual(list(page_images), [])
+
+    def test_iter_pdf_pages_parallel(self):
+        page_images = list(
+            iter_pdf_pages(
+                self._pdf_path,
+                pages_to_parse=[4, 0, 2],
+                num_workers=2,
+                chunk_size=1,
+            )
+        )
+        page_numbers = [page_image.page_number for page_image in page_images]
+        self.assertEqual(page_numbers, [1, 3, 5])
+
+        serial_page_image = read_pdf_pages(self._pdf_path, [2])[0]
+        self.assertTrue(
+            np.array_equal(
+                serial_page_image.page_image, page_images[1].page_image
+            )
+        )
+
+        with self.assertRaises(ValueError):
+            list(iter_pdf_pages(self._pdf_path, num_workers=2, chunk_size=0))
+
+    def test_read_pdf_pages_at_resolution(self):
+        page_image = read_pdf_pages(self._pdf_path, [0], resolution=72)[0]
+        document = read_pdf_document(self._pdf_path)
+        page = document.pages[0]
+        self.assertEqual(
+            page_image.page_image.shape[:2],
+            (int(page.height), int(page.width)),
+        )
+        self.assertEqual(page_image.resolution, 72)
+
+    def test_render_page_region(self):
+        document = read_pdf_document(self._pdf_path)
+        page = document.pages[0]
+        region = render_page_region(page, (0, 0, 72, 36), resolution=144)
+        self.assertEqual(region.shape, (72, 144, 3))
+
+        region = render_page_region(
+            page, (-10, -10, page.width + 10, 36), resolution=72
+        )
+        self.assertEqual(region.shape[:2], (36, int(page.width)))
+
+    def test_read_pdf_pages(self):
+        page_images = read_pdf_pages(self._pdf_path)
+        self.assertEqual(len(page_images), 5)
+        self.assertIsNone(page_images[0].page_layout)
+
     def test_read_pdf_document_from_url(self):
         document = read_pdf_document(self._pdf_url)
         self.assertIsNotNone(document)
@@ -1,14 +1,38 @@
 import logging
 import os
+import tempfile
 import unittest
+from unittest import mock
+
+import numpy as np
+import torch
 
 from inkwell.components.layout import Layout
 from inkwell.io import read_image
 from inkwell.layout_detector import LayoutDetectorFactory, LayoutDetectorType
+from inkwell.layout_detector.batching import make_size_batches, resized_shape
+from inkwell.layout_detector.compilation import TracedBackbone
+from inkwell.layout_detector.onnx_export import (
+    is_onnx_export_complete,
+    onnx_metadata_path,
+)
 
 _logger = logging.getLogger(__name__)
 
 
+class _DictBackbone(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 4, kernel_size=3, padding=1)
+
+    def forward(self, x):
+        features = self.conv(x["images"])
+        return {
+            "p2": features,
+            "p3": torch.nn.functional.max_pool2d(features, 2),
+        }
+
+
 class TestLayoutDetector(unittest.TestCase):
 
     def setUp(self):
@@ -52,6 +76,39 @@ class TestLayoutDetector(unittest.TestCase):
 
         self.check_detected_layout(layout)
 
+    def test_layoutlmv3_traced_layout_detector(self):
+        eager_detector = LayoutDetectorFactory.get_layout_detector(
+            LayoutDetectorType.LAYOUTLMV3
+        )
+        traced_detector = LayoutDetectorFactory.get_layout_detector(
+            LayoutDetectorType.LAYOUTLMV3, compile_mode="trace"
+        )
+
+        eager_layout = eager_detector.process([self.test_image])[0]
+        traced_layout = traced_detector.process([self.test_image])[0]
+        self.check_detected_layout(traced_layout)
+        self.assertEqual(
+            [block.type for block in traced_layout.get_blocks()],
+            [block.type for block in eager_layout.get_blocks()],
+        )
+
+    def test_traced_backbone_cache(self):
+        backbone = _DictBackbone().eval()
+        images = torch.rand(1, 3, 64, 96)
+
+        with tempfile.TemporaryDirectory() as cache_dir, torch.no_grad():
+            features = TracedBackbone(backbone, cache_dir)({"images": images})
+            expected = backbone({"images": images})
+            self.assertEqual(features.keys(), expected.keys())
+            for name, feature in features.items():
+                self.assertTrue(torch.allclose(feature, expected[name]))
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            # A warm process loads the saved trace instead of tracing again
+            with mock.patch("torch.jit.trace") as trace:
+                TracedBackbone(backbone, cache_dir)({"images": images})
+                trace.assert_not_called()
+
     def test_faster_rcnn_batch_predictor(self):
 
         test_images = [self.test_image] * 5
@@ -64,6 +121,91 @@ class TestLayoutDetector(unittest.TestCase):
         for layout in layouts:
             self.check_detected_layout(layout)
 
+    def test_faster_rcnn_size_batches(self):
+        landscape_image = self.test_image.transpose(1, 0, 2)
+        test_images = [self.test_image, landscape_image, self.test_image]
+        detector = LayoutDetectorFactory.get_layout_detector(
+            LayoutDetectorType.FASTER_RCNN,
+            batch_pixel_budget=4 * 1333 * 1333,
+        )
+
+        layouts = detector.process(test_images)
+        self.assertEqual(len(layouts), len(test_images))
+        self.assertEqual(
+            layouts[0].get_blocks()[0].coordinates,
+            layouts[2].get_blocks()[0].coordinates,
+        )
+
+    def test_onnx_export_complete(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            onnx_path = os.path.join(cache_dir, "model_final.onnx")
+            with open(onnx_path, "wb") as f:
+                f.write(b"model")
+            # A model without its metadata is an interrupted export
+            self.assertFalse(is_onnx_export_complete(onnx_path))
+            onnx_metadata_path(onnx_path).write_text("{}", encoding="utf-8")
+            self.assertTrue(is_onnx_export_complete(onnx_path))
+
+    def test_faster_rcnn_onnx_parity(self):
+        # Without a threshold, both use the threshold of the model config
+        for kwargs in ({}, {"detection_threshold": 0.4}):
+            with self.subTest(**kwargs):
+                eager_detector = LayoutDetectorFactory.get_layout_detector(
+                    LayoutDetectorType.FASTER_RCNN, **kwargs
+                )
+                onnx_detector = LayoutDetectorFactory.get_layout_detector(
+                    LayoutDetectorType.FASTER_RCNN_ONNX, **kwargs
+                )
+
+                eager_layout = eager_detector.process([self.test_image])[0]
+                onnx_layout = onnx_detector.process([self.test_image])[0]
+                self.check_detected_layout(onnx_layout)
+                self.assertEqual(len(onnx_layout), len(eager_layout))
+                for eager_block in eager_layout.get_blocks():
+                    self.assertTrue(
+                        any(
+                            onnx_block.type == eager_block.type
+                            and np.allclose(
+                                onnx_block.coordinates,
+                                eager_block.coordinates,
+                                atol=4,
+                            )
+                            for onnx_block in onnx_layout.get_blocks()
+                        )
+                    )
+
+    def test_layoutlmv3_relative_position_bias_cache(self):
+        from inkwell.layout_detector.layoutlmv3.beit import (
+            RelativePositionBias,
+        )
+
+        bias = RelativePositionBias(window_size=(14, 14), num_heads=2)
+        torch.nn.init.normal_(bias.relative_position_bias_table)
+
+        expected = bias((50, 38))
+        with torch.no_grad():
+            cached = bias((50, 38))
+            self.assertIs(bias((50, 38)), cached)
+            self.assertTrue(torch.equal(cached, expected))
+            self.assertEqual(bias((14, 14)).shape, (2, 197, 197))
+
+            # Updated weights are never served from the cache
+            bias.relative_position_bias_table.add_(1.0)
+            self.assertFalse(torch.equal(bias((50, 38)), cached))
+
+    def test_make_size_batches(self):
+        shapes = [(800, 600), (600, 800), (790, 590), (800, 600)]
+        batches = make_size_batches(shapes, pixel_budget=800 * 608 * 2)
+        self.assertEqual(batches, [[0, 2], [3], [1]])
+
+        batches = make_size_batches(shapes, 1, max_batch_size=2)
+        self.assertEqual(sorted(sum(batches, [])), [0, 1, 2, 3])
+        self.assertTrue(all(len(batch) == 1 for batch in batches))
+
+    def test_resized_shape(self):
+        self.assertEqual(resized_shape(1100, 850, 800, 1333), (1035, 800))
+        self.assertEqual(resized_shape(4000, 1000, 800, 1333), (1333, 333))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,23 @@
+import errno
 import logging
 import os
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 
+import cv2
+import numpy as np
+import pytesseract
+
+from inkwell.components import Layout, LayoutBlock, Rectangle
 from inkwell.io import read_image
 from inkwell.ocr import OCRFactory, OCRType
+from inkwell.ocr.cascade_ocr import CascadeOCR
+from inkwell.ocr.preprocessing import OCRPreprocessor, PreprocessedOCR
+from inkwell.utils.metrics import PipelineMetrics
 
 _logger = logging.getLogger(__name__)
 
@@ -44,3 +58,302 @@ class TestOCR(unittest.TestCase):
         self.assertEqual(len(texts), len(images))
         for text in texts:
             self._test_results(text)
+
+    def test_tesseract_ocr_words(self):
+        image = self._load_test_image()
+        ocr = OCRFactory.get_ocr(OCRType.TESSERACT, lang="eng")
+
+        (words,) = ocr.process_words([image])
+
+        self.assertIn("receipt", [word.text for word in words])
+        for word in words:
+            self.assertEqual(word.type, "word")
+            self.assertTrue(0 <= word.score <= 1)
+            x_1, y_1, x_2, y_2 = word.coordinates
+            self.assertTrue(0 <= x_1 < x_2 <= image.shape[1])
+            self.assertTrue(0 <= y_1 < y_2 <= image.shape[0])
+
+    def test_tesserocr_ocr_matches_tesseract(self):
+        image = self._load_test_image()
+        images = [image, image[: image.shape[0] // 2]]
+        tesseract = OCRFactory.get_ocr(OCRType.TESSERACT, lang="eng")
+        tesserocr = OCRFactory.get_ocr(
+            OCRType.TESSEROCR, lang="eng", num_workers=2
+        )
+
+        texts = tesserocr.process(images)
+
+        self._test_results(texts[0])
+        self.assertEqual(texts, tesseract.process(images))
+
+    def test_tesseract_ocr_parallel(self):
+        running, max_running = [0], [0]
+        omp_thread_limits = set()
+        lock = threading.Lock()
+
+        def image_to_string(image, lang):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+                # The environment tesseract would be started with
+                omp_thread_limits.add(
+                    pytesseract.pytesseract.environ.get("OMP_THREAD_LIMIT")
+                )
+            time.sleep(0.01 * (5 - image[0, 0]))
+            with lock:
+                running[0] -= 1
+            return f"{lang} {image[0, 0]}"
+
+        images = [np.full((2, 2), index) for index in range(5)]
+        with mock.patch.dict(os.environ, clear=True), mock.patch(
+            "pytesseract.image_to_string", side_effect=image_to_string
+        ):
+            ocr = OCRFactory.get_ocr(
+                OCRType.TESSERACT, num_workers=3, omp_thread_limit=2
+            )
+            texts = ocr.process(images)
+            self.assertEqual(omp_thread_limits, {"2"})
+
+            # Each detector keeps its own limit, outside of os.environ
+            omp_thread_limits.clear()
+            OCRFactory.get_ocr(
+                OCRType.TESSERACT, num_workers=2, omp_thread_limit=4
+            ).process(images[:1])
+            self.assertEqual(omp_thread_limits, {"4"})
+            self.assertNotIn("OMP_THREAD_LIMIT", os.environ)
+
+        # pytesseract gets its own environment back once the detectors are
+        # done
+        self.assertIs(pytesseract.pytesseract.environ, os.environ)
+
+        # Texts keep the order of the images, whichever finishes first
+        self.assertEqual(texts, [f"eng {index}" for index in range(5)])
+        self.assertEqual(max_running[0], 3)
+
+    def test_tesseract_ocr_process_environment(self):
+        # The thread limit reaches tesseract through the environment that
+        # pytesseract starts it with
+        environments = []
+
+        def popen(_, **kwargs):
+            environments.append(dict(kwargs["env"]))
+            raise OSError(errno.ENOENT, "tesseract")
+
+        ocr = OCRFactory.get_ocr(OCRType.TESSERACT, omp_thread_limit=3)
+        with mock.patch(
+            "pytesseract.pytesseract.subprocess.Popen", side_effect=popen
+        ), self.assertRaises(pytesseract.TesseractNotFoundError):
+            ocr.process([np.zeros((8, 8), dtype=np.uint8)])
+
+        self.assertEqual(len(environments), 1)
+        self.assertEqual(environments[0]["OMP_THREAD_LIMIT"], "3")
+
+    def test_tesserocr_ocr_omp_thread_limit(self):
+        def tesseract_limit() -> str:
+            limits = []
+
+            def image_to_string(image, lang):
+                _ = image, lang
+                limits.append(
+                    pytesseract.pytesseract.environ.get("OMP_THREAD_LIMIT")
+                )
+
+            with mock.patch(
+                "pytesseract.image_to_string", side_effect=image_to_string
+            ):
+                OCRFactory.get_ocr(OCRType.TESSERACT, num_workers=2).process(
+                    [np.zeros((2, 2))]
+                )
+            return limits[0]
+
+        with tempfile.TemporaryDirectory() as module_dir:
+            # A stand-in for tesserocr, which records the environment it is
+            # loaded with
+            with open(
+                os.path.join(module_dir, "tesserocr.py"), "w", encoding="utf-8"
+            ) as module_file:
+                module_file.write(
+                    "import os\n"
+                    "OMP_THREAD_LIMIT = os.environ.get('OMP_THREAD_LIMIT')\n"
+                    "class PyTessBaseAPI:\n"
+                    "    def __init__(self, **kwargs):\n"
+                    "        pass\n"
+                )
+            with mock.patch.dict(os.environ, clear=True), mock.patch.dict(
+                sys.modules
+            ), mock.patch.object(
+                sys, "path", [module_dir, *sys.path]
+            ), mock.patch(
+                "inkwell.ocr.tesserocr_ocr.is_tesserocr_available",
+                return_value=True,
+            ):
+                sys.modules.pop("tesserocr", None)
+                limit = tesseract_limit()
+
+                OCRFactory.get_ocr(OCRType.TESSEROCR, omp_thread_limit=7)
+
+                self.assertEqual(
+                    sys.modules["tesserocr"].OMP_THREAD_LIMIT, "7"
+                )
+                self.assertNotIn("OMP_THREAD_LIMIT", os.environ)
+                # Later Tesseract detectors still get their own limit
+                self.assertIsNotNone(limit)
+                self.assertEqual(tesseract_limit(), limit)
+
+    def test_cascade_ocr(self):
+        def words(*scored_words):
+            return Layout(
+                [
+                    LayoutBlock(
+                        Rectangle(10 * i, 0, 10 * i + 8, 10),
+                        text=text,
+                        type="word",
+                        score=score,
+                    )
+                    for i, (text, score) in enumerate(scored_words)
+                ]
+            )
+
+        fast_ocr = mock.MagicMock(supports_words=True, model_id="fast")
+        fast_ocr.process_words.return_value = [
+            words(("clean", 0.95), ("text", 0.9)),
+            words(("blurry", 0.3), ("text", 0.9)),
+            words(),
+            words(("tiny", 0.99)),
+        ]
+        escalation_ocr = mock.MagicMock(model_id="vlm")
+        escalation_ocr.process.side_effect = lambda images, *_: [
+            f"vlm {image.shape[0]}" for image in images
+        ]
+        ocr = CascadeOCR(fast_ocr, escalation_ocr, min_height=20)
+        images = [
+            np.zeros((height, 100, 3), dtype=np.uint8)
+            for height in [30, 31, 32, 10]
+        ]
+
+        metrics = PipelineMetrics()
+        with metrics.record("ocr", len(images)):
+            texts = ocr.process(images, user_prompt="prompt")
+
+        self.assertEqual(texts, ["clean text", "vlm 31", "vlm 32", "vlm 10"])
+        escalated_images, user_prompt, _ = escalation_ocr.process.call_args[0]
+        self.assertEqual(len(escalated_images), 3)
+        self.assertEqual(user_prompt, "prompt")
+        self.assertEqual(
+            metrics.counters(),
+            {"ocr_cascade_crops": 4, "ocr_cascade_escalations": 3},
+        )
+        self.assertEqual(metrics.stages()["ocr_escalation"].items, 3)
+
+        with self.assertRaises(ValueError):
+            CascadeOCR(mock.MagicMock(supports_words=False), escalation_ocr)
+
+    @staticmethod
+    def _text_crop(font_scale, skew_angle=0, inverted=False):
+        image = np.full(
+            (int(180 * font_scale) + 40, int(900 * font_scale) + 40, 3),
+            255,
+            dtype=np.uint8,
+        )
+        for line in range(3):
+            cv2.putText(
+                image,
+                "the quick brown fox jumps over lazy dogs",
+                (20, int(50 * font_scale * (line + 1))),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1.2 * font_scale,
+                (0, 0, 0),
+                max(1, int(2 * font_scale)),
+            )
+        if skew_angle:
+            # Text lines going down by skew_angle degrees
+            height, width = image.shape[:2]
+            image = cv2.warpAffine(
+                image,
+                cv2.getRotationMatrix2D(
+                    (width / 2, height / 2), -skew_angle, 1
+                ),
+                (width, height),
+                borderValue=(255, 255, 255),
+            )
+        return 255 - image if inverted else image
+
+    def test_ocr_preprocessing(self):
+        preprocessor = OCRPreprocessor(
+            target_x_height=24, binarize=True, deskew=True
+        )
+        images = [
+            self._text_crop(1),
+            self._text_crop(3),
+            self._text_crop(2, skew_angle=3),
+            self._text_crop(2, skew_angle=-2, inverted=True),
+            np.full((30, 40, 3), 255, dtype=np.uint8),
+        ]
+
+        statistics = preprocessor.statistics(images)
+        np.testing.assert_array_equal(
+            statistics.dark_text, [True, True, True, False, True]
+        )
+        np.testing.assert_array_equal(statistics.skew_angles, [0, 0, 3, -2, 0])
+        self.assertTrue(np.isnan(statistics.glyph_heights[-1]))
+        # Statistics do not depend on the other crops of the batch
+        for image, glyph_height in zip(images, statistics.glyph_heights):
+            np.testing.assert_equal(
+                preprocessor.statistics([image]).glyph_heights,
+                [glyph_height],
+            )
+
+        processed, scales = preprocessor.transform(images)
+        self.assertEqual(scales[-1], 1)
+        self.assertTrue(np.all(scales[1:4] < 1))
+        for image in processed:
+            self.assertEqual(image.ndim, 2)
+            self.assertTrue(np.isin(image, [0, 255]).all())
+            # Black text on a white background
+            self.assertGreater(np.mean(image == 255), 0.5)
+        statistics = preprocessor.statistics(processed)
+        np.testing.assert_allclose(statistics.glyph_heights[:4], 24, rtol=0.15)
+        np.testing.assert_array_equal(statistics.skew_angles, 0)
+        self.assertEqual(len(preprocessor.process([])), 0)
+
+    def test_preprocessed_ocr(self):
+        ocr = mock.MagicMock(supports_words=True, model_id="fast")
+        ocr.process.side_effect = lambda images, *_: [
+            str(image.shape[0]) for image in images
+        ]
+        ocr.process_words.side_effect = lambda images: [
+            Layout(
+                [
+                    LayoutBlock(
+                        Rectangle(0, 0, image.shape[1], image.shape[0]),
+                        text="crop",
+                        type="word",
+                    )
+                ]
+            )
+            for image in images
+        ]
+        preprocessor = OCRPreprocessor(target_x_height=24, deskew=True)
+        preprocessed_ocr = PreprocessedOCR(ocr, preprocessor)
+        images = [self._text_crop(3), self._text_crop(2, skew_angle=3)]
+        self.assertNotEqual(preprocessed_ocr.model_id, ocr.model_id)
+
+        metrics = PipelineMetrics()
+        with metrics.record("ocr", len(images)):
+            texts = preprocessed_ocr.process(images)
+        self.assertEqual(
+            texts,
+            [str(image.shape[0]) for image in preprocessor.process(images)],
+        )
+        self.assertEqual(metrics.stages()["ocr_preprocessing"].items, 2)
+
+        # Words are found on rescaled crops, and boxed in the input crops
+        self.assertTrue(preprocessed_ocr.supports_words)
+        for image, words in zip(
+            images, preprocessed_ocr.process_words(images)
+        ):
+            np.testing.assert_allclose(
+                words[0].block.coordinates,
+                (0, 0, image.shape[1], image.shape[0]),
+                atol=2,
+            )
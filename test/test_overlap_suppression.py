@@ -0,0 +1,114 @@
+import logging
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from inkwell.components import Layout, LayoutBlock, Rectangle
+from inkwell.components.document import PageImage
+from inkwell.pipeline.layout_processor import LayoutProcessor
+from inkwell.pipeline.overlap_suppression import (
+    OverlapSuppressor,
+    PriorityRule,
+)
+from inkwell.utils.metrics import PipelineMetrics
+
+_logger = logging.getLogger(__name__)
+
+
+def _block(block_type, x_1, y_1, x_2, y_2, score=0.9):
+    return LayoutBlock(
+        Rectangle(x_1, y_1, x_2, y_2), type=block_type, score=score
+    )
+
+
+class TestOverlapSuppression(unittest.TestCase):
+
+    def setUp(self):
+        _logger.info("Running test: %s", self._testMethodName)
+
+    def test_priority_rules(self):
+        layout = Layout(
+            [
+                _block("Text", 10, 10, 90, 30),
+                _block("Table", 0, 0, 100, 100),
+                _block("Text", 10, 90, 90, 130),
+                _block("Figure", 200, 0, 300, 100),
+                _block("Text", 210, 110, 290, 130),
+            ],
+            page_data={"page": 1},
+        )
+        result, saved_calls = OverlapSuppressor().suppress(layout)
+
+        # Only the Text mostly inside the Table is dropped
+        self.assertEqual(
+            [block.type for block in result],
+            ["Table", "Text", "Figure", "Text"],
+        )
+        self.assertEqual(result[1].coordinates, (10, 90, 90, 130))
+        self.assertEqual(result.page_data, {"page": 1})
+        self.assertEqual(saved_calls, {"saved_ocr_calls": 1})
+
+        # The rules decide which type wins
+        result, saved_calls = OverlapSuppressor(
+            [PriorityRule("Text", "Table", 0.01)]
+        ).suppress(layout)
+        self.assertEqual(
+            [block.type for block in result],
+            ["Text", "Text", "Figure", "Text"],
+        )
+        self.assertEqual(saved_calls, {"saved_table_extractor_calls": 1})
+
+    def test_merge_duplicates(self):
+        layout = Layout(
+            [
+                _block("Table", 0, 0, 100, 100, score=0.6),
+                _block("Table", 5, 0, 110, 100, score=0.8),
+                _block("Figure", 300, 300, 400, 400),
+                _block("Figure", 320, 320, 380, 380),
+                _block("Text", 0, 200, 100, 220),
+                _block("Text", 0, 221, 100, 240),
+            ]
+        )
+        result, saved_calls = OverlapSuppressor().suppress(layout)
+
+        # The best duplicate is kept and extended to cover the others
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result[0].score, 0.8)
+        self.assertEqual(result[0].coordinates, (0, 0, 110, 100))
+        self.assertEqual(result[1].coordinates, (300, 300, 400, 400))
+        self.assertEqual(
+            saved_calls,
+            {
+                "saved_table_extractor_calls": 1,
+                "saved_figure_extractor_calls": 1,
+            },
+        )
+        # Layouts without overlaps are returned as they are
+        unchanged = Layout(list(result))
+        self.assertIs(OverlapSuppressor().suppress(unchanged)[0], unchanged)
+
+    def test_layout_processor_counts_saved_calls(self):
+        layout = Layout(
+            [_block("Table", 0, 0, 100, 100), _block("Text", 10, 10, 90, 30)]
+        )
+        layout_detector = MagicMock()
+        layout_detector.process.return_value = [layout, layout]
+        processor = LayoutProcessor(
+            layout_detector, overlap_suppressor=OverlapSuppressor()
+        )
+        metrics = PipelineMetrics()
+        page_images = [
+            PageImage(
+                page_image=np.zeros((100, 100, 3), dtype=np.uint8),
+                page_number=page_number,
+                page_layout=Layout(),
+            )
+            for page_number in [1, 2]
+        ]
+        pages = processor.process(page_images, metrics=metrics)
+
+        self.assertEqual([len(page.page_layout) for page in pages], [1, 1])
+        self.assertEqual(metrics.counters(), {"saved_ocr_calls": 2})
+        self.assertIn("overlap_suppression", metrics.stages())
+        self.assertEqual(metrics.to_dict()["counters"], {"saved_ocr_calls": 2})
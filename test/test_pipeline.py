@@ -1,19 +1,24 @@
+import json
 import logging
 import os
 import pickle
+import tempfile
+import time
 import unittest
 from test.utils import (
     get_mock_figure_fragment,
     get_mock_table_fragment,
     get_mock_text_fragment,
 )
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from inkwell.api.document import Document
+from inkwell.components import Layout, LayoutBlock, Rectangle
 from inkwell.pipeline import DefaultPipelineConfig, Pipeline
 
 _PDF_URL = "https://pub-5dc4d0c0254749378ccbcfffa4bd2a1e.r2.dev/sample_ratings_report.pdf"  # noqa: E501, pylint: disable=line-too-long
 _IMG_PATH = "./data/sample.png"
+_PDF_PATH = "./data/sample_2.pdf"
 
 _logger = logging.getLogger(__name__)
 
@@ -57,6 +62,256 @@ class TestPipeline(unittest.TestCase):
         self.assertIsInstance(processed_document, Document)
         self.assertEqual(len(processed_document.pages), 1)
 
+    @patch(
+        "inkwell.pipeline.fragment_processor.FigureFragmentProcessor.process"
+    )
+    @patch("inkwell.pipeline.fragment_processor.TextFragmentProcessor.process")
+    @patch(
+        "inkwell.pipeline.fragment_processor.TableFragmentProcessor.process"
+    )
+    def test_process_pdf_document_in_windows(
+        self,
+        mock_figure_fragment_processor,
+        mock_text_fragment_processor,
+        mock_table_fragment_processor,
+    ):
+        mock_figure_fragment_processor.return_value = (
+            get_mock_figure_fragment()
+        )
+        mock_text_fragment_processor.return_value = get_mock_text_fragment()
+        mock_table_fragment_processor.return_value = get_mock_table_fragment()
+        pipeline = Pipeline(DefaultPipelineConfig(page_window_size=1))
+        processed_document = pipeline.process(
+            self._document_url, pages_to_parse=[0, 1]
+        )
+        self.assertIsInstance(processed_document, Document)
+        self.assertEqual(mock_text_fragment_processor.call_count, 2)
+
+    @staticmethod
+    def _mock_pipeline(metrics_callback=None, **config):
+        layout_detector = MagicMock()
+        layout_detector.process.side_effect = lambda image_batch: [
+            Layout(
+                [
+                    LayoutBlock(Rectangle(10, 10, 100, 50), type="Text"),
+                    LayoutBlock(Rectangle(10, 60, 100, 90), type="Table"),
+                ]
+            )
+            for _ in image_batch
+        ]
+        ocr_detector = MagicMock()
+        ocr_detector.process.side_effect = lambda images: [
+            f"text {i}" for i in range(len(images))
+        ]
+        pipeline = Pipeline(
+            DefaultPipelineConfig(
+                layout_detector=None,
+                ocr_detector=None,
+                table_extractor=None,
+                **config,
+            ),
+            layout_detector=layout_detector,
+            ocr_detector=ocr_detector,
+            metrics_callback=metrics_callback,
+        )
+        return pipeline, layout_detector, ocr_detector
+
+    def test_process_many_pools_batches(self):
+        pipeline, layout_detector, ocr_detector = self._mock_pipeline()
+        documents = pipeline.process_many([self._image_path] * 3)
+        self.assertEqual(len(documents), 3)
+        self.assertEqual(layout_detector.process.call_count, 1)
+        ocr_batches = [
+            call[0][0] for call in ocr_detector.process.call_args_list
+        ]
+        self.assertEqual(
+            [len(batch) for batch in ocr_batches if batch], [3, 3]
+        )
+        for i, document in enumerate(documents):
+            self.assertEqual(len(document.pages), 1)
+            self.assertEqual(document.pages[0].page_number, 1)
+            fragment = document.pages[0].text_fragments()[0]
+            self.assertEqual(fragment.page_number, 1)
+            self.assertEqual(fragment.content.text, f"text {i}")
+
+    def test_process_many_in_windows(self):
+        pipeline, layout_detector, _ = self._mock_pipeline(
+            pooled_page_window_size=2
+        )
+        documents = pipeline.process_many([self._image_path] * 3)
+
+        batches = [
+            len(call[1]["image_batch"])
+            for call in layout_detector.process.call_args_list
+        ]
+        self.assertEqual(batches, [2, 1])
+        self.assertEqual(
+            [document.pages[0].page_number for document in documents],
+            [1, 1, 1],
+        )
+
+        # Pooled windows are always bounded
+        with self.assertRaises(ValueError):
+            self._mock_pipeline(pooled_page_window_size=None)
+
+    def test_process_many_from_checkpoint(self):
+        pdf_path = os.path.join(os.path.dirname(__file__), _PDF_PATH)
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            pipeline, layout_detector, _ = self._mock_pipeline(
+                page_window_size=2, checkpoint_dir=checkpoint_dir
+            )
+            expected = [
+                document.to_dict()["pages"]
+                for document in pipeline.process_many(
+                    [self._image_path, pdf_path]
+                )
+            ]
+            layout_detector.process.reset_mock()
+
+            # Each document was checkpointed, so nothing is processed again
+            documents = pipeline.process_many([self._image_path, pdf_path])
+            layout_detector.process.assert_not_called()
+            self.assertEqual(
+                [document.to_dict()["pages"] for document in documents],
+                expected,
+            )
+            self.assertEqual(
+                [page.page_number for page in documents[1].pages],
+                [1, 2, 3, 4, 5],
+            )
+
+    def test_process_overlapped_stages(self):
+        pdf_path = os.path.join(os.path.dirname(__file__), _PDF_PATH)
+        pipeline, _, _ = self._mock_pipeline(page_window_size=2)
+        expected = pipeline.process(pdf_path).to_dict()["pages"]
+
+        pipeline, _, _ = self._mock_pipeline(
+            page_window_size=2, overlap_stages=True, stage_queue_size=1
+        )
+        pages = pipeline.process(pdf_path).to_dict()["pages"]
+        self.assertEqual(pages, expected)
+        self.assertEqual(len(expected), 5)
+
+    def test_process_overlapped_stages_with_text_layer(self):
+        # Pages read from the PDF are rendered while OCR runs on the crops of
+        # earlier pages, even though both read from the same document
+        pdf_path = os.path.join(os.path.dirname(__file__), _PDF_PATH)
+        rasterization_times, ocr_times = [], []
+
+        def metrics_callback(stage, wall_time, items):
+            _ = items
+            if stage == "rasterization":
+                end_time = time.perf_counter()
+                rasterization_times.append((end_time - wall_time, end_time))
+
+        def ocr(images):
+            start_time = time.perf_counter()
+            time.sleep(0.2)
+            ocr_times.append((start_time, time.perf_counter()))
+            return [f"text {i}" for i in range(len(images))]
+
+        pipeline, _, ocr_detector = self._mock_pipeline(
+            metrics_callback=metrics_callback,
+            page_window_size=1,
+            overlap_stages=True,
+            use_text_layer=True,
+        )
+        ocr_detector.process.side_effect = ocr
+        document = pipeline.process(pdf_path)
+
+        self.assertEqual(len(document.pages), 5)
+        self.assertTrue(
+            any(
+                rasterization_start < ocr_end and ocr_start < rasterization_end
+                for rasterization_start, rasterization_end in rasterization_times
+                for ocr_start, ocr_end in ocr_times
+            )
+        )
+
+    def test_process_iter(self):
+        pdf_path = os.path.join(os.path.dirname(__file__), _PDF_PATH)
+        pipeline, layout_detector, _ = self._mock_pipeline(page_window_size=3)
+
+        pages = pipeline.process_iter(pdf_path)
+        first_page = next(pages)
+        self.assertEqual(first_page.page_number, 1)
+        self.assertEqual(layout_detector.process.call_count, 1)
+        self.assertEqual(
+            len(layout_detector.process.call_args[1]["image_batch"]), 1
+        )
+
+        page_numbers = [page.page_number for page in pages]
+        self.assertEqual(page_numbers, [2, 3, 4, 5])
+        self.assertEqual(layout_detector.process.call_count, 3)
+
+    def test_resume_from_checkpoint(self):
+        pdf_path = os.path.join(os.path.dirname(__file__), _PDF_PATH)
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            pipeline, layout_detector, _ = self._mock_pipeline(
+                page_window_size=2, checkpoint_dir=checkpoint_dir
+            )
+            pages = pipeline.process_iter(pdf_path, first_page_fast_path=False)
+            # Interrupt the run after the first window
+            self.assertEqual(
+                [next(pages).page_number for _ in range(2)], [1, 2]
+            )
+            pages.close()
+
+            document = pipeline.process(pdf_path)
+            self.assertEqual(
+                [page.page_number for page in document.pages], [1, 2, 3, 4, 5]
+            )
+            processed_batches = [
+                len(call[1]["image_batch"])
+                for call in layout_detector.process.call_args_list
+            ]
+            self.assertEqual(processed_batches, [2, 2, 1])
+
+    def test_process_metrics(self):
+        pdf_path = os.path.join(os.path.dirname(__file__), _PDF_PATH)
+        callback = MagicMock()
+        pipeline, _, _ = self._mock_pipeline(
+            metrics_callback=callback, page_window_size=2
+        )
+        document = pipeline.process(pdf_path)
+
+        stages = document.metadata["metrics"]["stages"]
+        self.assertEqual(stages["rasterization"]["items"], 5)
+        self.assertEqual(stages["layout"]["calls"], 3)
+        self.assertEqual(stages["layout"]["min_batch_size"], 1)
+        self.assertEqual(stages["layout"]["max_batch_size"], 2)
+        self.assertEqual(stages["text_fragments"]["items"], 5)
+        self.assertEqual(stages["ocr"]["items"], 10)
+        self.assertGreater(stages["layout"]["wall_time"], 0)
+        recorded_stages = {call[0][0] for call in callback.call_args_list}
+        self.assertLessEqual(set(stages), recorded_stages)
+
+    def test_process_trace(self):
+        pdf_path = os.path.join(os.path.dirname(__file__), _PDF_PATH)
+        with tempfile.TemporaryDirectory() as trace_dir:
+            pipeline, _, _ = self._mock_pipeline(
+                page_window_size=2, trace_dir=trace_dir
+            )
+            pipeline.process(pdf_path, pages_to_parse=[0, 1])
+
+            (trace_file,) = os.listdir(trace_dir)
+            with open(
+                os.path.join(trace_dir, trace_file), encoding="utf-8"
+            ) as trace:
+                events = json.load(trace)["traceEvents"]
+
+        spans = [event for event in events if event["ph"] == "X"]
+        names = {event["name"] for event in spans}
+        self.assertLessEqual(
+            {"document", "batch", "layout", "page", "fragment", "ocr"}, names
+        )
+        fragment = next(
+            event for event in spans if event["name"] == "fragment"
+        )
+        self.assertIn(fragment["args"]["page_number"], [1, 2])
+        self.assertIn("crop_size", fragment["args"])
+        self.assertIn(fragment["args"]["fragment_type"], ["text", "table"])
+
     def test_process_image(self):
         processed_document = self._pipeline.process(self._image_path)
         self.assertIsNotNone(processed_document)
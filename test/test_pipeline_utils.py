@@ -0,0 +1,78 @@
+import logging
+import os
+import unittest
+
+import numpy as np
+
+from inkwell.components import Layout, LayoutBlock, Rectangle
+from inkwell.components.document import PageImage
+from inkwell.io import iter_pdf_pages
+from inkwell.pipeline.utils import (
+    crop_block_image,
+    iter_windows,
+    split_layout_blocks,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+class TestPipelineUtils(unittest.TestCase):
+
+    def setUp(self):
+        _logger.info("Running test: %s", self._testMethodName)
+        curr_path = os.path.dirname(__file__)
+        self._pdf_path = os.path.join(curr_path, "./data/sample_2.pdf")
+
+    def test_iter_windows(self):
+        self.assertEqual(
+            list(iter_windows(range(5), 2)), [[0, 1], [2, 3], [4]]
+        )
+        self.assertEqual(list(iter_windows(range(3))), [[0, 1, 2]])
+        self.assertEqual(list(iter_windows([], 2)), [])
+        self.assertEqual(
+            list(iter_windows(range(6), 3, first_window_size=1)),
+            [[0], [1, 2, 3], [4, 5]],
+        )
+        self.assertEqual(
+            list(iter_windows(range(3), first_window_size=1)), [[0], [1, 2]]
+        )
+        with self.assertRaises(ValueError):
+            list(iter_windows(range(3), 0))
+
+    def test_crop_block_image_from_raster(self):
+        image = np.arange(100 * 100 * 3, dtype=np.uint8).reshape(100, 100, 3)
+        block = LayoutBlock(Rectangle(20, 20, 60, 60), type="Text")
+        page_image = PageImage(
+            page_image=image, page_number=1, page_layout=Layout([block])
+        )
+        page_block = split_layout_blocks([page_image]).page_blocks[0]
+        crop = crop_block_image(page_block, page_block.text_blocks[0])
+        self.assertTrue(
+            np.array_equal(crop, block.pad_ratio(0.05).crop_image(image))
+        )
+
+    def test_crop_block_image_rerenders_pdf_region(self):
+        low_res_page = next(
+            iter_pdf_pages(
+                self._pdf_path, [0], resolution=72, attach_pdf_pages=True
+            )
+        )
+        full_res_page = next(iter_pdf_pages(self._pdf_path, [0]))
+
+        # Blocks are expressed in coordinates of the 512 DPI page
+        block = LayoutBlock(Rectangle(400, 500, 2000, 1600), type="Text")
+        low_res_page.page_layout = Layout([block])
+        page_block = split_layout_blocks([low_res_page]).page_blocks[0]
+
+        expected = block.pad_ratio(0.05).crop_image(full_res_page.page_image)
+        crop = crop_block_image(page_block, block, crop_resolution=512)
+        height = min(crop.shape[0], expected.shape[0])
+        width = min(crop.shape[1], expected.shape[1])
+        self.assertLessEqual(abs(crop.shape[0] - expected.shape[0]), 1)
+        self.assertLessEqual(abs(crop.shape[1] - expected.shape[1]), 1)
+        self.assertTrue(
+            np.array_equal(crop[:height, :width], expected[:height, :width])
+        )
+
+        low_res_crop = crop_block_image(page_block, block)
+        self.assertLess(low_res_crop.shape[0], crop.shape[0] // 4)
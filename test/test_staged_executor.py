@@ -0,0 +1,75 @@
+import logging
+import threading
+import time
+import unittest
+
+from inkwell.pipeline.staged_executor import StagedExecutor
+
+_logger = logging.getLogger(__name__)
+
+
+class TestStagedExecutor(unittest.TestCase):
+
+    def setUp(self):
+        _logger.info("Running test: %s", self._testMethodName)
+
+    def test_results_match_sequential(self):
+        stages = [lambda x: x + 1, lambda x: x * 2, str]
+        executor = StagedExecutor(stages, queue_size=1)
+        expected = [str((x + 1) * 2) for x in range(20)]
+        self.assertEqual(list(executor.run(range(20))), expected)
+
+    def test_stages_overlap(self):
+        running = set()
+        overlapped = threading.Event()
+        lock = threading.Lock()
+
+        def make_stage(name):
+            def stage(item):
+                with lock:
+                    running.add(name)
+                    if len(running) > 1:
+                        overlapped.set()
+                time.sleep(0.02)
+                with lock:
+                    running.discard(name)
+                return item
+
+            return stage
+
+        executor = StagedExecutor([make_stage("a"), make_stage("b")])
+        self.assertEqual(list(executor.run(range(5))), list(range(5)))
+        self.assertTrue(overlapped.is_set())
+
+    def test_stage_exception_is_raised(self):
+        def fail_on_three(item):
+            if item == 3:
+                raise RuntimeError("stage failed")
+            return item
+
+        executor = StagedExecutor([fail_on_three])
+        results = []
+        with self.assertRaises(RuntimeError):
+            for item in executor.run(range(10)):
+                results.append(item)
+        self.assertEqual(results, [0, 1, 2])
+
+    def test_early_exit_closes_input(self):
+        closed = threading.Event()
+
+        def items():
+            try:
+                for i in range(1000):
+                    yield i
+            finally:
+                closed.set()
+
+        executor = StagedExecutor([lambda x: x], queue_size=1)
+        for item in executor.run(items()):
+            if item == 2:
+                break
+        self.assertTrue(closed.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
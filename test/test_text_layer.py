@@ -0,0 +1,140 @@
+import logging
+import os
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from inkwell.components import Layout, LayoutBlock, Rectangle
+from inkwell.components.document import DocumentPageBlocks, PageBlocks
+from inkwell.io import iter_pdf_pages
+from inkwell.ocr.base import words_to_text
+from inkwell.pipeline.fragment_processor import TextFragmentProcessor
+from inkwell.pipeline.text_layer import (
+    assign_words_to_blocks,
+    extract_text_layer,
+    is_usable_text,
+)
+from inkwell.pipeline.utils import split_layout_blocks
+
+_logger = logging.getLogger(__name__)
+
+
+def _word(text, x_1, y_1, x_2, y_2):
+    return LayoutBlock(Rectangle(x_1, y_1, x_2, y_2), text=text, type="word")
+
+
+class TestTextLayer(unittest.TestCase):
+
+    def setUp(self):
+        _logger.info("Running test: %s", self._testMethodName)
+        curr_path = os.path.dirname(__file__)
+        self._pdf_path = os.path.join(curr_path, "./data/sample_2.pdf")
+
+    def test_assign_words_to_blocks(self):
+        words = Layout(
+            [
+                _word("world", 60, 10, 100, 20),
+                _word("hello", 10, 11, 50, 21),
+                _word("again", 10, 30, 50, 40),
+                _word("inner", 210, 10, 250, 20),
+                _word("outside", 500, 500, 550, 510),
+            ]
+        )
+        blocks = [
+            LayoutBlock(Rectangle(0, 0, 300, 50), type="Text"),
+            LayoutBlock(Rectangle(200, 0, 300, 50), type="Text"),
+        ]
+        block_words = assign_words_to_blocks(words, blocks)
+
+        self.assertEqual(words_to_text(block_words[0]), "hello world\nagain")
+        self.assertEqual(words_to_text(block_words[1]), "inner")
+
+    def test_is_usable_text(self):
+        self.assertTrue(is_usable_text("Sleep deprivation"))
+        self.assertFalse(is_usable_text(""))
+        self.assertFalse(is_usable_text(" - . "))
+        self.assertFalse(is_usable_text("(cid:12)(cid:15) a"))
+
+    def test_extract_text_layer(self):
+        page = next(
+            iter_pdf_pages(
+                self._pdf_path, [0], resolution=72, attach_pdf_pages=True
+            )
+        )
+        words = extract_text_layer(page.pdf_page, scale=512 / 72)
+        self.assertGreater(len(words), 0)
+        self.assertEqual(words[0].text, "SLEEP")
+        self.assertAlmostEqual(words[0].block.x_1, 108.43 * 512 / 72)
+
+    def test_text_fragment_processor_skips_ocr_for_text_layer(self):
+        page = next(
+            iter_pdf_pages(
+                self._pdf_path, [0], resolution=72, attach_pdf_pages=True
+            )
+        )
+        title_block = LayoutBlock(Rectangle(700, 500, 2000, 720), type="Title")
+        empty_block = LayoutBlock(Rectangle(0, 0, 300, 300), type="Text")
+        page.page_layout = Layout([title_block, empty_block])
+
+        ocr_detector = MagicMock()
+        ocr_detector.process.return_value = ["ocr text"]
+        processor = TextFragmentProcessor(ocr_detector, use_text_layer=True)
+        fragments = processor.process(split_layout_blocks([page]))
+
+        self.assertEqual(len(fragments), 2)
+        self.assertTrue(
+            fragments[0].content.text.startswith("SLEEP DEPRIVATION")
+        )
+        self.assertEqual(fragments[1].content.text, "ocr text")
+        self.assertEqual(len(ocr_detector.process.call_args[0][0]), 1)
+
+    def test_text_fragment_processor_page_ocr(self):
+        blocks = [
+            LayoutBlock(Rectangle(0, 0, 400, 100), type="Text"),
+            LayoutBlock(Rectangle(0, 200, 400, 300), type="Title"),
+        ]
+        # The page image has half the resolution of the block coordinates
+        page_block = PageBlocks(
+            page_image=np.zeros((200, 200, 3), dtype=np.uint8),
+            figure_blocks=[],
+            table_blocks=[],
+            text_blocks=blocks,
+            page_number=1,
+            image_scale=0.5,
+        )
+        ocr_detector = MagicMock()
+        ocr_detector.supports_words = True
+        ocr_detector.process_words.return_value = [
+            Layout(
+                [
+                    _word("world", 60, 10, 100, 20),
+                    _word("hello", 10, 11, 50, 21),
+                    _word("again", 10, 30, 50, 40),
+                    _word("title", 10, 110, 50, 120),
+                ]
+            )
+        ]
+        processor = TextFragmentProcessor(ocr_detector, page_ocr=True)
+        fragments = processor.process(
+            DocumentPageBlocks(page_blocks=[page_block])
+        )
+
+        self.assertEqual(
+            [fragment.content.text for fragment in fragments],
+            ["hello world\nagain", "title"],
+        )
+        ocr_detector.process.assert_not_called()
+        (page_images,) = ocr_detector.process_words.call_args[0]
+        self.assertEqual(len(page_images), 1)
+
+        # Detectors without word recognition OCR the blocks one by one
+        ocr_detector.supports_words = False
+        ocr_detector.process.return_value = ["a", "b"]
+        processor = TextFragmentProcessor(ocr_detector, page_ocr=True)
+        fragments = processor.process(
+            DocumentPageBlocks(page_blocks=[page_block])
+        )
+        self.assertEqual(
+            [fragment.content.text for fragment in fragments], ["a", "b"]
+        )